@@ -1,14 +1,29 @@
+import os
 from selenium import webdriver
+from app.core.profiles import get_profile
 
-SELENIUM_HUB_URL = "http://192.168.1.4:4444/wd/hub"
+SELENIUM_HUB_URL = os.getenv("SELENIUM_HUB_URL", "http://192.168.1.4:4444/wd/hub")
 
-def get_driver():
+def get_driver(profile="default"):
+    """Open a grid session configured by the named profile (see app.core.profiles.PROFILES)."""
+    profile = get_profile(profile)
     options = webdriver.ChromeOptions()
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
+    if profile.headless:
+        options.add_argument("--headless=new")
+    if profile.window_size:
+        options.add_argument("--window-size={},{}".format(*profile.window_size))
+    if profile.disable_images:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    options.page_load_strategy = profile.page_load_strategy
     driver = webdriver.Remote(
         command_executor=SELENIUM_HUB_URL,
         options=options
     )
+    if profile.blocked_urls:
+        driver.execute("executeCdpCommand", {"cmd": "Network.enable", "params": {}})
+        driver.execute("executeCdpCommand", {"cmd": "Network.setBlockedURLs", "params": {"urls": profile.blocked_urls}})
+    driver.scraper_profile = profile.name
     return driver
-
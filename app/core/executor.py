@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.core import telemetry
+from app.core.jobs import jobs
+from app.core.logging_config import bind_log_context, job_id_var
+from app.core.session_pool import get_pool
+
+logger = logging.getLogger("web-scraper")
+
+# Worker threads for blocking scrape work; 0 means "one per pooled browser session".
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 0))
+# Calls allowed to wait for a worker before new ones are rejected.
+SCRAPE_QUEUE_LIMIT = int(os.getenv("SCRAPE_QUEUE_LIMIT", 20))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class ScrapeExecutor:
+    """
+    Bounded thread pool that keeps blocking Selenium calls off the event loop.
+
+    At most ``max_workers`` calls run at once and at most ``queue_limit`` more wait for a worker;
+    anything beyond that is rejected up front with ``ExecutorSaturated``.
+    """
+
+    def __init__(self, max_workers, queue_limit=SCRAPE_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule ``fn`` on a worker and return an awaitable future, or raise ``ExecutorSaturated``. When a
+        worker starts it, the async job of the caller's job id (if any) and the jobs sharing its scrape are
+        marked running.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_limit:
+                self._rejected += 1
+                raise ExecutorSaturated(f"Scraper is at capacity ({self.max_workers} running, {self.queue_limit} queued)")
+            self._pending += 1
+            self._submitted += 1
+        # Worker threads log with the crawl and job ids of the caller
+        job_id = job_id_var.get()
+        started = partial(asyncio.get_running_loop().call_soon_threadsafe, jobs.started, job_id)
+        future = self._executor.submit(self._traced, started, bind_log_context(fn), *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        future = asyncio.wrap_future(future)
+        future.add_done_callback(partial(jobs.stopped, job_id))
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` on a worker and await its result."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "running": min(self._pending, self.max_workers),
+                "queued": max(self._pending - self.max_workers, 0),
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _traced(started, fn, *args, **kwargs):
+        started()
+        # Each scrape is the root of its own trace; page loads, waits and extraction nest under it.
+        with telemetry.tracer.start_as_current_span(f"scraper.task {fn.__name__}"):
+            return fn(*args, **kwargs)
+
+    def _on_done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide scrape executor, sized to the session pool by default."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ScrapeExecutor(SCRAPE_WORKERS or get_pool().max_size)
+            logger.info("Scrape executor started with %s workers", _executor.max_workers)
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
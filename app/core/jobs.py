@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger("web-scraper")
+
+# Finished jobs are kept this long for clients to collect their results.
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", 3600))
+
+
+class Job:
+    """
+    A scrape running in the background, tracked by id so clients can poll for the result. Its status goes
+    "pending" (waiting for an executor worker), "running", then "succeeded" or "failed".
+    """
+
+    def __init__(self, kind, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = asyncio.Event()
+
+    def to_dict(self):
+        data = {"job_id": self.id, "kind": self.kind, "status": self.status, "created_at": self.created_at}
+        if self.finished_at is not None:
+            data["finished_at"] = self.finished_at
+        if self.status == "succeeded":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobStore:
+    """
+    In-memory registry of async-mode jobs; lives on the event loop, so no locking is needed. The executor
+    reports when the scrape of a request id starts and stops, so jobs that share another request's scrape
+    follow its status too.
+    """
+
+    def __init__(self, ttl=JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._jobs = {}
+        self._running = set()
+        self._followers = {}
+
+    def create(self, kind, awaitable, job_id=None, follows=None):
+        """
+        Track ``awaitable`` as a new job (under ``job_id``, if given) and return it immediately. ``follows``
+        is the request id whose scrape the job shares; the job is running whenever that scrape is.
+        """
+        self._purge()
+        job = Job(kind, job_id)
+        self._jobs[job.id] = job
+        if follows is not None and follows in self._running:
+            job.status = "running"
+        elif follows is not None:
+            self._followers.setdefault(follows, []).append(job)
+        task = asyncio.ensure_future(awaitable)
+        task.add_done_callback(lambda t: self._finish(job, t))
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def started(self, job_id):
+        """Mark the job and its followers as running; the executor calls this (on the loop) when a worker picks its scrape up."""
+        if job_id is not None:
+            self._running.add(job_id)
+        for job in (self._jobs.get(job_id), *self._followers.pop(job_id, ())):
+            if job is not None and job.status == "pending":
+                job.status = "running"
+
+    def stopped(self, job_id, _future=None):
+        """The scrape of ``job_id`` finished or was dropped; the executor calls this as a done callback."""
+        self._running.discard(job_id)
+        self._followers.pop(job_id, None)
+
+    async def wait(self, job, timeout):
+        """Long-poll: wait up to ``timeout`` seconds for the job to finish."""
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(job._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _finish(self, job, task):
+        job.finished_at = time.time()
+        if task.cancelled():
+            job.status, job.error = "failed", "cancelled"
+        elif task.exception() is not None:
+            job.status, job.error = "failed", str(task.exception())
+            logger.error("Job %s (%s) failed: %s", job.id, job.kind, job.error)
+        else:
+            job.status, job.result = "succeeded", task.result()
+        job._done.set()
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+jobs = JobStore()
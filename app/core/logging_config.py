@@ -1,9 +1,186 @@
+import atexit
+import contextvars
+import copy
+import functools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 
-def setup_logging():
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-    logger = logging.getLogger("web-scraper")
-    if int(os.getenv("NETWORK_DEBUG", 1)):
-        logger.setLevel(logging.DEBUG)
+# "1" logs the web-scraper logger at DEBUG.
+NETWORK_DEBUG = int(os.getenv("NETWORK_DEBUG", 0))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" writes one JSON object per line, "text" the plain "time - level - message" lines.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Records waiting for the writer thread; when it falls behind, new records are dropped (and counted), never waited on.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Per-element lines logged for each outcome of one operation; the rest only go into its summary line.
+LOG_ELEMENT_SAMPLE = int(os.getenv("LOG_ELEMENT_SAMPLE", 3))
 
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+crawl_id_var = contextvars.ContextVar("crawl_id", default=None)
+job_id_var = contextvars.ContextVar("job_id", default=None)
+_CONTEXT_VARS = {"crawl_id": crawl_id_var, "job_id": job_id_var}
+
+# Attributes every LogRecord has; anything else on a record came from ``extra`` and is written as a JSON field.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def set_log_context(**ids):
+    """Tag the records logged from here on in this thread (or task) with ``crawl_id``/``job_id``; returns reset tokens."""
+    return [(_CONTEXT_VARS[name], _CONTEXT_VARS[name].set(value)) for name, value in ids.items()]
+
+
+def reset_log_context(tokens):
+    for var, token in reversed(tokens):
+        var.reset(token)
+
+
+@contextmanager
+def log_context(**ids):
+    tokens = set_log_context(**ids)
+    try:
+        yield
+    finally:
+        reset_log_context(tokens)
+
+
+def bind_log_context(fn):
+    """``fn`` carrying the current crawl and job ids, to run it in another thread (threads start without them)."""
+    ids = {name: var.get() for name, var in _CONTEXT_VARS.items()}
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with log_context(**ids):
+            return fn(*args, **kwargs)
+    return run
+
+
+class ContextFilter(logging.Filter):
+    """Adds the crawl and job ids of the logging thread to its records (unless set through ``extra``)."""
+
+    def filter(self, record):
+        for name, var in _CONTEXT_VARS.items():
+            if getattr(record, name, None) is None:
+                setattr(record, name, var.get())
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message, the crawl/job ids and ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without blocking: the message is merged with its arguments here, while
+    they still hold their values, and everything else (JSON, stream writes) happens on the writer thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, stream=None):
+    """
+    Route all logging through a bounded queue to one background thread that writes to ``stream`` (stderr),
+    so scraping threads never wait on log output. Calling it again does nothing.
+    """
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        _handler = _QueueHandler(log_queue)
+        _handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        root.setLevel(level)
+        if NETWORK_DEBUG:
+            logging.getLogger("web-scraper").setLevel(logging.DEBUG)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out the records still queued and stop the writer thread."""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        if _handler.dropped:
+            logging.getLogger("web-scraper").warning("%d log records were dropped while the log queue was full",
+                                                     _handler.dropped)
+        _listener = _handler = None
+
+
+class OperationLog:
+    """
+    Per-element log lines of one operation. The first ``sample`` lines of each outcome are logged and the rest
+    only counted; ``summary`` then logs one line with the counts, so logging no longer grows with element count.
+    """
+
+    def __init__(self, logger, operation, sample=LOG_ELEMENT_SAMPLE):
+        self.logger = logger
+        self.operation = operation
+        self.sample = sample
+        self.counts = {}
+        self.suppressed = 0
+
+    def element(self, outcome, level, msg, *args):
+        count = self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        if count <= self.sample:
+            self.logger.log(level, msg, *args)
+        elif self.logger.isEnabledFor(level):
+            self.suppressed += 1
+
+    def summary(self, level=logging.INFO):
+        self.logger.log(level, "%s: %s (%d element log lines suppressed)", self.operation, self.counts, self.suppressed,
+                        extra={"operation": self.operation, "counts": self.counts})
@@ -0,0 +1,156 @@
+import logging
+import os
+import random
+import threading
+from typing import List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger("web-scraper")
+
+# Fraction of page loads whose transfer size and timing are read back from the browser. The HTTP status
+# the host scheduler needs is read on every load either way.
+PAGE_METRICS_SAMPLE_RATE = float(os.getenv("PAGE_METRICS_SAMPLE_RATE", 1.0))
+
+# Third-party analytics, ads and tracking hosts (CDP Network.setBlockedURLs patterns).
+TRACKING_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*criteo.com*",
+    "*taboola.com*", "*outbrain.com*", "*newrelic.com*", "*nr-data.net*", "*segment.io*", "*yandex.ru/metrika*",
+]
+FONT_AND_MEDIA_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mp3", "*.m3u8"]
+STYLESHEET_PATTERNS = ["*.css"]
+
+
+class DriverProfile(BaseModel):
+    name: str
+    headless: bool = Field(False, description="Run Chrome with --headless=new")
+    page_load_strategy: Literal["normal", "eager", "none"] = Field(
+        "normal", description="'eager' returns from get() at DOMContentLoaded, 'none' right after navigation starts")
+    disable_images: bool = Field(False, description="Do not download or decode images")
+    blocked_urls: List[str] = Field(default_factory=list, description="URL patterns blocked through CDP")
+    window_size: Optional[Tuple[int, int]] = Field(None, description="Window width and height")
+
+
+PROFILES = {
+    # What get_driver() always did: a full, visible browser.
+    "default": DriverProfile(name="default"),
+    # Enough to read link text and hrefs: no images, fonts, media or trackers, no waiting for onload.
+    "light": DriverProfile(
+        name="light",
+        headless=True,
+        page_load_strategy="eager",
+        disable_images=True,
+        blocked_urls=TRACKING_PATTERNS + FONT_AND_MEDIA_PATTERNS,
+        window_size=(1280, 800),
+    ),
+    # Also blocks stylesheets. Hidden flyouts become laid out, so visibility/clickable flags are less
+    # meaningful; use it for pages where every matched link is wanted.
+    "minimal": DriverProfile(
+        name="minimal",
+        headless=True,
+        page_load_strategy="eager",
+        disable_images=True,
+        blocked_urls=TRACKING_PATTERNS + FONT_AND_MEDIA_PATTERNS + STYLESHEET_PATTERNS,
+        window_size=(800, 600),
+    ),
+    # For TabSession: like "light", but get() returns as soon as the navigation starts, so a slow page in
+    # one tab never holds the session for the other tabs.
+    "tabs": DriverProfile(
+        name="tabs",
+        headless=True,
+        page_load_strategy="none",
+        disable_images=True,
+        blocked_urls=TRACKING_PATTERNS + FONT_AND_MEDIA_PATTERNS,
+        window_size=(1280, 800),
+    ),
+}
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown driver profile {name!r}, expected one of {sorted(PROFILES)}") from None
+
+
+# Reads the Navigation and Resource Timing entries of the current page in one call. transferSize is 0
+# for cache hits and for cross-origin resources without Timing-Allow-Origin, so bytes are a lower bound.
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let resourceBytes = 0;
+for (const entry of resources) resourceBytes += entry.transferSize || 0;
+return {
+    document_bytes: nav ? nav.transferSize : 0,
+    resource_bytes: resourceBytes,
+    resources: resources.length,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : 0,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd : performance.now(),
+    status: nav && nav.responseStatus ? nav.responseStatus : null,
+};
+"""
+
+# Just the HTTP status of the current page's navigation, for loads whose metrics are not sampled.
+PAGE_STATUS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav && nav.responseStatus ? nav.responseStatus : null;
+"""
+
+
+def page_status(driver):
+    """HTTP status of the current page, or None when the browser does not report it."""
+    try:
+        return driver.execute_script(PAGE_STATUS_SCRIPT)
+    except Exception as e:
+        logger.debug("Could not read the page status: %s", e)
+        return None
+
+
+class PageLoadStats:
+    """Per-profile totals of bytes transferred and load time, to compare profiles on the grid."""
+
+    def __init__(self, sample_rate=PAGE_METRICS_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def record(self, driver):
+        """Sample the current page's transfer size and timing under the driver's profile."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        try:
+            metrics = driver.execute_script(PAGE_METRICS_SCRIPT)
+        except Exception as e:
+            logger.debug("Could not read page metrics: %s", e)
+            return None
+        if not metrics:
+            return None
+        profile = getattr(driver, "scraper_profile", "default")
+        with self._lock:
+            entry = self._profiles.setdefault(profile, {"pages": 0, "bytes": 0, "resources": 0, "load_ms": 0.0})
+            entry["pages"] += 1
+            entry["bytes"] += metrics["document_bytes"] + metrics["resource_bytes"]
+            entry["resources"] += metrics["resources"]
+            entry["load_ms"] += metrics["load_ms"]
+        return metrics
+
+    def record_load(self, driver):
+        """Sample the page's metrics like ``record``, and return its HTTP status whether sampled or not."""
+        metrics = self.record(driver)
+        return metrics["status"] if metrics else page_status(driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                profile: {
+                    "pages": entry["pages"],
+                    "avg_bytes": entry["bytes"] / entry["pages"],
+                    "avg_resources": entry["resources"] / entry["pages"],
+                    "avg_load_ms": entry["load_ms"] / entry["pages"],
+                }
+                for profile, entry in self._profiles.items()
+            }
+
+
+page_load_stats = PageLoadStats()
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger("web-scraper")
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 300))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1000))
+# SQLite file for the disk tier that survives restarts; empty keeps the cache in memory only.
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+
+_MISSING = object()
+
+
+def cache_key(kind, url, *args):
+    """Normalised cache key: scheme and host lower-cased, fragment dropped, arguments stripped."""
+    parts = urlsplit(url.strip())
+    normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+    return json.dumps([kind, normalized_url, *[arg.strip() if isinstance(arg, str) else arg for arg in args]])
+
+
+class _DiskTier:
+    """
+    SQLite store for cached results; every call runs under one lock on a shared connection. The calls
+    block, so ResultCache makes them from worker threads, never on the event loop.
+    """
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, stored_at REAL, value TEXT)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at, value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key, stored_at, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, stored_at, json.dumps(value)))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """
+    TTL + LRU cache for scrape results with request coalescing.
+
+    Lives on the event loop. A miss starts the scrape once and registers it as in flight; identical
+    requests arriving meanwhile await that same scrape instead of loading the page again. Results are
+    kept in memory (bounded by ``max_entries``) and, when ``db_path`` is set, in SQLite so they survive
+    restarts; SQLite reads and writes run in the loop's default thread pool.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES, db_path=RESULT_CACHE_DB):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._disk = _DiskTier(db_path, ttl) if db_path else None
+        self._inflight = {}
+        self._owners = {}
+        self._waiters = {}
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "evictions": 0}
+
+    async def get_or_start(self, key, start, max_age=None, no_cache=False, cacheable=None, owner=None):
+        """
+        Return an awaitable for the result of ``key`` (after a disk tier lookup, hence the coroutine).
+
+        :param start: Called on a miss; returns an awaitable running the scrape. It is called right away,
+                      so errors such as admission failures surface to the caller immediately.
+        :param max_age: Only accept a cached result at most this many seconds old
+        :param no_cache: Skip the cache lookup (identical in-flight requests are still shared)
+        :param cacheable: Optional predicate; results it rejects are not stored
+        :param owner: Recorded as the owner of the scrape if this call starts it (see ``owner``)
+        """
+        if not no_cache and max_age != 0:
+            value = await self._lookup(key, self.ttl if max_age is None else min(max_age, self.ttl))
+            if value is not _MISSING:
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(value)
+                return future
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._counts["coalesced"] += 1
+            return self._wait(key, inflight)
+
+        self._counts["misses"] += 1
+        future = asyncio.ensure_future(start())
+        self._inflight[key] = future
+        self._owners[key] = owner
+        future.add_done_callback(lambda f: self._on_done(key, f, cacheable))
+        return self._wait(key, future)
+
+    def owner(self, key):
+        """The ``owner`` given by the call that started the scrape of ``key`` in flight, or None."""
+        return self._owners.get(key)
+
+    async def _wait(self, key, future):
+        """
+        Await a shared scrape. One caller going away does not cancel it for the others; when the last
+        waiter is cancelled the scrape is cancelled too, which drops it if it has not started yet.
+        """
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not future.done():
+                future.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def stats(self):
+        lookups = self._counts["hits"] + self._counts["disk_hits"] + self._counts["misses"] + self._counts["coalesced"]
+        served = self._counts["hits"] + self._counts["disk_hits"]
+        return {
+            **self._counts,
+            "hit_rate": served / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "ttl": self.ttl,
+            "disk_tier": self._disk is not None,
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+
+    async def _lookup(self, key, max_age):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and now - entry[0] <= max_age:
+            self._memory.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[1]
+        # Skipped while the same key is in flight: its result is fresher than anything on disk.
+        if self._disk is not None and key not in self._inflight:
+            try:
+                entry = await asyncio.to_thread(self._disk.get, key)
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning("Could not read result from the disk cache: %s", e)
+                return _MISSING
+            if entry is not None and now - entry[0] <= max_age:
+                self._remember(key, *entry)
+                self._counts["disk_hits"] += 1
+                return entry[1]
+        return _MISSING
+
+    def _on_done(self, key, future, cacheable):
+        self._inflight.pop(key, None)
+        self._owners.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        value = future.result()
+        if cacheable is not None and not cacheable(value):
+            return
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        self._counts["stores"] += 1
+        if self._disk is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._store_on_disk, key, stored_at, value)
+
+    def _store_on_disk(self, key, stored_at, value):
+        try:
+            self._disk.put(key, stored_at, value)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning("Could not write result to the disk cache: %s", e)
+
+    def _remember(self, key, stored_at, value):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counts["evictions"] += 1
+
+
+result_cache = ResultCache()
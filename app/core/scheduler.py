@@ -0,0 +1,344 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger("web-scraper")
+
+# Concurrent page loads per host: where the adaptive limit starts and the range it moves in.
+HOST_INITIAL_CONCURRENCY = int(os.getenv("HOST_INITIAL_CONCURRENCY", 2))
+HOST_MIN_CONCURRENCY = int(os.getenv("HOST_MIN_CONCURRENCY", 1))
+HOST_MAX_CONCURRENCY = int(os.getenv("HOST_MAX_CONCURRENCY", 8))
+# Requests per second per host; 0 means no rate limit. HOST_RATE_LIMITS overrides it per host
+# ("shop.example.com:2,api.example.com:0.5").
+HOST_MAX_RPS = float(os.getenv("HOST_MAX_RPS", 0))
+HOST_RATE_LIMITS = os.getenv("HOST_RATE_LIMITS", "")
+# The concurrency limit is cut when the host's mean latency grows past this multiple of its best.
+HOST_LATENCY_FACTOR = float(os.getenv("HOST_LATENCY_FACTOR", 2.0))
+# Pause after a 429/403/503 answer, doubled for each one in a row.
+HOST_BACKOFF_SECONDS = float(os.getenv("HOST_BACKOFF_SECONDS", 5))
+HOST_BACKOFF_MAX_SECONDS = float(os.getenv("HOST_BACKOFF_MAX_SECONDS", 300))
+# Concurrent grid page loads across all jobs; -1 means "the session pool's size" (set when the pool is
+# created) and 0 means no global cap.
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", -1))
+SCHEDULER_WAIT_TIMEOUT = float(os.getenv("SCHEDULER_WAIT_TIMEOUT", 120))
+# Shares of contended slots: API scrapes run as one job; every crawl is a job of its own.
+API_JOB = "api"
+API_JOB_PRIORITY = float(os.getenv("API_JOB_PRIORITY", 2))
+CRAWL_JOB_PRIORITY = float(os.getenv("CRAWL_JOB_PRIORITY", 1))
+
+THROTTLE_STATUSES = (403, 429, 503)
+DECREASE_FACTOR = 0.5
+EWMA_ALPHA = 0.2
+BASELINE_DRIFT = 0.01  # Lets the best-latency baseline rise again when a host stays slower for good
+LATENCY_FLOOR = 0.05   # Seconds; latency swings below this are jitter, not a congested host
+RATE_WINDOW = 10.0     # Seconds over which the observed request rate is reported
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a ticket could not be granted within the wait timeout."""
+
+
+def parse_rate_limits(value):
+    """Parse a HOST_RATE_LIMITS string into {host: requests per second}."""
+    limits = {}
+    for part in value.split(","):
+        if part.strip():
+            host, rps = part.rsplit(":", 1)
+            limits[host.strip().lower()] = float(rps)
+    return limits
+
+
+class _Host:
+    """Adaptive limits and back-off state of one host."""
+
+    def __init__(self, max_rps, initial, min_concurrency, max_concurrency):
+        self.max_rps = max_rps
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(max(initial, min_concurrency), max_concurrency))
+        self.in_flight = 0
+        self.next_start = 0.0
+        self.backoff_until = 0.0
+        self.throttle_streak = 0
+        self.latency = None
+        self.baseline = None
+        self.last_decrease = 0.0
+        self.starts = deque()
+        self.completed = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.decreases = 0
+
+    def admissible(self, now):
+        return self.in_flight < int(self.limit) and now >= self.backoff_until and now >= self.next_start
+
+    def wake_time(self, now):
+        """When this host may admit again without a release, or None if it waits for one."""
+        if self.in_flight >= int(self.limit):
+            return None
+        return max(self.backoff_until, self.next_start, now)
+
+    def start(self, now):
+        self.in_flight += 1
+        if self.max_rps > 0:
+            self.next_start = now + 1 / self.max_rps
+        self.starts.append(now)
+        while self.starts and self.starts[0] < now - RATE_WINDOW:
+            self.starts.popleft()
+
+    def observe(self, now, elapsed, status, timed_out, latency_factor, backoff, backoff_max):
+        self.in_flight -= 1
+        if status in THROTTLE_STATUSES:
+            self.throttled += 1
+            self.throttle_streak += 1
+            pause = min(backoff * 2 ** (self.throttle_streak - 1), backoff_max)
+            self.backoff_until = max(self.backoff_until, now + pause)
+            self._decrease(now, force=True)
+            return
+        self.throttle_streak = 0
+        if timed_out:
+            self.timeouts += 1
+            self._decrease(now)
+            return
+        self.completed += 1
+        self.latency = elapsed if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * elapsed
+        self.baseline = self.latency if self.baseline is None else min(self.latency, self.baseline * (1 + BASELINE_DRIFT))
+        if self.latency > latency_factor * max(self.baseline, LATENCY_FLOOR):
+            self._decrease(now)
+        else:
+            # Additive increase: about one more concurrent load per window of successful ones.
+            self.limit = min(self.limit + 1 / self.limit, self.max_concurrency)
+
+    def _decrease(self, now, force=False):
+        # At most one cut per round trip, so a burst of slow answers to one window counts once.
+        if not force and now - self.last_decrease < (self.latency or 0):
+            return
+        self.limit = max(self.limit * DECREASE_FACTOR, self.min_concurrency)
+        self.last_decrease = now
+        self.decreases += 1
+
+    def stats(self, now):
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "max_rps": self.max_rps or None,
+            "rate_rps": round(sum(1 for start in self.starts if start >= now - RATE_WINDOW) / RATE_WINDOW, 2),
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+            "baseline_ms": None if self.baseline is None else round(self.baseline * 1000, 1),
+            "backoff_seconds": round(max(self.backoff_until - now, 0), 1),
+            "throttle_streak": self.throttle_streak,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "decreases": self.decreases,
+        }
+
+
+class _Job:
+    def __init__(self, priority, virtual):
+        self.priority = priority
+        # Grants so far, each weighted 1 / priority; the job with the lowest value goes next.
+        self.virtual = virtual
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+
+
+class Ticket:
+    """Permission for one page load on a host; ``record`` what the host answered before it is released."""
+
+    def __init__(self, host, job, grid):
+        self.host = host
+        self.job = job
+        self.grid = grid
+        self.status = None
+        self.timed_out = False
+        self.granted = False
+        self.started = None
+
+    def record(self, status=None, timed_out=False):
+        """Note the HTTP status of the page (None if unknown) and whether loading it timed out."""
+        if status is not None:
+            self.status = status
+        self.timed_out = self.timed_out or timed_out
+
+    def loading(self):
+        """Start the latency clock now, e.g. once a browser session was leased for the granted load."""
+        self.started = time.monotonic()
+
+
+class HostScheduler:
+    """
+    Coordinates page loads of every crawl and API scrape per host.
+
+    Each host gets an adaptive concurrency limit (AIMD: +1 per window of successful loads, halved on a
+    timeout, on a latency rise past ``latency_factor`` times its best, or on a 429/403/503 answer, which
+    also pauses the host with exponential back-off) and an optional requests-per-second limit. Waiting
+    tickets are granted fair-queuing style to the job that has had the fewest grants per unit of
+    priority, so concurrent jobs share a busy host, and the ``slots`` global cap on grid loads, in
+    proportion to their priority. A job joining later starts level with the least served active job.
+    """
+
+    def __init__(self, slots=SCHEDULER_SLOTS, max_rps=HOST_MAX_RPS, rate_limits=None,
+                 initial_concurrency=HOST_INITIAL_CONCURRENCY, min_concurrency=HOST_MIN_CONCURRENCY,
+                 max_concurrency=HOST_MAX_CONCURRENCY, latency_factor=HOST_LATENCY_FACTOR,
+                 backoff=HOST_BACKOFF_SECONDS, backoff_max=HOST_BACKOFF_MAX_SECONDS,
+                 wait_timeout=SCHEDULER_WAIT_TIMEOUT):
+        self.slots = slots
+        self.max_rps = max_rps
+        self.rate_limits = parse_rate_limits(HOST_RATE_LIMITS) if rate_limits is None else rate_limits
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_factor = latency_factor
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._hosts = {}
+        self._jobs = {}
+        self._waiters = []
+        self._seq = itertools.count()
+        self._grid_running = 0
+
+    @contextmanager
+    def ticket(self, url, job=API_JOB, priority=API_JOB_PRIORITY, grid=True, timeout=None):
+        """
+        Wait for permission to load ``url`` and hold it for the block. ``grid`` loads count against the
+        global slots; plain HTTP fetches pass False. A Selenium ``TimeoutException`` leaving the block is
+        recorded as a timeout.
+        """
+        if priority <= 0:
+            raise ValueError(f"Job priority must be positive, got {priority}")
+        ticket = self._acquire(urlsplit(url).netloc.lower(), job, priority, grid, timeout)
+        try:
+            yield ticket
+        except TimeoutException:
+            ticket.timed_out = True
+            raise
+        finally:
+            self._release(ticket)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "slots": self.slots if self.slots > 0 else None,
+                "grid_running": self._grid_running,
+                "waiting": len(self._waiters),
+                "jobs": {
+                    name: {"priority": job.priority, "running": job.running, "waiting": job.waiting, "completed": job.completed}
+                    for name, job in self._jobs.items()
+                },
+                "hosts": {host: state.stats(now) for host, state in self._hosts.items()},
+            }
+
+    def use_pool_size(self, size):
+        """Cap grid loads at the session pool's ``size``, unless ``slots`` was set explicitly (0 or more)."""
+        with self._cond:
+            if self.slots < 0:
+                self.slots = size
+                self._dispatch()
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _Host(self.rate_limits.get(host, self.max_rps), self.initial_concurrency,
+                                              self.min_concurrency, self.max_concurrency)
+        return state
+
+    def _acquire(self, host, job, priority, grid, timeout):
+        ticket = Ticket(host, job, grid)
+        timeout = self.wait_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            state = self._jobs.get(job)
+            if state is None:
+                state = self._jobs[job] = _Job(priority, min((other.virtual for other in self._jobs.values()), default=0.0))
+            state.priority = priority
+            state.waiting += 1
+            self._waiters.append((next(self._seq), ticket))
+            try:
+                while True:
+                    wake = self._dispatch()
+                    if ticket.granted:
+                        return ticket
+                    now = time.monotonic()
+                    if now >= deadline:
+                        raise SchedulerTimeout(f"No slot for {host} became free within {timeout:.0f} s")
+                    self._cond.wait(min(deadline, wake) - now if wake is not None else deadline - now)
+            finally:
+                if not ticket.granted:
+                    self._waiters = [(seq, waiting) for seq, waiting in self._waiters if waiting is not ticket]
+                    state.waiting -= 1
+                    self._forget_idle(job)
+
+    def _dispatch(self):
+        """Grant every admissible waiter, fairest job first; return when a blocked host can admit again."""
+        now = time.monotonic()
+        wake = None
+        granted = False
+        while True:
+            for entry in sorted(self._waiters, key=self._fairness):
+                ticket = entry[1]
+                if ticket.grid and self.slots > 0 and self._grid_running >= self.slots:
+                    continue
+                host = self._host(ticket.host)
+                if not host.admissible(now):
+                    when = host.wake_time(now)
+                    if when is not None:
+                        wake = when if wake is None else min(wake, when)
+                    continue
+                host.start(now)
+                job = self._jobs[ticket.job]
+                job.running += 1
+                job.waiting -= 1
+                job.virtual += 1 / job.priority
+                self._grid_running += ticket.grid
+                ticket.granted = True
+                ticket.started = now
+                self._waiters.remove(entry)
+                granted = True
+                break
+            else:
+                break
+        if granted:
+            self._cond.notify_all()
+        return wake
+
+    def _fairness(self, entry):
+        seq, ticket = entry
+        return self._jobs[ticket.job].virtual, seq
+
+    def _release(self, ticket):
+        now = time.monotonic()
+        with self._cond:
+            host = self._host(ticket.host)
+            throttles = host.throttled
+            host.observe(now, now - ticket.started, ticket.status, ticket.timed_out, self.latency_factor,
+                         self.backoff, self.backoff_max)
+            if host.throttled > throttles:
+                logger.warning("%s answered %s; backing off for %.0f s, concurrency limit %.1f",
+                               ticket.host, ticket.status, host.backoff_until - now, host.limit)
+            job = self._jobs[ticket.job]
+            job.running -= 1
+            job.completed += 1
+            self._grid_running -= ticket.grid
+            self._forget_idle(ticket.job)
+            self._dispatch()
+            self._cond.notify_all()
+
+    def _forget_idle(self, job):
+        state = self._jobs.get(job)
+        if state is not None and state.running == 0 and state.waiting == 0:
+            del self._jobs[job]
+
+
+host_scheduler = HostScheduler()
@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.core import telemetry
+from app.core.driver import SELENIUM_HUB_URL, get_driver
+from app.core.scheduler import host_scheduler
+
+logger = logging.getLogger("web-scraper")
+
+# Pool size; 0 means "as many sessions as the grid has slots".
+POOL_MAX_SIZE = int(os.getenv("POOL_MAX_SIZE", 0))
+# Used when the grid status endpoint can not be reached (docker-compose runs 3 chrome nodes).
+POOL_DEFAULT_SIZE = int(os.getenv("POOL_DEFAULT_SIZE", 3))
+# Number of sessions opened at startup; -1 means "fill the pool".
+POOL_WARM_SIZE = int(os.getenv("POOL_WARM_SIZE", -1))
+POOL_MAX_USES = int(os.getenv("POOL_MAX_USES", 50))
+POOL_MAX_AGE_MINUTES = float(os.getenv("POOL_MAX_AGE_MINUTES", 30))
+POOL_LEASE_TIMEOUT = float(os.getenv("POOL_LEASE_TIMEOUT", 60))
+# Sessions idle for longer than this are health checked before being leased again.
+POOL_HEALTH_CHECK_IDLE = float(os.getenv("POOL_HEALTH_CHECK_IDLE", 30))
+
+
+class SessionPoolError(Exception):
+    """Raised when the pool is closed or a session can not be leased."""
+
+
+class SessionPoolTimeout(SessionPoolError):
+    """Raised when no session became free within the lease timeout."""
+
+
+def grid_slot_count(hub_url=SELENIUM_HUB_URL, timeout=5):
+    """Return the number of session slots on the grid's UP nodes, or None if unknown."""
+    base_url = hub_url.rstrip("/")
+    if base_url.endswith("/wd/hub"):
+        base_url = base_url[:-len("/wd/hub")]
+    try:
+        with urllib.request.urlopen(f"{base_url}/status", timeout=timeout) as response:
+            payload = json.load(response)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read grid status from %s/status: %s", base_url, e)
+        return None
+    nodes = payload.get("value", {}).get("nodes", [])
+    slots = sum(len(node.get("slots", [])) for node in nodes if node.get("availability", "UP") == "UP")
+    return slots or None
+
+
+class PooledSession:
+    """A grid session owned by the pool, with the bookkeeping needed to recycle it."""
+
+    def __init__(self, driver, profile):
+        self.driver = driver
+        self.profile = profile
+        self.home_handle = driver.current_window_handle
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+        self.uses = 0
+
+
+class SessionPool:
+    """
+    Keeps warm WebDriver sessions on the grid and leases them out one caller at a time.
+
+    Sessions are reset (cookies, storage, extra windows) when they come back, health checked
+    after sitting idle, and recycled after ``max_uses`` leases or ``max_age`` seconds.
+    Each session is opened with a driver profile; idle sessions are kept per profile and share one
+    capacity, so a lease for a profile with no idle session may replace an idle one of another profile.
+    """
+
+    def __init__(self, factory=get_driver, max_size=None, max_uses=POOL_MAX_USES,
+                 max_age=POOL_MAX_AGE_MINUTES * 60, lease_timeout=POOL_LEASE_TIMEOUT,
+                 health_check_idle=POOL_HEALTH_CHECK_IDLE):
+        self._factory = factory
+        self.max_size = max_size or POOL_MAX_SIZE or grid_slot_count() or POOL_DEFAULT_SIZE
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.lease_timeout = lease_timeout
+        self.health_check_idle = health_check_idle
+
+        self._cond = threading.Condition()
+        self._idle = {}
+        self._total = 0
+        self._closed = False
+
+        self._leases = 0
+        self._hits = 0
+        self._misses = 0
+        self._timeouts = 0
+        self._created = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recycled = {}
+        logger.info("Session pool created with %s slots", self.max_size)
+
+    def warm(self, count=None, profile="default"):
+        """Open sessions until ``count`` (default: the whole pool) are idle and ready."""
+        with self._cond:
+            free = self.max_size - self._total
+            wanted = free if count is None or count < 0 else min(count, free)
+            self._total += wanted
+        if wanted <= 0:
+            return 0
+
+        def open_session(_):
+            try:
+                session = self._create_session(profile)
+            except Exception as e:
+                logger.error("Failed to warm a session: %s", e)
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                return 0
+            self._checkin(session)
+            return 1
+
+        with ThreadPoolExecutor(max_workers=wanted) as executor:
+            opened = sum(executor.map(open_session, range(wanted)))
+        logger.info("Session pool warmed with %s/%s sessions", opened, wanted)
+        return opened
+
+    def acquire(self, timeout=None, profile="default"):
+        """Lease a session with the given profile, waiting up to ``timeout`` seconds for one to become free."""
+        with telemetry.timed("driver_acquire", profile=profile):
+            return self._acquire(timeout, profile)
+
+    def _acquire(self, timeout, profile):
+        started = time.monotonic()
+        deadline = started + (self.lease_timeout if timeout is None else timeout)
+        while True:
+            session, evicted = self._checkout(deadline, profile)
+            if evicted is not None:
+                self._retire(evicted, "profile_switch", release_slot=False)
+            hit = session is not None
+            if session is None:
+                try:
+                    session = self._create_session(profile)
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+
+            reason = self._recycle_reason(session)
+            if reason is None and hit and not self._is_healthy(session):
+                reason = "unhealthy"
+            if reason is not None:
+                self._retire(session, reason)
+                continue
+            break
+
+        session.uses += 1
+        waited = time.monotonic() - started
+        with self._cond:
+            self._leases += 1
+            self._hits += hit
+            self._misses += not hit
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return session
+
+    def release(self, session, discard=False, failed=False):
+        """
+        Give a leased session back; it is reset and returned to the idle list, or retired. ``failed`` means
+        the lease ended in an error: the session is discarded unless it passes a health check.
+        """
+        if failed and not discard:
+            discard = not self._is_healthy(session, force=True)
+        if discard or self._closed:
+            self._retire(session, "discarded" if discard else "pool_closed")
+            return
+        reason = self._recycle_reason(session)
+        if reason is not None:
+            self._retire(session, reason)
+            return
+        try:
+            self._reset(session)
+        except Exception as e:
+            logger.warning("Session reset failed, recycling it: %s", e)
+            self._retire(session, "reset_failed")
+            return
+        self._checkin(session)
+
+    @contextmanager
+    def lease(self, timeout=None, profile="default"):
+        """Context manager yielding a leased driver; a session that broke while leased is discarded."""
+        session = self.acquire(timeout, profile)
+        try:
+            yield session.driver
+        except BaseException:
+            self.release(session, failed=True)
+            raise
+        else:
+            self.release(session)
+
+    def close(self):
+        """Quit every idle session; sessions still leased are quit when released."""
+        with self._cond:
+            self._closed = True
+            idle = [session for sessions in self._idle.values() for session in sessions]
+            self._idle = {}
+            self._cond.notify_all()
+        for session in idle:
+            self._retire(session, "pool_closed")
+        logger.info("Session pool closed")
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._cond:
+            leases = self._leases
+            idle = sum(len(sessions) for sessions in self._idle.values())
+            return {
+                "size": self.max_size,
+                "open": self._total,
+                "idle": idle,
+                "idle_by_profile": {profile: len(sessions) for profile, sessions in self._idle.items() if sessions},
+                "in_use": self._total - idle,
+                "leases": leases,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / leases if leases else 0.0,
+                "lease_timeouts": self._timeouts,
+                "lease_wait_avg_ms": self._wait_total / leases * 1000 if leases else 0.0,
+                "lease_wait_max_ms": self._wait_max * 1000,
+                "created": self._created,
+                "recycled": dict(self._recycled),
+            }
+
+    def _checkout(self, deadline, profile):
+        """
+        Pop an idle session of the profile, or reserve a slot for a new one (session None). When the pool
+        is full but another profile has an idle session, that session's slot is taken over and it is
+        returned as ``evicted`` for the caller to quit.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise SessionPoolError("Session pool is closed")
+                if self._idle.get(profile):
+                    return self._idle[profile].pop(), None
+                if self._total < self.max_size:
+                    self._total += 1
+                    return None, None
+                other = next((sessions for sessions in self._idle.values() if sessions), None)
+                if other is not None:
+                    return None, other.popleft()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    telemetry.timeouts.add(1, {"step": "driver_acquire"})
+                    raise SessionPoolTimeout(f"No browser session became free within the lease timeout ({self.max_size} in use)")
+                self._cond.wait(remaining)
+
+    def _checkin(self, session):
+        session.released_at = time.monotonic()
+        with self._cond:
+            if not self._closed:
+                self._idle.setdefault(session.profile, deque()).append(session)
+                self._cond.notify()
+                return
+        self._retire(session, "pool_closed")
+
+    def _create_session(self, profile):
+        driver = self._factory(profile)
+        try:
+            session = PooledSession(driver, profile)
+        except Exception:
+            driver.quit()
+            raise
+        with self._cond:
+            self._created += 1
+        logger.debug("Opened grid session %s", driver.session_id)
+        return session
+
+    def _recycle_reason(self, session):
+        if session.uses >= self.max_uses:
+            return "max_uses"
+        if time.monotonic() - session.created_at >= self.max_age:
+            return "max_age"
+        return None
+
+    def _is_healthy(self, session, force=False):
+        if not force and time.monotonic() - session.released_at < self.health_check_idle:
+            return True
+        try:
+            session.driver.current_window_handle
+            return True
+        except Exception as e:
+            logger.warning("Session %s failed its health check: %s", session.driver.session_id, e)
+            return False
+
+    def _reset(self, session):
+        """Close extra windows and clear cookies and storage so the next lease starts clean."""
+        driver = session.driver
+        handles = driver.window_handles
+        if session.home_handle not in handles:
+            session.home_handle = handles[0]
+        for handle in handles:
+            if handle != session.home_handle:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(session.home_handle)
+        driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+        try:
+            # Clears cookies of every domain, not just the current one.
+            driver.execute("executeCdpCommand", {"cmd": "Network.clearBrowserCookies", "params": {}})
+        except Exception:
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def _retire(self, session, reason, release_slot=True):
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logger.debug("Ignoring error while quitting a retired session: %s", e)
+        with self._cond:
+            if release_slot:
+                self._total -= 1
+            self._recycled[reason] = self._recycled.get(reason, 0) + 1
+            self._cond.notify()
+        logger.debug("Session retired (%s) after %s uses", reason, session.uses)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide session pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+            pool = _pool
+            host_scheduler.use_pool_size(pool.max_size)
+            telemetry.register_gauge("active_sessions", "pool", lambda: pool.stats()["in_use"])
+        return _pool
+
+
+def start_pool(warm_size=POOL_WARM_SIZE):
+    """Create the pool and pre-warm sessions in the background (called at app startup)."""
+    pool = get_pool()
+    threading.Thread(target=pool.warm, args=(warm_size,), name="session-pool-warmup", daemon=True).start()
+    return pool
+
+
+def shutdown_pool():
+    """Close the process-wide pool (called at app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        telemetry.unregister_gauge("active_sessions", "pool")
+        pool.close()
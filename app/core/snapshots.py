@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from app.core import telemetry
+
+logger = logging.getLogger("web-scraper")
+
+# Directory of the snapshot store; empty disables snapshots.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+# "1" to store a PNG screenshot next to each page source.
+SNAPSHOT_SCREENSHOTS = os.getenv("SNAPSHOT_SCREENSHOTS", "0") == "1"
+SNAPSHOT_COMPRESS_LEVEL = int(os.getenv("SNAPSHOT_COMPRESS_LEVEL", 6))
+
+MANIFEST_FILE = "manifest.sqlite"
+OBJECTS_DIR = "objects"
+
+
+def object_path(root, digest):
+    return os.path.join(root, OBJECTS_DIR, digest[:2], digest[2:])
+
+
+def read_object(root, digest):
+    """Decompressed content of a stored object; usable without a SnapshotStore, e.g. in worker processes."""
+    with open(object_path(root, digest), "rb") as f:
+        return zlib.decompress(f.read())
+
+
+class SnapshotStore:
+    """
+    Compressed, content-addressed store of rendered pages, for re-extracting data without a browser.
+
+    Page sources (and optional screenshots) are stored once per distinct content under
+    ``objects/<sha256[:2]>/<sha256[2:]>``, zlib-compressed, so pages that did not change between runs
+    cost nothing extra. ``manifest.sqlite`` maps (run, url) to the stored objects; a run is a crawl id,
+    or ``api-<date>`` for pages opened by WebScraper. Capturing a URL again in the same run replaces
+    its manifest entry.
+    """
+
+    def __init__(self, root, screenshots=SNAPSHOT_SCREENSHOTS, compress_level=SNAPSHOT_COMPRESS_LEVEL):
+        self.root = root
+        self.screenshots = screenshots
+        self.compress_level = compress_level
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+        self._lock = threading.Lock()
+        self._counts = {"captures": 0, "failures": 0, "objects_written": 0, "deduplicated": 0,
+                        "bytes_in": 0, "bytes_stored": 0}
+        self._conn = sqlite3.connect(os.path.join(root, MANIFEST_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots (run TEXT, url TEXT, captured_at TEXT, html TEXT, "
+            "screenshot TEXT, PRIMARY KEY (run, url))"
+        )
+        self._conn.commit()
+
+    def put_object(self, data):
+        """Store ``data`` under its sha256 unless it is already there; returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = object_path(self.root, digest)
+        if os.path.exists(path):
+            with self._lock:
+                self._counts["deduplicated"] += 1
+            return digest
+        compressed = zlib.compress(data, self.compress_level)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name first, so readers never see half an object.
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(compressed)
+        os.replace(temporary, path)
+        with self._lock:
+            self._counts["objects_written"] += 1
+            self._counts["bytes_in"] += len(data)
+            self._counts["bytes_stored"] += len(compressed)
+        return digest
+
+    def put(self, run, url, html, screenshot=None):
+        """Store a page source (str) and optional PNG bytes and record them in the manifest for (run, url)."""
+        html_digest = self.put_object(html.encode("utf-8"))
+        screenshot_digest = self.put_object(screenshot) if screenshot else None
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                               (run, url, datetime.now().isoformat(), html_digest, screenshot_digest))
+            self._conn.commit()
+            self._counts["captures"] += 1
+        return html_digest
+
+    def capture(self, driver, url, run):
+        """
+        Snapshot the page open in ``driver`` (one ``page_source`` call, plus a screenshot when enabled).
+        Failures are logged and counted, never raised: a snapshot must not fail the scrape.
+        """
+        try:
+            with telemetry.timed("snapshot"):
+                html = driver.page_source
+                screenshot = driver.get_screenshot_as_png() if self.screenshots else None
+                return self.put(run, url, html, screenshot)
+        except Exception as e:
+            with self._lock:
+                self._counts["failures"] += 1
+            logger.warning("Snapshot of %s failed: %s", url, e)
+            return None
+
+    def get(self, run, url):
+        """The stored page source of ``url`` in ``run``, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT html FROM snapshots WHERE run = ? AND url = ?", (run, url)).fetchone()
+        return read_object(self.root, row[0]).decode("utf-8") if row else None
+
+    def entries(self, run):
+        """(url, html digest) for every page captured in ``run``."""
+        with self._lock:
+            return self._conn.execute("SELECT url, html FROM snapshots WHERE run = ? ORDER BY url", (run,)).fetchall()
+
+    def runs(self):
+        """{run: number of pages captured}."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT run, count(*) FROM snapshots GROUP BY run ORDER BY run").fetchall())
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts["compression_ratio"] = round(counts["bytes_in"] / counts["bytes_stored"], 2) if counts["bytes_stored"] else 0.0
+        return {"root": self.root, "screenshots": self.screenshots, **counts, "runs": self.runs()}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def api_run():
+    """Manifest run for pages opened by WebScraper: one per day."""
+    return f"api-{datetime.now():%Y-%m-%d}"
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Return the process-wide store under SNAPSHOT_DIR, or None when snapshots are disabled."""
+    global _store
+    if not SNAPSHOT_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore(SNAPSHOT_DIR)
+        return _store
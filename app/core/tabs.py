@@ -0,0 +1,256 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from app.core.logging_config import bind_log_context
+
+logger = logging.getLogger("web-scraper")
+
+# Tabs opened in one browser session when multiplexing.
+TABS_PER_SESSION = int(os.getenv("TABS_PER_SESSION", 4))
+# Seconds a tab may take to start showing the new document after a navigation.
+TAB_NAVIGATION_TIMEOUT = float(os.getenv("TAB_NAVIGATION_TIMEOUT", 30))
+TAB_POLL_INTERVAL = 0.05
+
+# Marks the document shown before a navigation, so the tab can tell when the new one has replaced it.
+MARK_DOCUMENT_SCRIPT = "window.__scraperNavigation = arguments[0];"
+NEW_DOCUMENT_SCRIPT = "return window.__scraperNavigation !== arguments[0] && document.readyState !== 'loading';"
+
+
+class _FairLock:
+    """Lock granted in request order, so every tab gets its turn on the session and none is starved."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next = 0
+        self._serving = 0
+
+    def __enter__(self):
+        with self._cond:
+            turn = self._next
+            self._next += 1
+            while turn != self._serving:
+                self._cond.wait()
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._serving += 1
+            self._cond.notify_all()
+        return False
+
+
+class _TabElement:
+    """A WebElement found in one tab; like the tab, every call switches to it first."""
+
+    def __init__(self, tab, element):
+        self._tab = tab
+        self._element = element
+
+    def __getattr__(self, name):
+        return self._tab._wrap(self._tab._call(getattr, self._element, name))
+
+
+class Tab:
+    """
+    WebDriver stand-in bound to one tab (window handle) of a TabSession.
+
+    Every command switches the session to this tab first, under the session's fair lock, so code written
+    for a plain driver (WebScraper, the menu crawler, readiness waits) runs unchanged, one thread per tab.
+    ``get`` starts the navigation and then waits for the new document without holding the lock, so the
+    other tabs keep being served while this page loads. Elements found in the tab are wrapped the same way.
+    """
+
+    def __init__(self, session, handle, index):
+        self._session = session
+        self.handle = handle
+        self.index = index
+        self.pages = 0
+
+    def get(self, url):
+        token = uuid.uuid4().hex
+        self._call(self._session.driver.execute_script, MARK_DOCUMENT_SCRIPT, token)
+        self._call(self._session.driver.get, url)
+        deadline = time.monotonic() + self._session.navigation_timeout
+        while True:
+            try:
+                if self._call(self._session.driver.execute_script, NEW_DOCUMENT_SCRIPT, token):
+                    break
+            except WebDriverException as e:
+                # The old document can go away between the switch and the script.
+                logger.debug("Navigation poll failed in tab %s: %s", self.index, e)
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Tab {self.index} did not show {url} within "
+                                       f"{self._session.navigation_timeout:.0f} s")
+            time.sleep(TAB_POLL_INTERVAL)
+        self.pages += 1
+        self._session._page_done()
+
+    def quit(self):
+        """Tabs belong to their session; quitting one only closes it with the session."""
+
+    def __getattr__(self, name):
+        return self._wrap(self._call(getattr, self._session.driver, name))
+
+    def _call(self, fn, *args, **kwargs):
+        session = self._session
+        with session._lock:
+            if session._current != self.handle:
+                session.driver.switch_to.window(self.handle)
+                session._current = self.handle
+                session._switches += 1
+            return fn(*args, **kwargs)
+
+    def _wrap(self, value):
+        if callable(value):
+            return lambda *args, **kwargs: self._wrap(self._call(value, *args, **kwargs))
+        if isinstance(value, list):
+            return [self._wrap(item) if _is_element(item) else item for item in value]
+        return _TabElement(self, value) if _is_element(value) else value
+
+
+def _is_element(value):
+    return hasattr(value, "get_attribute") and hasattr(value, "is_displayed")
+
+
+class TabStats:
+    """Throughput of closed tab sessions by tab count, to compare N tabs with one tab per session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_tabs = {}
+
+    def record(self, tabs, pages, seconds):
+        with self._lock:
+            entry = self._by_tabs.setdefault(tabs, {"sessions": 0, "pages": 0, "seconds": 0.0})
+            entry["sessions"] += 1
+            entry["pages"] += pages
+            entry["seconds"] += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                tabs: {
+                    **entry,
+                    "pages_per_sec_per_session": entry["pages"] / entry["seconds"] if entry["seconds"] else 0.0,
+                }
+                for tabs, entry in sorted(self._by_tabs.items())
+            }
+
+
+tab_stats = TabStats()
+
+
+class TabSession:
+    """
+    Drives ``tabs`` tabs of one browser session concurrently, to load several pages per grid slot.
+
+    The first tab is the session's current window; the others are opened with ``new_window("tab")`` and
+    closed again by ``close``. Use a profile whose page load strategy is "none" (e.g. "tabs"), so ``get``
+    returns as soon as a navigation starts and a slow page never holds the session. ``map`` runs a function
+    over items with one thread per tab and yields results as each item finishes.
+    """
+
+    def __init__(self, driver, tabs=TABS_PER_SESSION, navigation_timeout=TAB_NAVIGATION_TIMEOUT):
+        if tabs < 1:
+            raise ValueError(f"A tab session needs at least one tab, got {tabs}")
+        self.driver = driver
+        self.navigation_timeout = navigation_timeout
+        self._lock = _FairLock()
+        self._stats_lock = threading.Lock()
+        self._pages = 0
+        self._switches = 0
+        self._started = time.monotonic()
+        handles = [driver.current_window_handle]
+        for _ in range(tabs - 1):
+            driver.switch_to.new_window("tab")
+            handles.append(driver.current_window_handle)
+        self._current = handles[-1]
+        self.tabs = [Tab(self, handle, index) for index, handle in enumerate(handles)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def map(self, fn, items):
+        """
+        Run ``fn(tab, item)`` for every item, one thread per tab, each tab taking the next item as soon as
+        it is free. Yields ``(item, result, error)`` in completion order; ``error`` is the exception raised
+        by ``fn``, if any. Stopping the iteration early lets the running items finish and starts no more.
+        """
+        items = iter(items)
+        items_lock = threading.Lock()
+        stop = threading.Event()
+        done = queue.Queue()
+
+        def work(tab):
+            try:
+                while not stop.is_set():
+                    with items_lock:
+                        item = next(items, _END)
+                    if item is _END:
+                        return
+                    try:
+                        done.put((item, fn(tab, item), None))
+                    except Exception as e:
+                        done.put((item, None, e))
+            finally:
+                done.put(_END)
+
+        workers = [threading.Thread(target=bind_log_context(work), args=(tab,), name=f"tab-{tab.index}", daemon=True)
+                   for tab in self.tabs]
+        for worker in workers:
+            worker.start()
+        running = len(workers)
+        try:
+            while running:
+                entry = done.get()
+                if entry is _END:
+                    running -= 1
+                    continue
+                yield entry
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def stats(self):
+        with self._stats_lock:
+            seconds = time.monotonic() - self._started
+            return {
+                "tabs": len(self.tabs),
+                "pages": self._pages,
+                "seconds": round(seconds, 3),
+                "pages_per_sec": round(self._pages / seconds, 2) if seconds else 0.0,
+                "pages_per_tab": [tab.pages for tab in self.tabs],
+                "tab_switches": self._switches,
+            }
+
+    def close(self):
+        """Close the extra tabs, go back to the first one and record the session's throughput."""
+        stats = self.stats()
+        try:
+            with self._lock:
+                for tab in self.tabs[1:]:
+                    self.driver.switch_to.window(tab.handle)
+                    self.driver.close()
+                self.driver.switch_to.window(self.tabs[0].handle)
+                self._current = self.tabs[0].handle
+        except WebDriverException as e:
+            logger.warning("Could not close the extra tabs: %s", e)
+        tab_stats.record(stats["tabs"], stats["pages"], stats["seconds"])
+        logger.info("Tab session closed: %s", stats)
+
+    def _page_done(self):
+        with self._stats_lock:
+            self._pages += 1
+
+
+_END = object()
@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from opentelemetry import metrics, trace
+from opentelemetry.metrics import Observation
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger("web-scraper")
+
+# Off by default so local runs and tests need no collector; docker-compose's otel-collector listens on 4317.
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "0") == "1"
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://otel-collector:4317")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "super-scraper")
+# Fraction of traces (one per page or API request) that are recorded; metrics always count everything.
+OTEL_TRACE_SAMPLE_RATE = float(os.getenv("OTEL_TRACE_SAMPLE_RATE", 0.05))
+OTEL_METRIC_EXPORT_INTERVAL = float(os.getenv("OTEL_METRIC_EXPORT_INTERVAL", 15))
+
+# Bucket boundaries in seconds, from a cached DOM read up to a slow page load.
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# Instruments come from the global providers. Until setup_telemetry() installs the SDK they are
+# no-ops, so instrumented code costs a function call and nothing is exported.
+tracer = trace.get_tracer("super_scraper")
+meter = metrics.get_meter("super_scraper")
+
+step_duration = meter.create_histogram(
+    "scraper.step.duration", unit="s",
+    description="Duration of a scraping step (driver_acquire, page_load, wait, extract, neo4j_tx, checkpoint)")
+pages = meter.create_counter("scraper.pages", unit="{page}", description="Pages loaded")
+timeouts = meter.create_counter("scraper.timeouts", unit="{timeout}", description="Steps that timed out")
+retries = meter.create_counter("scraper.retries", unit="{retry}", description="Operations retried")
+
+_gauge_lock = threading.Lock()
+_gauge_sources = {"frontier_size": {}, "active_sessions": {}}
+
+
+def register_gauge(name, source, fn):
+    """Report ``fn()`` as the ``name`` gauge ("frontier_size" or "active_sessions") for ``source``."""
+    with _gauge_lock:
+        _gauge_sources[name][source] = fn
+
+
+def unregister_gauge(name, source):
+    with _gauge_lock:
+        _gauge_sources[name].pop(source, None)
+
+
+def _observe(name):
+    def callback(_options):
+        with _gauge_lock:
+            sources = list(_gauge_sources[name].items())
+        observations = []
+        for source, fn in sources:
+            try:
+                observations.append(Observation(fn(), {"source": source}))
+            except Exception as e:
+                logger.debug("Could not read gauge %s from %s: %s", name, source, e)
+        return observations
+    return callback
+
+
+meter.create_observable_gauge("scraper.frontier.size", [_observe("frontier_size")], unit="{category}",
+                              description="Categories waiting in a crawl frontier")
+meter.create_observable_gauge("scraper.sessions.active", [_observe("active_sessions")], unit="{session}",
+                              description="Browser sessions currently in use")
+
+
+@contextmanager
+def timed(step, **attributes):
+    """
+    Run the block in a ``scraper.<step>`` span and record its duration in ``scraper.step.duration``.
+
+    ``attributes`` go on both; keep them low-cardinality (profile, engine), put URLs on the span only.
+    """
+    started = time.perf_counter()
+    with tracer.start_as_current_span(f"scraper.{step}", attributes=attributes) as span:
+        try:
+            yield span
+        finally:
+            step_duration.record(time.perf_counter() - started, {"step": step, **attributes})
+
+
+def load_page(driver, url):
+    """``driver.get(url)`` as a ``page_load`` step; counts the page, or the timeout."""
+    profile = getattr(driver, "scraper_profile", "default")
+    try:
+        with timed("page_load", engine="browser", profile=profile) as span:
+            span.set_attribute("url", url)
+            driver.get(url)
+    except TimeoutException:
+        timeouts.add(1, {"step": "page_load"})
+        raise
+    pages.add(1, {"engine": "browser", "profile": profile})
+
+
+_setup_lock = threading.Lock()
+_providers = None
+
+
+def setup_telemetry(span_exporter=None, metric_reader=None):
+    """
+    Install the SDK providers exporting traces and metrics over OTLP; a no-op unless OTEL_ENABLED=1.
+    ``span_exporter`` and ``metric_reader`` replace the OTLP ones (tests pass in-memory exporters).
+    """
+    global _providers
+    if not OTEL_ENABLED:
+        return
+    with _setup_lock:
+        if _providers is not None:
+            return
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+        from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        resource = Resource.create({"service.name": OTEL_SERVICE_NAME})
+        tracer_provider = TracerProvider(resource=resource, sampler=ParentBased(TraceIdRatioBased(OTEL_TRACE_SAMPLE_RATE)))
+        if span_exporter is None:
+            span_exporter = OTLPSpanExporter(endpoint=OTEL_EXPORTER_OTLP_ENDPOINT, insecure=True)
+        tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        if metric_reader is None:
+            metric_reader = PeriodicExportingMetricReader(
+                OTLPMetricExporter(endpoint=OTEL_EXPORTER_OTLP_ENDPOINT, insecure=True),
+                export_interval_millis=OTEL_METRIC_EXPORT_INTERVAL * 1000,
+            )
+        meter_provider = MeterProvider(
+            resource=resource,
+            metric_readers=[metric_reader],
+            views=[View(instrument_name="scraper.step.duration",
+                        aggregation=ExplicitBucketHistogramAggregation(DURATION_BUCKETS))],
+        )
+        trace.set_tracer_provider(tracer_provider)
+        metrics.set_meter_provider(meter_provider)
+        _providers = (tracer_provider, meter_provider)
+        logger.info("Telemetry exported to %s (trace sample rate %s)",
+                    OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_TRACE_SAMPLE_RATE)
+
+
+def shutdown_telemetry():
+    """Flush pending spans and metrics (called at app shutdown)."""
+    global _providers
+    with _setup_lock:
+        providers, _providers = _providers, None
+    if providers is not None:
+        for provider in providers:
+            provider.shutdown()
@@ -1,14 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers import scraper
 from app.core.logging_config import setup_logging
+from app.core.session_pool import start_pool, shutdown_pool
+from app.core.executor import get_executor, shutdown_executor
+from app.core.result_cache import result_cache
+from app.core.telemetry import setup_telemetry, shutdown_telemetry
 
 setup_logging()
+setup_telemetry()
 
-app = FastAPI(title="Web Scraper API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_pool()
+    get_executor()
+    yield
+    shutdown_executor()
+    shutdown_pool()
+    result_cache.close()
+    shutdown_telemetry()
+
+app = FastAPI(title="Web Scraper API", version="1.0.0", lifespan=lifespan)
 
 app.include_router(scraper.router)
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
-
@@ -1,38 +1,336 @@
-from fastapi import APIRouter
-from app.tasks.workflows import scrape_titles, scrape_with_click
-from pydantic import BaseModel
-from app.utils.scraper_helpers import open_page, extract_title
+import asyncio
+import json
+import queue
+import threading
+import uuid
+from functools import partial
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.tasks.workflows import scrape_titles, scrape_with_click, scrape_page_title, scrape_titles_in_tabs
+from pydantic import BaseModel, Field, field_validator, model_validator
+from app.utils.http_engine import engine_memory
+from app.utils.readiness import host_readiness
+from app.core.session_pool import get_pool
+from app.core.scheduler import host_scheduler
+from app.core.snapshots import get_snapshot_store
+from app.core.tabs import tab_stats
+from app.core.executor import get_executor, ExecutorSaturated
+from app.core.jobs import jobs
+from app.core.logging_config import log_context
+from app.core.result_cache import result_cache, cache_key
+from app.core.profiles import PROFILES, page_load_stats
+from app.core import telemetry
 router = APIRouter(prefix="/scraper", tags=["Scraper"])
 
-class ScrapeTitlesRequest(BaseModel):
+# Upper bound for the long-poll wait on GET /scraper/jobs/{job_id}.
+MAX_JOB_WAIT_SECONDS = 60
+# Largest number of items accepted by POST /scraper/batch.
+MAX_BATCH_ITEMS = 1000
+# How long a batch item keeps retrying while the executor is saturated by other requests.
+BATCH_ADMISSION_WAIT_SECONDS = 30
+# Most tabs a batch may open in one browser session.
+MAX_BATCH_TABS = 16
+
+class ScrapeRequest(BaseModel):
+    # "sync" answers with the result, "async" answers 202 with a job id to poll.
+    mode: Literal["sync", "async"] = "sync"
+    # Accept a cached result at most this many seconds old (default: the cache TTL).
+    max_age: Optional[float] = None
+    # Always load the page again (identical requests already in flight are still shared).
+    no_cache: bool = False
+    # Browser profile for pages that need Selenium (see GET /scraper/profiles).
+    profile: str = "default"
+
+    @field_validator("profile")
+    @classmethod
+    def check_profile(cls, value):
+        if value not in PROFILES:
+            raise ValueError(f"Unknown profile, expected one of {sorted(PROFILES)}")
+        return value
+
+class ScrapeTitlesRequest(ScrapeRequest):
     url: str
     selector: str
+    # "http" fetches the HTML without a browser, "auto" tries that first and falls back to Selenium.
+    engine: Literal["http", "browser", "auto"] = "browser"
 
-class ScrapeWithClickRequest(BaseModel):
+class ScrapeWithClickRequest(ScrapeRequest):
     url: str
     click_selector: str
     content_selector: str
 
-class ScraperTask(BaseModel):
+class ScraperTask(ScrapeRequest):
     url: str
+    engine: Literal["http", "browser", "auto"] = "browser"
 
-@router.post("/run")
-async def run_scraper(task: ScraperTask):
-    driver = open_page(task.url)
+class BatchItem(BaseModel):
+    url: str
+    selector: str
+
+class BatchScrapeRequest(ScrapeRequest):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+    engine: Literal["http", "browser", "auto"] = "browser"
+    # Items scraped at once (default and upper bound: the executor's worker count).
+    concurrency: Optional[int] = Field(None, ge=1)
+    # Scrape in this many tabs per browser session, with ``concurrency`` sessions; always uses the browser
+    # and bypasses the result cache. The profile defaults to "tabs" and must have page_load_strategy "none".
+    tabs: Optional[int] = Field(None, ge=1, le=MAX_BATCH_TABS)
+
+    @model_validator(mode="after")
+    def check_tabs_profile(self):
+        if self.tabs:
+            if "profile" not in self.model_fields_set:
+                self.profile = "tabs"
+            elif PROFILES[self.profile].page_load_strategy != "none":
+                raise ValueError(f"Tabs need a profile with page_load_strategy 'none', like 'tabs'; "
+                                 f"{self.profile!r} waits for every page load and would block the other tabs")
+        return self
+
+def _scrape_title(url, engine, profile):
     try:
-        title = extract_title(driver)
-        return {"url": task.url, "title": title}
+        title = scrape_page_title(url, engine, profile)
+        return {"url": url, "title": title}
     except Exception as e:
         return {"message": "Error during scraping", "details": str(e)}
-    finally:
-        driver.quit()
+
+def _scrape_titles(url, selector, engine, profile):
+    return {"titles": scrape_titles(url, selector, engine, profile)}
+
+def _scrape_with_click(url, click_selector, content_selector, profile):
+    return {"content": scrape_with_click(url, click_selector, content_selector, profile)}
+
+async def _dispatch(kind, task, fn, *args, cacheable=None):
+    """
+    Run blocking scrape work on the bounded executor, inline or as a background job. Results go
+    through the result cache, and identical requests in flight share one page load. The scrape logs
+    under the request's job id, which async mode also returns.
+    """
+    job_id = uuid.uuid4().hex
+    key = cache_key(kind, *args)
+    try:
+        with log_context(job_id=job_id):
+            future = await result_cache.get_or_start(
+                key,
+                lambda: get_executor().submit(fn, *args),
+                max_age=task.max_age,
+                no_cache=task.no_cache,
+                cacheable=cacheable,
+                owner=job_id,
+            )
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    if task.mode == "async":
+        # Created before the loop runs again, so the executor's "running" callback always finds the job.
+        # A request that joined another one's scrape follows that scrape's status.
+        owner = result_cache.owner(key)
+        job = jobs.create(kind, future, job_id, follows=owner if owner != job_id else None)
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return await future
+
+@router.post("/run")
+async def run_scraper(task: ScraperTask):
+    return await _dispatch("run", task, _scrape_title, task.url, task.engine, task.profile, cacheable=lambda result: "title" in result)
 
 @router.post("/titles")
 async def get_titles(task: ScrapeTitlesRequest):
     """Endpoint to scrape titles."""
-    return {"titles": scrape_titles(task.url, task.selector)}
+    return await _dispatch("titles", task, _scrape_titles, task.url, task.selector, task.engine, task.profile)
 
 @router.post("/with-click")
 async def get_content_with_click(task: ScrapeWithClickRequest):
     """Endpoint to scrape content after clicking an element."""
-    return {"content": scrape_with_click(task.url, task.click_selector, task.content_selector)}
\ No newline at end of file
+    return await _dispatch("with-click", task, _scrape_with_click, task.url, task.click_selector, task.content_selector, task.profile)
+
+async def _scrape_batch_item(index, item, task, batch_id):
+    """Scrape one batch item through the result cache; errors are returned inline, not raised."""
+    args = (item.url, item.selector, task.engine, task.profile)
+    deadline = asyncio.get_running_loop().time() + BATCH_ADMISSION_WAIT_SECONDS
+    while True:
+        try:
+            with log_context(job_id=batch_id):
+                future = await result_cache.get_or_start(
+                    cache_key("titles", *args),
+                    lambda: get_executor().submit(_scrape_titles, *args),
+                    max_age=task.max_age,
+                    no_cache=task.no_cache,
+                )
+            break
+        except ExecutorSaturated as e:
+            # Other requests hold the queue; wait for room rather than failing the item.
+            if asyncio.get_running_loop().time() >= deadline:
+                return {"index": index, "url": item.url, "error": str(e)}
+            telemetry.retries.add(1, {"operation": "batch_admission"})
+            await asyncio.sleep(0.5)
+    try:
+        return {"index": index, "url": item.url, **await future}
+    except Exception as e:
+        return {"index": index, "url": item.url, "error": str(e)}
+
+async def _stream_batch(task):
+    """
+    Yield one NDJSON line per item in completion order, keeping at most ``concurrency`` items in
+    flight. Closing the stream (e.g. the client disconnecting) cancels the items not finished yet;
+    scrapes still waiting for a worker are dropped, ones already on a browser run to completion.
+    """
+    concurrency = min(task.concurrency or get_executor().max_workers, get_executor().max_workers)
+    items = enumerate(task.items)
+    running = set()
+    # Every item of the batch logs under one job id
+    batch_id = uuid.uuid4().hex
+
+    def start_next():
+        for index, item in items:
+            running.add(asyncio.ensure_future(_scrape_batch_item(index, item, task, batch_id)))
+            return
+
+    for _ in range(concurrency):
+        start_next()
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                running.discard(finished)
+                start_next()
+                yield json.dumps(finished.result()) + "\n"
+    finally:
+        for pending in running:
+            pending.cancel()
+
+def _scrape_batch_tabs(pending, stop, emit, profile, tabs):
+    """Executor job: scrape batch items from ``pending`` in the tabs of one pooled session until none are left."""
+    def items():
+        while not stop.is_set():
+            try:
+                index, item = pending.get_nowait()
+            except queue.Empty:
+                return
+            yield (index, item.url), item.url, item.selector
+
+    try:
+        for (index, url), titles, error in scrape_titles_in_tabs(items(), profile, tabs):
+            emit({"index": index, "url": url, "error": str(error)} if error else
+                 {"index": index, "url": url, "titles": titles})
+    finally:
+        emit(None)
+
+async def _start_batch_tabs(task, pending, stop, emit):
+    """
+    Submit one tab session job per session. While the executor is saturated by other requests, wait for
+    room like other batch items; returns the futures and, if none could start, the admission error.
+    """
+    executor = get_executor()
+    sessions = min(task.concurrency or executor.max_workers, executor.max_workers, len(task.items))
+    futures = []
+    # Every session of the batch logs under one job id
+    batch_id = uuid.uuid4().hex
+    deadline = asyncio.get_running_loop().time() + BATCH_ADMISSION_WAIT_SECONDS
+    while len(futures) < sessions:
+        try:
+            with log_context(job_id=batch_id):
+                futures.append(executor.submit(_scrape_batch_tabs, pending, stop, emit, task.profile, task.tabs))
+        except ExecutorSaturated as e:
+            if futures:
+                break
+            if asyncio.get_running_loop().time() >= deadline:
+                return futures, e
+            telemetry.retries.add(1, {"operation": "batch_admission"})
+            await asyncio.sleep(0.5)
+    return futures, None
+
+async def _stream_batch_tabs(task):
+    """
+    Yield one NDJSON line per item as the tab sessions finish them. The sessions are only started once the
+    stream is read, and closing it stops them from taking new items. Items left over when every session has
+    ended (e.g. none could be admitted or open a browser) are reported as errors.
+    """
+    results = asyncio.Queue()
+    pending = queue.SimpleQueue()
+    for entry in enumerate(task.items):
+        pending.put(entry)
+    stop = threading.Event()
+    emit = partial(asyncio.get_running_loop().call_soon_threadsafe, results.put_nowait)
+    try:
+        futures, admission_error = await _start_batch_tabs(task, pending, stop, emit)
+        running = len(futures)
+        while running:
+            line = await results.get()
+            if line is None:
+                running -= 1
+                continue
+            yield json.dumps(line) + "\n"
+        errors = [str(e) for e in await asyncio.gather(*futures, return_exceptions=True) if isinstance(e, Exception)]
+        if admission_error is not None:
+            errors.append(str(admission_error))
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except queue.Empty:
+                break
+            yield json.dumps({"index": index, "url": item.url, "error": errors[0] if errors else "Not scraped"}) + "\n"
+    finally:
+        stop.set()
+
+@router.post("/batch")
+async def scrape_batch(task: BatchScrapeRequest):
+    """Endpoint to scrape titles from many pages, streaming each result as NDJSON as soon as it is ready."""
+    if task.mode == "async":
+        raise HTTPException(status_code=422, detail="Batch results are streamed; mode 'async' is not supported")
+    if task.tabs:
+        if task.engine == "http":
+            raise HTTPException(status_code=422, detail="Tabs need the browser; engine 'http' is not supported")
+        return StreamingResponse(_stream_batch_tabs(task), media_type="application/x-ndjson")
+    return StreamingResponse(_stream_batch(task), media_type="application/x-ndjson")
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Endpoint to poll an async job; ``wait`` long-polls for up to that many seconds."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await jobs.wait(job, min(max(wait, 0), MAX_JOB_WAIT_SECONDS))
+    return job.to_dict()
+
+@router.get("/pool")
+async def get_pool_stats():
+    """Endpoint to inspect the browser session pool and the scrape executor."""
+    return {**get_pool().stats(), "executor": get_executor().stats()}
+
+@router.get("/hosts")
+async def get_host_stats():
+    """Endpoint to inspect per-host concurrency limits, request rates and back-off, and the jobs sharing them."""
+    return host_scheduler.stats()
+
+@router.get("/tabs")
+async def get_tab_stats():
+    """Endpoint to compare pages/sec per browser session by number of tabs, over the tab sessions closed so far."""
+    return tab_stats.stats()
+
+@router.get("/snapshots")
+async def get_snapshot_stats():
+    """Endpoint to inspect the page snapshot store: runs, pages captured and bytes saved by compression."""
+    store = get_snapshot_store()
+    if store is None:
+        return {"enabled": False}
+    return {"enabled": True, **store.stats()}
+
+@router.get("/engines")
+async def get_engine_stats():
+    """Endpoint to inspect which engine (http or browser) each host is served with in auto mode."""
+    return engine_memory.stats()
+
+@router.get("/readiness")
+async def get_readiness_stats():
+    """Endpoint to inspect learned page-ready times, timeouts and poll intervals per host."""
+    return host_readiness.stats()
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Endpoint to inspect result cache hits, misses and coalesced requests."""
+    return result_cache.stats()
+
+@router.get("/profiles")
+async def get_profiles():
+    """Endpoint to list driver profiles with their average bytes transferred and load time per page."""
+    stats = page_load_stats.stats()
+    return {name: {**profile.model_dump(), "pages": stats.get(name)} for name, profile in PROFILES.items()}
@@ -3,34 +3,79 @@ import time
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from app.core.driver import get_driver
-from selenium.webdriver.support.ui import WebDriverWait
+from app.core import telemetry
+from app.core.logging_config import OperationLog
+from app.core.session_pool import get_pool
+from app.core.scheduler import API_JOB, API_JOB_PRIORITY, host_scheduler
+from app.core.profiles import page_load_stats
+from app.core.snapshots import api_run, get_snapshot_store
+from app.core.tabs import tab_stats
+from app.utils.dom_extract import bulk_extract
+from app.utils.readiness import wait_until_ready, DocumentReady, LocatorVisible
 
 logger = logging.getLogger("web-scraper")
 
 
 class WebScraper:
-    def __init__(self, db_path='menu_data.db'):
-        self.driver = get_driver()
+    def __init__(self, db_path='menu_data.db', driver=None, profile="default", job=API_JOB, priority=API_JOB_PRIORITY,
+                 snapshots=None, snapshot_run=None):
+        """
+        Use the given driver, or lease a warm session with the given driver profile from the pool
+        when none is passed. The session is leased on first use (inside the host scheduler ticket of the
+        first ``open_page``) and goes back to the pool on ``quit()``, which records it as a one-tab session in
+        ``tab_stats``. Used as a context manager, it quits on exit; if the block raised, the session is
+        discarded unless it passes a health check. Page loads are scheduled
+        per host under ``job`` with ``priority`` (see ``app.core.scheduler``). Opened pages are saved to
+        the ``snapshots`` store (default: the one under SNAPSHOT_DIR, if set) under ``snapshot_run``
+        (default: ``api-<date>``).
+        """
+        self.job = job
+        self.priority = priority
+        self.snapshots = snapshots if snapshots is not None else get_snapshot_store()
+        self.snapshot_run = snapshot_run
+        self.profile = profile
+        self._session = None
+        self._driver = driver
+        self._leased_at = None
+        self._pages = 0
         self.db_path = db_path
 
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._session = get_pool().acquire(profile=self.profile)
+            self._driver = self._session.driver
+            self._leased_at = time.monotonic()
+            self._pages = 0
+        return self._driver
+
     def scrape_and_save_menu(self, worker_function,locator, is_loaded_locator, is_leaf, wait_time=0.5, initial_visited_categories=None, initial_located_categories=None):
         """
         Menü yapısını tarar ve bir dosyaya kaydeder.
         """
         worker_function(self.driver, locator, is_loaded_locator, is_leaf, wait_time, initial_visited_categories, initial_located_categories)
 
-    def open_page(self, url, locator: tuple, definition: str, wait_time=3):
-        """Open a URL in the browser and verify if the expected element is visible."""
-        logger.info(f"Operation: {definition}")
-        logger.info(f"Opening URL: {url}")
-        self.driver.get(url)
-        time.sleep(wait_time)
-        try:
-            self.check_element(locator, definition=f"Check element after opening URL: {url}")
-            logger.info("Page loaded successfully and element is present")
-        except TimeoutException:
-            logger.warning(f"Page loaded but the expected element was not found. Definition: {definition}")
+    def open_page(self, url, locator: tuple, definition: str, wait_time=None):
+        """
+        Open a URL in the browser and wait until the document is interactive and the expected element
+        is visible. ``wait_time`` caps the wait; by default it adapts to how fast this host usually is.
+        """
+        logger.info("Operation: %s", definition)
+        logger.info("Opening URL: %s", url)
+        with host_scheduler.ticket(url, job=self.job, priority=self.priority) as ticket:
+            driver = self.driver
+            ticket.loading()
+            telemetry.load_page(driver, url)
+            result = wait_until_ready(driver, [DocumentReady("interactive"), LocatorVisible(locator)],
+                                      timeout=wait_time, definition=definition)
+            ticket.record(page_load_stats.record_load(driver))
+        self._pages += 1
+        if result:
+            logger.info("Page loaded successfully and element is present (%.0f ms)", result.elapsed * 1000)
+        else:
+            logger.warning("Page loaded but the expected element was not found. Definition: %s", definition)
+        if self.snapshots is not None:
+            self.snapshots.capture(self.driver, url, self.snapshot_run or api_run())
 
 
     def select_multiple(self, locator: tuple, definition: str):
@@ -41,16 +86,18 @@ class WebScraper:
         :param definition: A string describing the operation
         :return: A list of WebElements for the matching elements
         """
-        logger.info(f"Operation: {definition}")
+        logger.info("Operation: %s", definition)
         by, value = locator
-        logger.info(f"Finding all elements matching locator {by}: {value}")
+        logger.info("Finding all elements matching locator %s: %s", by, value)
 
         try:
             # Ana elementleri bul
             elements = self.driver.find_elements(by, value)
-            logger.info(f"Found {len(elements)} elements matching locator {by}: {value}")
+            logger.info("Found %s elements matching locator %s: %s", len(elements), by, value)
 
             result_elements = []
+            # Per-parent lines are sampled; the counts of every outcome are logged once at the end
+            log = OperationLog(logger, definition or "select_multiple")
             for parent_element in elements:
                 try:
                     # Alt elementleri bekle ve bul
@@ -58,60 +105,55 @@ class WebScraper:
                         EC.presence_of_element_located((by, value))
                     )
                     result_elements.append(child_element)
-                    logger.info(f"Child element found for parent: {parent_element}")
+                    log.element("found", logging.DEBUG, "Child element found for parent: %s", parent_element)
                 except TimeoutException:
-                    logger.warning(f"Timeout: Child elements might not have loaded before selection for parent: {parent_element}")
+                    log.element("timeout", logging.WARNING, "Timeout: Child elements might not have loaded before selection for parent: %s", parent_element)
                 except NoSuchElementException:
-                    logger.warning(f"NoSuchElement: Child elements might not have loaded before selection for parent: {parent_element}")
+                    log.element("missing", logging.WARNING, "NoSuchElement: Child elements might not have loaded before selection for parent: %s", parent_element)
                 except Exception as e:
-                    logger.error(f"An unexpected error occurred while finding child elements: {e}")
+                    log.element("error", logging.ERROR, "An unexpected error occurred while finding child elements: %s", e)
+            log.summary()
 
             return result_elements
         except Exception as e:
-            logger.warning(f"Failed to select multiple elements: {e}. Definition: {definition}")
+            logger.warning("Failed to select multiple elements: %s. Definition: %s", e, definition)
             return []
 
     def input_text(self, locator: tuple, text: str, definition: str, wait_time=5):
         """Wait for an input field to be visible and input text into it."""
-        logger.info(f"Operation: {definition}")
+        logger.info("Operation: %s", definition)
         by, value = locator
-        logger.info(f"Preparing to input text into element with {by}: {value}")
+        logger.info("Preparing to input text into element with %s: %s", by, value)
         try:
             element = WebDriverWait(self.driver, wait_time).until(
                 EC.visibility_of_element_located(locator)
             )
             element.clear()
             element.send_keys(text)
-            logger.info(f"Successfully input text: '{text}' into element with {by}: {value}")
+            logger.info("Successfully input text: '%s' into element with %s: %s", text, by, value)
         except TimeoutException:
-            logger.warning(f"Element not visible within {wait_time} seconds: {by} = {value}. Skipping input. Definition: {definition}")
+            logger.warning("Element not visible within %s seconds: %s = %s. Skipping input. Definition: %s", wait_time, by, value, definition)
         except Exception as e:
-            logger.error(f"An unexpected error occurred while inputting text: {e}. Definition: {definition}")
+            logger.error("An unexpected error occurred while inputting text: %s. Definition: %s", e, definition)
 
     def check_element(self, locator: tuple, definition: str, wait_time=5):
-        """Explicit wait ile elementi kontrol et."""
-        logger.info(f"Operation: {definition}")
+        """Explicit wait ile elementi kontrol et (varlık ve görünürlük tek bir poll ile)."""
+        logger.info("Operation: %s", definition)
         by, value = locator
-        logger.info(f"Checking for element with {by}: {value}")
-        try:
-            WebDriverWait(self.driver, wait_time).until(
-                EC.presence_of_element_located(locator)
-            )
-            WebDriverWait(self.driver, wait_time).until(
-                EC.visibility_of_element_located(locator)
-            )
-            logger.info("Element found and visible")
+        logger.info("Checking for element with %s: %s", by, value)
+        result = wait_until_ready(self.driver, [LocatorVisible(locator)], timeout=wait_time, definition=definition)
+        if result:
+            logger.info("Element found and visible (%.0f ms)", result.elapsed * 1000)
             return True
-        except TimeoutException:
-            logger.warning(f"Element not found within {wait_time} seconds: {by} = {value}. Definition: {definition}")
-            return False
+        logger.warning("Element not found within %.1f seconds: %s = %s. Definition: %s", result.elapsed, by, value, definition)
+        return False
 
     def click(self, locator: tuple, definition: str, wait_time=5, expected_as_disappear=False):
         """Wait for an element to be clickable and perform a click. If expected_as_disappear is True, 
         repeatedly click until the element disappears or maximum retries are reached."""
-        logger.info(f"Operation: {definition}")
+        logger.info("Operation: %s", definition)
         by, value = locator
-        logger.info(f"Waiting to click element with {by}: {value}")
+        logger.info("Waiting to click element with %s: %s", by, value)
 
         try:
             if expected_as_disappear:
@@ -124,7 +166,7 @@ class WebScraper:
                             EC.element_to_be_clickable(locator)
                         )
                         element.click()
-                        logger.info(f"Click attempt {retries + 1} performed successfully")
+                        logger.info("Click attempt %s performed successfully", retries + 1)
 
                         # Wait for the element to disappear
                         WebDriverWait(self.driver, wait_time).until_not(
@@ -134,9 +176,10 @@ class WebScraper:
                         return  # Exit the function as the element has disappeared
                     except TimeoutException:
                         retries += 1
-                        logger.warning(f"Attempt {retries}: Element did not disappear within {wait_time} seconds.")
+                        telemetry.retries.add(1, {"operation": "click"})
+                        logger.warning("Attempt %s: Element did not disappear within %s seconds.", retries, wait_time)
 
-                logger.error(f"Element did not disappear after {max_retries} attempts: {by} = {value}. Definition: {definition}")
+                logger.error("Element did not disappear after %s attempts: %s = %s. Definition: %s", max_retries, by, value, definition)
             else:
                 element = WebDriverWait(self.driver, wait_time).until(
                     EC.element_to_be_clickable(locator)
@@ -145,42 +188,87 @@ class WebScraper:
                 logger.info("Click action performed successfully")
 
         except TimeoutException:
-            logger.warning(f"Element not clickable within {wait_time} seconds: {by} = {value}. Skipping click. Definition: {definition}")
+            logger.warning("Element not clickable within %s seconds: %s = %s. Skipping click. Definition: %s", wait_time, by, value, definition)
         except Exception as e:
-            logger.error(f"An unexpected error occurred while clicking the element: {e}. Definition: {definition}")
+            logger.error("An unexpected error occurred while clicking the element: %s. Definition: %s", e, definition)
 
     def get_elements(self, locator: tuple, definition: str):
         """Get a list of elements matching the locator."""
-        logger.info(f"Operation: {definition}")
+        logger.info("Operation: %s", definition)
         by, value = locator
-        logger.info(f"Getting elements with {by}: {value}")
+        logger.info("Getting elements with %s: %s", by, value)
         try:
             elements = self.driver.find_elements(by, value)
-            logger.info(f"Found {len(elements)} elements")
+            logger.info("Found %s elements", len(elements))
             return elements
         except Exception as e:
-            logger.warning(f"Failed to get elements: {e}. Definition: {definition}")
+            logger.warning("Failed to get elements: %s. Definition: %s", e, definition)
             return []
 
     def extract_attribute(self, elements, attribute="text", definition: str = ""):
         """Extract an attribute (or text) from a list of elements."""
-        logger.info(f"Operation: {definition}")
-        logger.info(f"Extracting attribute: {attribute}")
+        logger.info("Operation: %s", definition)
+        logger.info("Extracting attribute: %s", attribute)
         extracted = []
+        log = OperationLog(logger, definition or "extract_attribute")
         for element in elements:
             try:
                 value = element.text if attribute == "text" else element.get_attribute(attribute)
                 extracted.append(value)
             except Exception as e:
-                logger.warning(f"Failed to extract attribute: {e}")
+                log.element("failed", logging.WARNING, "Failed to extract attribute: %s", e)
                 extracted.append(None)
+        if log.counts:
+            log.summary(logging.WARNING)
         return extracted
 
-    def quit(self, definition: str = "Quit the browser"):
-        """Close the driver and quit the browser."""
-        logger.info(f"Operation: {definition}")
-        logger.info("Quitting the browser")
-        self.driver.quit()
+    def extract_bulk(self, locator: tuple, fields=("text",), definition: str = "", visible_only=False):
+        """
+        Extract several fields from every element matching a locator in one round trip.
+
+        :param locator: Tuple containing the locator strategy and value
+        :param fields: Field names, e.g. ("text", "href", "visible", "enabled")
+        :param definition: A string describing the operation
+        :param visible_only: Drop rows for elements that are not displayed
+        :return: A list of dicts, one per element, keyed by field name
+        """
+        logger.info("Operation: %s", definition)
+        by, value = locator
+        fields = list(fields)
+        wanted = fields + ["visible"] if visible_only and "visible" not in fields else fields
+        try:
+            rows = bulk_extract(self.driver, locator, wanted)
+        except Exception as e:
+            logger.warning("Failed to extract fields: %s. Definition: %s", e, definition)
+            return []
+        if visible_only:
+            rows = [row for row in rows if row.get("visible")]
+            if wanted is not fields:
+                for row in rows:
+                    del row["visible"]
+        logger.info("Extracted %s from %s elements matching %s: %s", fields, len(rows), by, value)
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        self.quit(failed=exc_type is not None)
+
+    def quit(self, definition: str = "Quit the browser", failed=False):
+        """
+        Return a leased session to the pool, or quit a driver that was passed in. With ``failed`` (the work
+        ended in an error) the pool discards the session unless it passes a health check.
+        """
+        logger.info("Operation: %s", definition)
+        if self._session is not None:
+            logger.info("Returning the browser session to the pool")
+            get_pool().release(self._session, failed=failed)
+            tab_stats.record(1, self._pages, time.monotonic() - self._leased_at)
+            self._session = self._driver = None
+        elif self._driver is not None:
+            logger.info("Quitting the browser")
+            self._driver.quit()
 
         
     def close(self):
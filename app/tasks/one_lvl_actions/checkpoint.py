@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+from app.tasks.one_lvl_actions.visited_index import VISITED_SNAPSHOT_SUFFIXES, MemoryVisitedIndex, open_visited_index
+
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{6})\.jsonl?$")
+SEGMENT_PATTERN = re.compile(r"^journal-(\d{6})\.jsonl$")
+COMPACT_EVERY = 50000  # Journal records per segment before it is folded into the snapshot
+
+
+def _segment_name(seq):
+    return f"journal-{seq:06d}.jsonl"
+
+
+def _snapshot_name(through):
+    return f"snapshot-{through:06d}.jsonl"
+
+
+def _legacy_snapshot_name(through):
+    # One JSON document with "visited" and "pending" lists, written before snapshots were streamed
+    return f"snapshot-{through:06d}.json"
+
+
+def _visited_name(through, mode):
+    return f"visited-{through:06d}.{VISITED_SNAPSHOT_SUFFIXES[mode]}"
+
+
+class CrawlJournal:
+    """
+    Append-only checkpoint store for a crawl.
+
+    Every processed page appends its enqueued children (``{"e": [category, parent_url]}``) and its own
+    visit (``{"v": url}``) to the current journal segment, so a checkpoint costs only the records written
+    since the previous one. Once a segment holds ``compact_every`` records it is closed and folded into a
+    snapshot by a background thread; resuming reads the snapshot and replays only the segments written after it.
+    Replaying is bounded by the journal tail, but the snapshot itself is still read in full, so resuming
+    costs time proportional to the crawl state (visited URLs and pending categories), not to the tail.
+
+    A snapshot is two files: ``snapshot-<seq>.jsonl`` with one pending ``[category, parent_url]`` per line and
+    ``visited-<seq>.<suffix>``, the visited URLs saved in the format of the crawl's visited index (URL lines,
+    Bloom filter bits or a SQLite table). Both are streamed: visited URLs go straight into that index and
+    pending categories straight into the frontier (which may spill to disk), so neither resuming nor
+    compacting holds the whole crawl state in memory. A category enqueued by several pages is replayed once
+    per enqueue, as it was queued during the crawl; the copies are skipped once it is visited.
+
+    Records are buffered in memory and reach the disk on ``commit()``. To keep the journal from running
+    ahead of Neo4j, callers take a ``mark()``, flush the graph writer, then ``commit(mark)``: only records
+    buffered before the flush are written.
+    """
+
+    def __init__(self, checkpoint_dir, compact_every=COMPACT_EVERY, visited_index="memory"):
+        self.checkpoint_dir = checkpoint_dir
+        self.compact_every = compact_every
+        self.visited_index = visited_index
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered_total = 0
+        self._committed_total = 0
+        self._compactor = None
+        snapshots = self._list(SNAPSHOT_PATTERN)
+        self._snapshot_through = snapshots[-1] if snapshots else 0
+        segments = self._list(SEGMENT_PATTERN)
+        self._seq = max(segments[-1] if segments else 0, self._snapshot_through) + 1
+        self._segment_records = 0
+        self._file = open(self._path(_segment_name(self._seq)), "a", encoding="utf-8")
+
+    def load(self, visited=None, located=None):
+        """
+        Rebuild (visited_categories, located_categories) from the snapshot and journal tail.
+        located_categories keeps enqueue order and skips URLs that were already visited.
+
+        Visited URLs are restored first, then the enqueue records are streamed into the frontier one by one.
+        Both the snapshot and the tail are read in full.
+
+        :param visited: Empty visited index to fill (a ``visited_index`` index); a MemoryVisitedIndex by default
+        :param located: Empty frontier to fill (anything with ``append``/``len``); a deque by default
+        """
+        visited = MemoryVisitedIndex() if visited is None else visited
+        self.visited_index = visited.mode
+        located = deque() if located is None else located
+        with self._lock:
+            through = self._snapshot_through
+        segments = [seq for seq in self._list(SEGMENT_PATTERN) if seq > through]
+        self._restore_visited(visited, through)
+        replayed = 0
+        for seq in segments:
+            replayed += self._replay_visits(self._path(_segment_name(seq)), visited)
+        for item in self._pending(segments, visited, through):
+            located.append(item)
+        logging.info("Checkpoint yüklendi: %s (%s ziyaret, %s kuyrukta, %s journal kaydı işlendi)",
+                     self.checkpoint_dir, len(visited), len(located), replayed)
+        return visited, located
+
+    def seed(self, visited, located):
+        """Start the journal from an existing state (e.g. legacy progress files) by journaling and committing it."""
+        lines = [json.dumps({"e": [category, parent_url]}, ensure_ascii=False) for category, parent_url in located]
+        lines.extend(json.dumps({"v": url}, ensure_ascii=False) for url in visited)
+        with self._lock:
+            self._buffer.extend(lines)
+            self._buffered_total += len(lines)
+        self.commit()
+
+    def record_enqueue(self, category, parent_url):
+        with self._lock:
+            self._buffer.append(json.dumps({"e": [category, parent_url]}, ensure_ascii=False))
+            self._buffered_total += 1
+
+    def record_page(self, category_id, children):
+        """Record one processed page: its children were enqueued and it was visited."""
+        lines = [json.dumps({"e": [category, parent_url]}, ensure_ascii=False) for category, parent_url in children]
+        lines.append(json.dumps({"v": category_id}, ensure_ascii=False))
+        with self._lock:
+            self._buffer.extend(lines)
+            self._buffered_total += len(lines)
+
+    def mark(self):
+        """Return a position covering every record buffered so far, for a later ``commit``."""
+        with self._lock:
+            return self._buffered_total
+
+    def commit(self, upto=None):
+        """Append buffered records (up to a ``mark()``) to the current segment and rotate it if it is full."""
+        with self._lock:
+            count = len(self._buffer) if upto is None else min(upto - self._committed_total, len(self._buffer))
+            if count <= 0:
+                return
+            lines, self._buffer = self._buffer[:count], self._buffer[count:]
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._committed_total += count
+            self._segment_records += count
+            if self._segment_records >= self.compact_every:
+                self._rotate()
+
+    def close(self, commit=True):
+        """
+        Commit what is left and wait for a running compaction to finish. ``commit=False`` drops the
+        uncommitted records instead (e.g. when they describe pages that never reached Neo4j).
+        """
+        if commit:
+            self.commit()
+        with self._lock:
+            self._file.close()
+            if self._segment_records == 0:
+                os.remove(self._path(_segment_name(self._seq)))
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _rotate(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return  # The running compaction will be followed by another one on the next rotation
+        self._file.close()
+        through = self._seq
+        self._seq += 1
+        self._segment_records = 0
+        self._file = open(self._path(_segment_name(self._seq)), "a", encoding="utf-8")
+        self._compactor = threading.Thread(target=self._compact, args=(through,), name="checkpoint-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self, through):
+        """
+        Fold every segment up to ``through`` into a new snapshot, then delete those segments.
+
+        The visited URLs are rebuilt in a scratch index of the crawl's mode rather than taken from the live
+        one, which already holds visits that are not committed yet.
+        """
+        scratch = open_visited_index(self.visited_index, self.checkpoint_dir, "visited-compact.sqlite")
+        with self._lock:
+            previous = self._snapshot_through
+        try:
+            segments = [seq for seq in self._list(SEGMENT_PATTERN) if previous < seq <= through]
+            self._restore_visited(scratch, previous)
+            for seq in segments:
+                self._replay_visits(self._path(_segment_name(seq)), scratch)
+            pending = self._write_snapshot(scratch, self._pending(segments, scratch, previous), previous, through)
+            for seq in segments:
+                os.remove(self._path(_segment_name(seq)))
+            logging.info("Checkpoint sıkıştırıldı: %s segment, %s ziyaret, %s kuyrukta",
+                         len(segments), len(scratch), pending)
+        except Exception as e:
+            logging.error("Checkpoint sıkıştırılamadı: %s", e)
+        finally:
+            scratch.close()
+
+    def _write_snapshot(self, visited, located, previous, through):
+        """
+        Save the visited index, then write ``located`` line by line; replacing the snapshot file is the commit
+        point. The snapshot through ``previous`` is removed afterwards. Returns the number of pending
+        categories written.
+        """
+        visited_path = self._path(_visited_name(through, visited.mode))
+        visited.save(visited_path + ".tmp")
+        os.replace(visited_path + ".tmp", visited_path)
+        tmp_path = self._path(_snapshot_name(through) + ".tmp")
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for category, parent_url in located:
+                f.write(json.dumps([category, parent_url], ensure_ascii=False) + "\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(_snapshot_name(through)))
+        with self._lock:
+            self._snapshot_through = through
+        if previous != through:
+            names = [_snapshot_name(previous), _legacy_snapshot_name(previous)]
+            names += [_visited_name(previous, mode) for mode in VISITED_SNAPSHOT_SUFFIXES]
+            for name in names:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+        return count
+
+    def _read_legacy_snapshot(self, through):
+        path = self._path(_legacy_snapshot_name(through))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _snapshot_pending(self, through):
+        path = self._path(_snapshot_name(through))
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+            return
+        legacy = self._read_legacy_snapshot(through)
+        if legacy:
+            yield from legacy["pending"]
+
+    def _restore_visited(self, visited, through):
+        """Load the visited URLs of snapshot ``through`` into ``visited``, which must be of the mode they were saved in."""
+        legacy = self._read_legacy_snapshot(through)
+        if legacy and "visited" in legacy:
+            visited.update(legacy["visited"])
+            return
+        for mode in VISITED_SNAPSHOT_SUFFIXES:
+            path = self._path(_visited_name(through, mode))
+            if os.path.exists(path):
+                if mode != visited.mode:
+                    raise ValueError(f"Checkpoint {self.checkpoint_dir} was saved with the {mode!r} visited index, "
+                                     f"not {visited.mode!r}")
+                visited.restore(path)
+
+    def _pending(self, segments, visited, through):
+        """Stream the (category, parent_url) pairs enqueued in the snapshot and ``segments`` that are not visited."""
+        for category, parent_url in self._snapshot_pending(through):
+            if category['url'] not in visited:
+                yield category, parent_url
+        for seq in segments:
+            for record in self._records(self._path(_segment_name(seq))):
+                if "e" in record:
+                    category, parent_url = record["e"]
+                    if category['url'] not in visited:
+                        yield category, parent_url
+
+    @classmethod
+    def _replay_visits(cls, path, visited):
+        count = 0
+        for record in cls._records(path):
+            if "v" in record:
+                visited.add(record["v"])
+            count += 1
+        return count
+
+    @staticmethod
+    def _records(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash; everything before it is intact.
+                    logging.warning("Bozuk journal kaydı atlandı: %s", path)
+
+    def _list(self, pattern):
+        return sorted(int(m.group(1)) for m in map(pattern.match, os.listdir(self.checkpoint_dir)) if m)
+
+    def _path(self, name):
+        return os.path.join(self.checkpoint_dir, name)
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+# "fifo" keeps discovery (BFS) order; "shallowest" always hands out the lowest level first.
+CRAWL_FRONTIER_ORDER = os.getenv("CRAWL_FRONTIER_ORDER", "fifo")
+# Categories held in memory before new ones spill to an SQLite queue in the checkpoint directory.
+CRAWL_FRONTIER_MEMORY_LIMIT = int(os.getenv("CRAWL_FRONTIER_MEMORY_LIMIT", 100_000))
+# Categories loaded back from disk at a time once the in-memory part runs dry.
+CRAWL_FRONTIER_SPILL_CHUNK = int(os.getenv("CRAWL_FRONTIER_SPILL_CHUNK", 10_000))
+FRONTIER_ORDERS = ("fifo", "shallowest")
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_FIELDS = ("url", "category_name", "level", "timestamp")
+
+
+class FrontierItem:
+    """
+    One queued category, about half the size of the (dict, parent) pair it stands for: slots instead of a dict,
+    the timestamp as integer microseconds instead of an ISO string, and the parent URL interned so all
+    children of a page share one string.
+    """
+
+    __slots__ = ("url", "name", "level", "parent", "discovered", "extra")
+
+    def __init__(self, category, parent_url):
+        self.url = category["url"]
+        self.name = category["category_name"]
+        self.level = category["level"]
+        self.parent = sys.intern(parent_url) if parent_url else None
+        try:
+            self.discovered = (datetime.fromisoformat(category["timestamp"]) - _EPOCH) // _MICROSECOND
+            packed = _FIELDS
+        except (KeyError, TypeError, ValueError):
+            # Missing, empty or timezone-aware timestamps are kept verbatim with the other extra keys.
+            self.discovered = None
+            packed = _FIELDS[:-1]
+        # Keys beyond the standard ones, kept as is (None for plain categories).
+        self.extra = {key: value for key, value in category.items() if key not in packed} or None
+
+    def category(self):
+        category = {"category_name": self.name, "level": self.level, "url": self.url}
+        if self.discovered is not None:
+            category["timestamp"] = (_EPOCH + self.discovered * _MICROSECOND).isoformat()
+        if self.extra:
+            category.update(self.extra)
+        return category
+
+
+class _SpillQueue:
+    """
+    SQLite tail of the frontier, ordered by (bucket, seq). Derived data: it is rebuilt from the journal.
+    Pushes are committed every ``COMMIT_EVERY`` rows and each take right away, so the WAL can be checkpointed.
+    """
+
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("DROP TABLE IF EXISTS frontier")
+        self._conn.execute(
+            "CREATE TABLE frontier (seq INTEGER PRIMARY KEY, bucket INTEGER, url TEXT, name TEXT, level INTEGER, "
+            "parent TEXT, discovered INTEGER, extra TEXT)")
+        self._conn.execute("CREATE INDEX frontier_bucket ON frontier (bucket, seq)")
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def push(self, bucket, item):
+        extra = None if item.extra is None else json.dumps(item.extra)
+        self._conn.execute("INSERT INTO frontier (bucket, url, name, level, parent, discovered, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (bucket, item.url, item.name, item.level, item.parent, item.discovered, extra))
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def take(self, bucket, limit):
+        rows = self._conn.execute(
+            "SELECT seq, url, name, level, parent, discovered, extra FROM frontier WHERE bucket = ? ORDER BY seq LIMIT ?",
+            (bucket, limit)).fetchall()
+        if rows:
+            self._conn.execute("DELETE FROM frontier WHERE bucket = ? AND seq <= ?", (bucket, rows[-1][0]))
+        self._conn.commit()
+        self._uncommitted = 0
+        items = []
+        for _seq, url, name, level, parent, discovered, extra in rows:
+            item = FrontierItem.__new__(FrontierItem)
+            item.url, item.name, item.level, item.discovered = url, name, level, discovered
+            item.parent = sys.intern(parent) if parent else None
+            item.extra = None if extra is None else json.loads(extra)
+            items.append(item)
+        return items
+
+    def close(self):
+        self._conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+
+class CrawlFrontier:
+    """
+    Queue of categories waiting to be crawled, with the deque interface ``scrape_menu`` used
+    (``popleft``, ``append``, ``extend``, ``len``) over ``(category, parent_url)`` pairs.
+
+    Entries are kept as ``FrontierItem`` records in per-bucket deques (one bucket in "fifo" order, one
+    per level in "shallowest" order). Past ``memory_limit`` entries, new ones spill to an SQLite queue
+    at ``spill_path`` and are read back in chunks as memory drains; once a bucket has spilled, later
+    entries of that bucket spill too, so order is preserved. ``level_cap`` (an int for every level or a
+    {level: cap} dict) limits how many categories of a level are ever enqueued.
+
+    Persistence for resume is the checkpoint journal: it records every enqueue and visit, and
+    ``CrawlJournal.load`` rebuilds the frontier from it.
+    """
+
+    def __init__(self, order=CRAWL_FRONTIER_ORDER, level_cap=None, memory_limit=CRAWL_FRONTIER_MEMORY_LIMIT,
+                 spill_path=None, spill_chunk=CRAWL_FRONTIER_SPILL_CHUNK):
+        if order not in FRONTIER_ORDERS:
+            raise ValueError(f"Unknown frontier order {order!r}, expected one of {FRONTIER_ORDERS}")
+        self.order = order
+        self.level_cap = level_cap
+        self.memory_limit = memory_limit
+        self.spill_path = spill_path
+        self.spill_chunk = spill_chunk
+        self._memory = {}
+        self._in_memory = 0
+        self._spilled = {}
+        self._spill = None
+        self._enqueued_per_level = {}
+        self._dropped = 0
+        self._spilled_total = 0
+
+    def append(self, item):
+        """Queue a (category, parent_url) pair; returns False if the level cap dropped it."""
+        category, parent_url = item
+        level = category["level"]
+        cap = self.level_cap.get(level) if isinstance(self.level_cap, dict) else self.level_cap
+        if cap is not None and self._enqueued_per_level.get(level, 0) >= cap:
+            self._dropped += 1
+            return False
+        self._enqueued_per_level[level] = self._enqueued_per_level.get(level, 0) + 1
+
+        entry = FrontierItem(category, parent_url)
+        bucket = level if self.order == "shallowest" else 0
+        if self._spilled.get(bucket) or (self._in_memory >= self.memory_limit and self.spill_path):
+            if self._spill is None:
+                self._spill = _SpillQueue(self.spill_path)
+            self._spill.push(bucket, entry)
+            self._spilled[bucket] = self._spilled.get(bucket, 0) + 1
+            self._spilled_total += 1
+        else:
+            self._memory.setdefault(bucket, deque()).append(entry)
+            self._in_memory += 1
+        return True
+
+    def extend(self, items):
+        """Queue several pairs; returns the ones that were not dropped by the level cap."""
+        return [item for item in items if self.append(item)]
+
+    def popleft(self):
+        """Return the next (category, parent_url) pair; raises IndexError when empty."""
+        entry = self._take()
+        return entry.category(), entry.parent
+
+    def peek_level(self):
+        """Level of the entry ``popleft`` would return next, or None when empty."""
+        bucket = self._next_bucket()
+        if bucket is None:
+            return None
+        self._fill(bucket)
+        return self._memory[bucket][0].level
+
+    def __len__(self):
+        return self._in_memory + sum(self._spilled.values())
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def close(self):
+        """Drop the spill file (the journal still has every queued entry)."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def stats(self):
+        return {
+            "order": self.order,
+            "size": len(self),
+            "in_memory": self._in_memory,
+            "on_disk": sum(self._spilled.values()),
+            "spilled_total": self._spilled_total,
+            "dropped_by_level_cap": self._dropped,
+        }
+
+    def _next_bucket(self):
+        buckets = [bucket for bucket, entries in self._memory.items() if entries]
+        buckets += [bucket for bucket, count in self._spilled.items() if count]
+        return min(buckets) if buckets else None
+
+    def _fill(self, bucket):
+        entries = self._memory.setdefault(bucket, deque())
+        if not entries and self._spilled.get(bucket):
+            loaded = self._spill.take(bucket, self.spill_chunk)
+            entries.extend(loaded)
+            self._in_memory += len(loaded)
+            self._spilled[bucket] -= len(loaded)
+
+    def _take(self):
+        bucket = self._next_bucket()
+        if bucket is None:
+            raise IndexError("pop from an empty frontier")
+        self._fill(bucket)
+        self._in_memory -= 1
+        return self._memory[bucket].popleft()
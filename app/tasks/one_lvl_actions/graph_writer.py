@@ -0,0 +1,273 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from app.core import telemetry
+
+GRAPH_BATCH_SIZE = 500       # Rows per UNWIND batch
+GRAPH_FLUSH_INTERVAL = 1.0   # Seconds a partial batch may wait before it is written
+GRAPH_MAX_PENDING = 10000    # Queued rows before the crawl blocks on the writer
+WRITER_POLL_INTERVAL = 1.0   # Seconds between checks that the writer thread is alive while waiting on it
+
+SCHEMA_QUERIES = [
+    # The uniqueness constraint is backed by a range index on url, which every MERGE/MATCH below uses.
+    "CREATE CONSTRAINT categoryv2_url_unique IF NOT EXISTS FOR (c:Categoryv2) REQUIRE c.url IS UNIQUE",
+    "CREATE INDEX categoryv2_level IF NOT EXISTS FOR (c:Categoryv2) ON (c.level)",
+]
+
+NODE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (c:Categoryv2 {url: row.url})
+    SET c.name = row.name,
+        c.level = row.level,
+        c.timestamp = row.timestamp
+    REMOVE c.stale, c.stale_since
+"""
+
+EDGE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (parent:Categoryv2 {url: row.parent_url})
+    MATCH (child:Categoryv2 {url: row.child_url})
+    MERGE (parent)-[r:HAS_SUBCATEGORY]->(child)
+    REMOVE r.stale, r.stale_since
+"""
+
+# Stores a page's child-list fingerprint and HTTP validators. When the children were expanded, edges to
+# children that are no longer listed are marked stale, and so are those children once no current edge
+# points at them. Returns how many children were newly marked stale.
+FINGERPRINT_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c:Categoryv2 {url: row.url})
+    SET c.fingerprint = row.fingerprint,
+        c.etag = row.etag,
+        c.last_modified = row.last_modified,
+        c.checked_at = row.checked_at,
+        c.expanded_at = CASE WHEN row.expanded THEN row.checked_at ELSE c.expanded_at END
+    WITH c, row
+    WHERE row.expanded
+    MATCH (c)-[r:HAS_SUBCATEGORY]->(child:Categoryv2)
+    WHERE NOT child.url IN row.children AND r.stale IS NULL
+    SET r.stale = true, r.stale_since = row.checked_at
+    WITH child, min(row.checked_at) AS since
+    WHERE child.stale IS NULL
+      AND NOT EXISTS { MATCH (:Categoryv2)-[e:HAS_SUBCATEGORY]->(child) WHERE e.stale IS NULL }
+    SET child.stale = true, child.stale_since = since
+    RETURN count(child) AS stale
+"""
+
+
+def _write_batch(tx, nodes, edges, fingerprints=()):
+    # Nodes first, so edges and fingerprints in the same batch find their nodes.
+    if nodes:
+        tx.run(NODE_QUERY, rows=nodes)
+    if edges:
+        tx.run(EDGE_QUERY, rows=edges)
+    if fingerprints:
+        record = tx.run(FINGERPRINT_QUERY, rows=fingerprints).single()
+        return record["stale"] if record else 0
+    return 0
+
+
+class GraphWriteError(Exception):
+    """Raised once a batch could not be written to Neo4j or the writer thread has stopped."""
+
+
+class GraphWriter:
+    """
+    Buffers crawl results and writes them to Neo4j in UNWIND batches from a background thread.
+
+    A batch is flushed when it reaches ``batch_size`` rows or when its oldest row has waited
+    ``flush_interval`` seconds, so page loads on the crawl threads overlap with database round trips.
+    ``write_category`` is thread-safe; ``flush`` blocks until everything queued so far is committed.
+
+    A batch that still fails after the driver's retries is dropped, and from then on ``flush`` raises
+    ``GraphWriteError`` and ``failed`` is True: rows queued before any later flush may be missing, so the
+    crawl must not checkpoint past that point. Waiting on a writer thread that died raises the same error.
+    """
+
+    def __init__(self, driver_graph, batch_size=GRAPH_BATCH_SIZE, flush_interval=GRAPH_FLUSH_INTERVAL,
+                 max_pending=GRAPH_MAX_PENDING):
+        self.driver_graph = driver_graph
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._failed_batches = 0
+        self._stale = 0
+        self._flush_total = 0.0
+        self._flush_max = 0.0
+        self._error = None
+
+    def ensure_schema(self):
+        """Create the Categoryv2.url constraint and level index if they do not exist yet."""
+        with self.driver_graph.session() as session:
+            for query in SCHEMA_QUERIES:
+                session.run(query).consume()
+        logging.info("Neo4j şeması hazır (Categoryv2.url unique, Categoryv2.level index)")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="graph-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def failed(self):
+        """True once a batch was dropped or the writer thread stopped on an error."""
+        return self._error is not None
+
+    def write_category(self, category, parent_url=None):
+        """Queue a category node and, if it has a parent, its HAS_SUBCATEGORY edge."""
+        self._put(("node", {
+            'url': category['url'],
+            'name': category['category_name'],
+            'level': category['level'],
+            'timestamp': category['timestamp'],
+        }))
+        if parent_url:
+            self._put(("edge", {'parent_url': parent_url, 'child_url': category['url']}))
+
+    def write_fingerprint(self, url, fingerprint, child_urls, validators=None, expanded=True):
+        """
+        Queue a page's child-list fingerprint. ``expanded`` says whether its children were queued in this
+        crawl; only then are the children missing from ``child_urls`` marked stale.
+        """
+        validators = validators or {}
+        self._put(("fingerprint", {
+            'url': url,
+            'fingerprint': fingerprint,
+            'children': list(child_urls),
+            'etag': validators.get('etag'),
+            'last_modified': validators.get('last_modified'),
+            'checked_at': datetime.now().isoformat(),
+            'expanded': expanded,
+        }))
+
+    def flush(self):
+        """
+        Block until every row queued before this call has been written. Raises GraphWriteError if a batch
+        has failed since the writer started, or if the writer thread is no longer running.
+        """
+        done = threading.Event()
+        self._put(("flush", done))
+        while not done.wait(WRITER_POLL_INTERVAL):
+            self._check_alive()
+        if self._error is not None:
+            raise GraphWriteError(f"Rows could not be written to Neo4j: {self._error}") from self._error
+
+    def close(self):
+        """Write what is left and stop the writer thread; check ``failed`` afterwards."""
+        if self._thread is None:
+            return
+        try:
+            self._put(("stop", None))
+        except GraphWriteError:
+            pass  # The thread already stopped; ``failed`` is set
+        self._thread.join()
+        self._thread = None
+        logging.info("Neo4j writer kapatıldı: %s", self.stats())
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                "batches": batches,
+                "rows": self._rows,
+                "avg_batch_size": self._rows / batches if batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "failed_batches": self._failed_batches,
+                "stale_marked": self._stale,
+                "flush_avg_ms": self._flush_total / batches * 1000 if batches else 0.0,
+                "flush_max_ms": self._flush_max * 1000,
+                "pending": self._queue.qsize(),
+            }
+
+    def _put(self, item):
+        # A bounded put that gives up once the writer thread is gone, instead of waiting forever
+        while True:
+            try:
+                self._queue.put(item, timeout=WRITER_POLL_INTERVAL)
+                return
+            except queue.Full:
+                self._check_alive()
+
+    def _check_alive(self):
+        if self._thread is not None and not self._thread.is_alive():
+            raise GraphWriteError(f"The Neo4j writer thread stopped: {self._error}") from self._error
+
+    def _run(self):
+        try:
+            self._drain()
+        except Exception as e:
+            self._error = e
+            logging.error("Neo4j writer durdu: %s", e)
+
+    def _drain(self):
+        nodes, edges, fingerprints = [], [], []
+        deadline = None
+        with self.driver_graph.session() as session:
+            while True:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    kind, payload = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    kind, payload = "timeout", None
+
+                if kind == "node":
+                    nodes.append(payload)
+                elif kind == "edge":
+                    edges.append(payload)
+                elif kind == "fingerprint":
+                    fingerprints.append(payload)
+                if (kind in ("node", "edge", "fingerprint")) and deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+                if kind in ("flush", "stop", "timeout") or len(nodes) + len(edges) + len(fingerprints) >= self.batch_size:
+                    if nodes or edges or fingerprints:
+                        self._write(session, nodes, edges, fingerprints)
+                        nodes, edges, fingerprints = [], [], []
+                    deadline = None
+                if kind == "flush":
+                    payload.set()
+                elif kind == "stop":
+                    return
+
+    def _write(self, session, nodes, edges, fingerprints=()):
+        started = time.monotonic()
+        attempts = []
+
+        def work(tx):
+            # execute_write re-runs the function on transient errors; count those retries.
+            attempts.append(1)
+            return _write_batch(tx, nodes, edges, fingerprints)
+
+        try:
+            with telemetry.timed("neo4j_tx") as span:
+                span.set_attribute("rows", len(nodes) + len(edges) + len(fingerprints))
+                stale = session.execute_write(work)
+        except Exception as e:
+            with self._stats_lock:
+                self._failed_batches += 1
+                if self._error is None:
+                    self._error = e
+            logging.error("Neo4j'e %s düğüm ve %s ilişki yazılamadı: %s", len(nodes), len(edges), e)
+            return
+        finally:
+            if len(attempts) > 1:
+                telemetry.retries.add(len(attempts) - 1, {"operation": "neo4j_tx"})
+        elapsed = time.monotonic() - started
+        size = len(nodes) + len(edges) + len(fingerprints)
+        with self._stats_lock:
+            self._stale += stale or 0
+            self._batches += 1
+            self._rows += size
+            self._max_batch = max(self._max_batch, size)
+            self._flush_total += elapsed
+            self._flush_max = max(self._flush_max, elapsed)
+        logging.debug("Neo4j batch yazıldı: %s düğüm, %s ilişki, %s parmak izi, %.1f ms",
+                      len(nodes), len(edges), len(fingerprints), elapsed * 1000)
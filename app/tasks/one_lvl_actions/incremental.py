@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from app.utils.http_engine import HttpFetchError, fetch_validators
+from app.utils.url_normalizer import page_url
+
+# "1" to skip subtrees whose parent page lists the same children as in the previous crawl.
+CRAWL_INCREMENTAL = os.getenv("CRAWL_INCREMENTAL", "0") == "1"
+# "1" to revisit every page once while still recording fingerprints (an incremental crawl that skips nothing).
+CRAWL_FULL_REFRESH = os.getenv("CRAWL_FULL_REFRESH", "0") == "1"
+# Comma-separated "level:hours" pairs, "*" for every other level, e.g. "0:24,1:72,*:168". A category
+# whose children were last expanded longer ago than its level's age is expanded again.
+CRAWL_MAX_AGE_HOURS = os.getenv("CRAWL_MAX_AGE_HOURS", "")
+# "1" to ask the server with a conditional HEAD first and skip loading pages that answer 304.
+CRAWL_HTTP_VALIDATORS = os.getenv("CRAWL_HTTP_VALIDATORS", "1") == "1"
+
+PREVIOUS_STATE_QUERY = """
+    MATCH (c:Categoryv2)
+    WHERE c.fingerprint IS NOT NULL AND c.stale IS NULL
+    RETURN c.url AS url, c.fingerprint AS fingerprint, c.etag AS etag, c.last_modified AS last_modified,
+           c.expanded_at AS expanded_at
+"""
+
+# Current (non-stale) descendants of the skipped categories, i.e. the pages the crawl did not load.
+SKIPPED_SUBTREE_QUERY = """
+    UNWIND $urls AS url
+    MATCH path = (:Categoryv2 {url: url})-[:HAS_SUBCATEGORY*1..]->(d:Categoryv2)
+    WHERE all(r IN relationships(path) WHERE r.stale IS NULL)
+    RETURN DISTINCT d.url AS url
+"""
+
+
+def parse_max_age(value):
+    """Parse a CRAWL_MAX_AGE_HOURS string into {level or "*": timedelta}."""
+    max_age = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        level, hours = part.split(":")
+        level = level.strip()
+        max_age["*" if level == "*" else int(level)] = timedelta(hours=float(hours))
+    return max_age
+
+
+def child_fingerprint(children):
+    """Order-independent hash of a page's (url, name) child list."""
+    digest = hashlib.sha256()
+    for url, name in sorted(children):
+        digest.update(f"{url}\t{name}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class IncrementalCrawl:
+    """
+    Decides which categories of a recrawl can be skipped, from the fingerprints of the previous crawl.
+
+    Every crawl stores on each Categoryv2 node a fingerprint of its child list (and the page's ETag /
+    Last-Modified when validators are enabled). A recrawl still loads a category page, but when the new
+    fingerprint matches the stored one its children are not queued, so the whole subtree is skipped. With
+    HTTP validators, a page that answers a conditional HEAD with 304 is not loaded at all. ``full_refresh``
+    skips nothing; ``max_age`` ({level or "*": timedelta}) forces categories whose children were last
+    expanded longer ago than that to be expanded again.
+    """
+
+    def __init__(self, full_refresh=CRAWL_FULL_REFRESH, max_age=None, use_validators=CRAWL_HTTP_VALIDATORS):
+        self.full_refresh = full_refresh
+        self.max_age = parse_max_age(CRAWL_MAX_AGE_HOURS) if max_age is None else max_age
+        self.use_validators = use_validators
+        self._previous = {}
+        self._lock = threading.Lock()
+        self._skipped = []
+        self._not_modified = 0
+        self._unchanged = 0
+        self._changed = 0
+        self._expired = 0
+        self._validators = {}
+        self._hosts_without_validators = set()
+
+    def load(self, driver_graph):
+        """Read the fingerprints stored by earlier crawls."""
+        if self.full_refresh:
+            return self
+        with driver_graph.session() as session:
+            for record in session.run(PREVIOUS_STATE_QUERY):
+                self._previous[record["url"]] = (record["fingerprint"], record["etag"], record["last_modified"],
+                                                 record["expanded_at"])
+        logging.info("Artımlı tarama: %s kategorinin parmak izi yüklendi", len(self._previous))
+        return self
+
+    def not_modified(self, category, schedule=None):
+        """
+        Conditional HEAD with the stored validators; True if the page answered 304 and can be skipped
+        without loading it. The validators the server sent are kept for ``validators``. ``schedule`` is the
+        crawl's host scheduler ticket factory, so the HEAD runs under the crawl's job and priority.
+
+        Only pages known from the previous crawl are asked. A known page without stored validators gets a
+        plain HEAD to learn them, until a page of its host answers without any; new pages are never asked,
+        since they can not answer 304.
+        """
+        previous = self._previous.get(category['url'])
+        if not self.use_validators or self.full_refresh or previous is None:
+            return False
+        etag, last_modified = previous[1], previous[2]
+        learning = not (etag or last_modified)
+        host = urlsplit(category['url']).netloc
+        if learning:
+            with self._lock:
+                if host in self._hosts_without_validators:
+                    return False
+        try:
+            not_modified, validators = fetch_validators(page_url(category), etag, last_modified, schedule)
+        except HttpFetchError as e:
+            logging.debug("Doğrulayıcılar alınamadı: %s - %s", category['url'], e)
+            return False
+        with self._lock:
+            self._validators[category['url']] = validators
+            if learning and not any(validators.values()):
+                self._hosts_without_validators.add(host)
+        if not not_modified or self._expired_for(category, previous):
+            return False
+        with self._lock:
+            self._not_modified += 1
+            self._skipped.append(category['url'])
+        return True
+
+    def validators(self, url):
+        """ETag / Last-Modified seen by ``not_modified`` for this page, if any."""
+        with self._lock:
+            return self._validators.pop(url, None)
+
+    def should_expand(self, category, fingerprint):
+        """True if the children of this category have to be queued (new, changed or too old)."""
+        previous = self._previous.get(category['url'])
+        if self.full_refresh or previous is None or previous[0] != fingerprint:
+            with self._lock:
+                self._changed += 1
+            return True
+        if self._expired_for(category, previous):
+            with self._lock:
+                self._expired += 1
+            return True
+        with self._lock:
+            self._unchanged += 1
+            self._skipped.append(category['url'])
+        return False
+
+    def pages_saved(self, driver_graph, visited):
+        """
+        Pages this crawl did not load: those answering 304 and the previously known descendants of every
+        skipped category, except the ones reached through a changed parent anyway.
+        """
+        with self._lock:
+            skipped = list(self._skipped)
+            not_modified = self._not_modified
+        if not skipped:
+            return 0
+        with driver_graph.session() as session:
+            descendants = {record["url"] for record in session.run(SKIPPED_SUBTREE_QUERY, urls=skipped)}
+        return not_modified + sum(1 for url in descendants if url not in visited)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "full_refresh": self.full_refresh,
+                "known": len(self._previous),
+                "changed": self._changed,
+                "unchanged": self._unchanged,
+                "expired": self._expired,
+                "not_modified": self._not_modified,
+            }
+
+    def _expired_for(self, category, previous):
+        max_age = self.max_age.get(category['level'], self.max_age.get("*"))
+        if max_age is None or previous is None:
+            return False
+        expanded_at = previous[3]
+        if not expanded_at:
+            return True
+        return datetime.now() - datetime.fromisoformat(expanded_at) > max_age
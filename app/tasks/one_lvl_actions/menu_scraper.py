@@ -1,30 +1,51 @@
-import time
+import threading
+from functools import partial
 from collections import deque
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 import logging
 from datetime import datetime
 from neo4j import GraphDatabase
 import json
 import os
+from app.tasks.one_lvl_actions.checkpoint import CrawlJournal
+from app.tasks.one_lvl_actions.frontier import CRAWL_FRONTIER_ORDER, CrawlFrontier
+from app.tasks.one_lvl_actions.graph_writer import GraphWriter
+from app.tasks.one_lvl_actions.incremental import CRAWL_FULL_REFRESH, CRAWL_INCREMENTAL, IncrementalCrawl, child_fingerprint
+from app.tasks.one_lvl_actions.visited_index import CRAWL_VISITED_INDEX, open_visited_index
+from app.utils.url_normalizer import UrlNormalizer, page_url
+from app.utils.dom_extract import bulk_extract
+from app.utils.readiness import wait_until_ready, LocatorPresent
+from app.core.profiles import page_load_stats
+from app.core import telemetry
+from app.core.logging_config import bind_log_context, reset_log_context, set_log_context
+from app.core.scheduler import CRAWL_JOB_PRIORITY, host_scheduler
+from app.core.snapshots import get_snapshot_store
+from app.core.tabs import TabSession
+
+# Neo4j bağlantısı için gerekli bilgiler
+NEO4J_URI = "bolt://localhost:7687"  # Neo4j URI
+NEO4J_USER = "neo4j"                # Kullanıcı adı
+NEO4J_PASSWORD = "password"         # Şifre
+
+PROGRESS_DIR = "scraping_progress"
+SAVE_EVERY = 10  # Kaç sayfada bir checkpoint alınır
 
 
 def load_progress(visited_file, located_file):
     """
     Kaydedilmiş progress'i yükler.
-    
+
     Args:
         visited_file (str): Ziyaret edilmiş kategorilerin bulunduğu dosya yolu
         located_file (str): Bulunmuş kategorilerin bulunduğu dosya yolu
-    
+
     Returns:
         tuple: (visited_categories, located_categories) veya hata durumunda (None, None)
     """
     try:
         with open(visited_file, 'r') as f:
             visited_categories = set(json.load(f))
-        
+
         with open(located_file, 'r') as f:
             located_list = json.load(f)
             # Convert the loaded data into proper tuples
@@ -37,176 +58,611 @@ def load_progress(visited_file, located_file):
                     # If item is just a category dictionary
                     located_categories.append((item, None))
                 else:
-                    logging.warning(f"Unexpected item format in located_list: {item}")
+                    logging.warning("Unexpected item format in located_list: %s", item)
                     continue
-            
-        logging.info(f"Progress loaded from {visited_file} and {located_file}")
+
+        logging.info("Progress loaded from %s and %s", visited_file, located_file)
         return visited_categories, located_categories
     except Exception as e:
-        logging.error(f"Progress yüklenirken hata oluştu: {e}")
+        logging.error("Progress yüklenirken hata oluştu: %s", e)
         return None, None
 
-def scrape_menu(driver, locator, is_loaded_locator, is_leaf, wait_time=10, visited_file=None, located_file=None):
+
+def _canonical(normalize_url, href):
+    """Linkin kanonik URL'si; geçersiz linklerde (ör. port 99999) uyarı loglanır ve None döner."""
+    try:
+        return normalize_url(href)
+    except ValueError as e:
+        logging.warning("Geçersiz link atlandı: %s - %s", href, e)
+        return None
+
+
+def _child_category(name, level, category_url, href):
     """
-    Breadth-First Search kullanarak menü yapısını tarar ve bulunan düğümleri Neo4j'ye kaydeder.
+    Alt kategori sözlüğü. url kanonik adrestir (tekrar kontrolü ve Neo4j düğüm anahtarı); link ondan farklıysa
+    sayfa sitenin verdiği adresle açılsın diye href olarak saklanır.
+    """
+    category = {
+        'category_name': name,
+        'level': level,
+        'url': category_url,
+        'timestamp': datetime.now().isoformat()
+    }
+    if href != category_url:
+        category['href'] = href
+    return category
+
+
+def _checkpoint(writer, journal):
+    """
+    Checkpoint: Neo4j kuyruğunu boşaltır ve o ana kadarki journal kayıtlarını diske yazar. Böylece
+    checkpoint'te ziyaret edilmiş görünen her düğüm veritabanında da vardır.
+    """
+    with telemetry.timed("checkpoint"):
+        mark = journal.mark()
+        writer.flush()
+        journal.commit(mark)
+
+
+def _close_checkpoint(writer, journal):
+    """
+    Neo4j writer'ını kapatır ve kalan journal kayıtlarını diske yazar. Yazılamayan bir batch olduysa kalan
+    kayıtlar yazılmaz; o sayfalar devam edildiğinde yeniden taranır.
+    """
+    writer.close()
+    if writer.failed:
+        logging.error("Neo4j'e yazılamayan kayıtlar var; son checkpoint'ten sonraki sayfalar yeniden taranacak")
+    journal.close(commit=not writer.failed)
+
+
+def _report_recrawl(recrawl, driver_graph, visited_categories):
+    """Artımlı taramanın özetini ve yüklenmeden atlanan sayfa sayısını loglar."""
+    if recrawl is None:
+        return
+    try:
+        saved = recrawl.pages_saved(driver_graph, visited_categories)
+    except Exception as e:
+        logging.error("Atlanan sayfalar sayılamadı: %s", e)
+        saved = None
+    logging.info("Artımlı tarama: %s, yüklenmeyen sayfa: %s", recrawl.stats(), saved)
+
+
+def _snapshotter(snapshots, crawl_id):
+    """Sayfaları tarama kimliği altında kaydeden snapshot(driver, url) fonksiyonu; snapshot kapalıysa None."""
+    snapshots = snapshots if snapshots is not None else get_snapshot_store()
+    if snapshots is None:
+        return None
+    logging.info("Sayfa snapshot'ları kaydediliyor: %s (run: %s)", snapshots.root, crawl_id)
+    return partial(snapshots.capture, run=crawl_id)
+
+
+def _start_writer(driver_graph):
+    """Neo4j şemasını hazırlar ve arka planda batch yazan GraphWriter'ı başlatır."""
+    writer = GraphWriter(driver_graph)
+    writer.ensure_schema()
+    return writer.start()
+
+
+def _open_checkpoint(checkpoint_dir, root_url, visited_file, located_file, visited_index=CRAWL_VISITED_INDEX,
+                     frontier_order=CRAWL_FRONTIER_ORDER, level_cap=None):
+    """
+    Checkpoint journal'ını açar ve başlangıç durumunu (journal, visited, located) olarak döndürür.
+
+    checkpoint_dir verilmezse yeni, zaman damgalı bir dizin oluşturulur; var olan bir dizin verilirse
+    tarama kaldığı yerden devam eder. Eski JSON progress dosyaları (visited_file/located_file) verilirse
+    ve journal boşsa, journal onlarla başlatılır. Kuyruk boşsa root düğümüyle başlanır.
+
+    visited, visited_index türünde ("memory", "bloom" veya "disk") bir indekstir ve her başlangıçta
+    journal'dan yeniden doldurulur; böylece her modda kaldığı yerden devam edilebilir. Sıkıştırılmış bir
+    checkpoint, ziyaret indeksini kendi biçiminde sakladığı için aynı visited_index ile açılmalıdır.
+
+    located, frontier_order sırasında ("fifo" veya "shallowest") bir CrawlFrontier'dır; bellek sınırını aşan
+    kısmı checkpoint dizinindeki frontier.sqlite dosyasına taşar ve o da her başlangıçta journal'dan kurulur.
+    """
+    if checkpoint_dir is None:
+        checkpoint_dir = f"{PROGRESS_DIR}/{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    journal = CrawlJournal(checkpoint_dir)
+    frontier = CrawlFrontier(frontier_order, level_cap, spill_path=os.path.join(checkpoint_dir, "frontier.sqlite"))
+    visited_categories, located_categories = journal.load(open_visited_index(visited_index, checkpoint_dir), frontier)
+
+    if not len(visited_categories) and not located_categories and visited_file and located_file:
+        loaded_visited, loaded_located = load_progress(visited_file, located_file)
+        if loaded_visited is not None and loaded_located is not None:
+            visited_categories.update(loaded_visited)
+            located_categories.extend(loaded_located)
+            journal.seed(loaded_visited, loaded_located)
 
-    :param driver: Selenium WebDriver instance  
-    :param locator: Menü elemanlarını tanımlayan locator (tuple olarak, örneğin (By.CSS_SELECTOR, "selector"))
-    :param is_loaded_locator: Sayfanın yüklenip yüklenemdiğini anlamak için kullanılan element
-    :param is_leaf: Bir düğümün yaprak olup olmadığını kontrol eden fonksiyon  
-    :param wait_time: Elementlerin yüklenmesini beklerken maksimum süre
-    :param visited_file: Ziyaret edilmiş kategorilerin yüklenecegi dosya yolu
-    :param located_file: Bulunmuş kategorilerin yüklenecegi dosya yolu
-    """
-    # Logging yapılandırması
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    
-    # Neo4j bağlantısı için gerekli bilgileri burada tanımlayın
-    neo4j_uri = "bolt://localhost:7687"  # Neo4j URI
-    neo4j_user = "neo4j"                # Kullanıcı adı
-    neo4j_password = "password"         # Şifre
-    
-    # Neo4j driver'ı başlat
-    driver_graph = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-    
-    # Progress dosyaları için timestamp oluştur
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    progress_dir = "scraping_progress"
-    os.makedirs(progress_dir, exist_ok=True)
-    
-    # Progress dosya yollarını belirle
-    save_visited_file = f"{progress_dir}/{timestamp}_visited.json"
-    save_located_file = f"{progress_dir}/{timestamp}_located.json"
-    
-    def save_progress(visited, located):
-        """Progress'i dosyaya kaydet"""
-        with open(save_visited_file, 'w') as f:
-            json.dump(list(visited), f)
-        
-        with open(save_located_file, 'w') as f:
-            located_list = [(cat, parent_url) for cat, parent_url in located]
-            json.dump(located_list, f)
-        
-        logging.info(f"Progress saved to {save_visited_file} and {save_located_file}")
-
-    def create_category(tx, category):
-        """
-        Neo4j'ye kategori düğümü ekler.
-        """
-        tx.run("""
-            MERGE (c:Categoryv2 {url: $url})
-            SET c.name = $name,
-                c.level = $level,
-                c.timestamp = $timestamp
-        """, name=category['category_name'], level=category['level'], url=category['url'], timestamp=category['timestamp'])
-    
-    def create_relationship(tx, parent_url, child_url):
-        """
-        Neo4j'ye kategori ilişkisi ekler.
-        """
-        tx.run("""
-            MATCH (parent:Categoryv2 {url: $parent_url})
-            MATCH (child:Categoryv2 {url: $child_url})
-            MERGE (parent)-[:HAS_SUBCATEGORY]->(child)
-        """, parent_url=parent_url, child_url=child_url)
-    
-    # Başlangıç kategorilerini yükle
-    if visited_file and located_file:
-        visited_categories, located_categories = load_progress(visited_file, located_file)
-        if visited_categories is None or located_categories is None:
-            visited_categories = set()
-            located_categories = deque()
-    else:
-        visited_categories = set()
-        located_categories = deque()
-    
     # Eğer located_categories boşsa, root düğümü ekle
     if not located_categories:
         root = {
             'category_name': 'Root',
             'level': 0,
-            'url': driver.current_url,
+            'url': root_url,
             'timestamp': datetime.now().isoformat()
         }
         located_categories.append((root, None))  # (kategori, parent_url)
+        journal.record_enqueue(root, None)
+    return journal, visited_categories, located_categories
+
+
+def _open_category_page(driver, category, is_loaded_locator, wait_time, schedule, snapshot=None):
+    """
+    Kategori sayfasını host zamanlayıcı bileti altında açar ve yüklenmesini bekler; yüklendiyse True döner.
+    snapshot verilmişse yüklenen sayfanın kaynağı snapshot deposuna kaydedilir.
+    """
+    # Host başına eşzamanlılık ve hız sınırı; 429/403 yanıtları ve zaman aşımları zamanlayıcıya bildirilir
+    with schedule(page_url(category)) as ticket:
+        try:
+            telemetry.load_page(driver, page_url(category))
+        except TimeoutException:
+            ticket.record(timed_out=True)
+            logging.error("Sayfa yüklenemedi: %s", category['url'])
+            return False
+        ready = wait_until_ready(driver, [LocatorPresent(is_loaded_locator)], timeout=wait_time)
+        ticket.record(page_load_stats.record_load(driver))
+    if not ready:
+        logging.error("Sayfa yüklenemedi: %s", category['url'])
+    elif snapshot is not None:
+        snapshot(driver, category['url'])
+    return ready
+
+
+def _harvest_menu_tree(driver, writer, journal, visited_categories, located_categories, menu_tree, is_loaded_locator,
+                       wait_time, normalize_url, incremental=None, schedule=host_scheduler.ticket, snapshot=None):
+    """
+    Sayfada bütünüyle bulunan menü ağacını root sayfasının tek yüklemesi ve tek script çağrısıyla çıkarır.
+
+    Yalnızca yeni bir taramanın başında, kuyruğun başında root varken çalışır. Bulunan her kategori ve
+    HAS_SUBCATEGORY ilişkisi BFS taramasıyla aynı şekilde yazılır (aynı URL birden fazla yerde geçiyorsa ilk
+    ve en sığ olanı alınır) ve kategoriler ziyaret edildi sayılır. Tembel yüklenen dallar kuyruğa alınır ve
+    sayfa sayfa taranır. Sayfa veya menü okunamazsa root kuyruğa geri konur ve tarama normal BFS ile sürer.
+    """
+    if menu_tree is None or len(visited_categories) or not located_categories or located_categories.peek_level() != 0:
+        return
+    root, _parent_url = located_categories.popleft()
+    logging.info("Menü ağacı çıkarılıyor: %s", root['url'])
+    if incremental is not None and incremental.not_modified(root, schedule):
+        logging.info("Sayfa değişmedi (HTTP 304), menü ağacı atlandı")
+        visited_categories.add(root['url'])
+        journal.record_page(root['url'], [])
+        return
+    rows = None
+    if _open_category_page(driver, root, is_loaded_locator, wait_time, schedule, snapshot):
+        if wait_until_ready(driver, [LocatorPresent(menu_tree.container)], timeout=wait_time):
+            try:
+                rows = menu_tree.harvest(driver)
+            except Exception as e:
+                logging.error("Menü ağacı okunamadı: %s - %s", root['url'], e)
+        else:
+            logging.warning("Menü ağacı bulunamadı: %s", root['url'])
+    if not rows:
+        logging.warning("Menü ağacı çıkarılamadı, sayfa sayfa BFS taramasıyla devam ediliyor")
+        located_categories.append((root, None))
+        return
+
+    # Satırlar derinlik öncelikli gelir; seviye sırasıyla işlenince tekrar eden URL'ler BFS'deki gibi en sığ
+    # (ve aynı seviyede ilk) ebeveynlerine bağlanır.
+    categories = {-1: root}
+    listed = {root['url']: []}
+    seen = {root['url']}
+    harvested, lazy, truncated = [], [], set()
+    for index in sorted(range(len(rows)), key=lambda i: rows[i]['depth']):
+        row = rows[index]
+        parent = categories.get(row['parent'])
+        if parent is None or not row['href']:
+            continue
+        category_url = _canonical(normalize_url, row['href'])
+        if category_url is None:
+            continue
+        listed.setdefault(parent['url'], []).append((category_url, row['name']))
+        if category_url in seen:
+            continue
+        seen.add(category_url)
+        category = _child_category(row['name'], root['level'] + row['depth'], category_url, row['href'])
+        if row['lazy']:
+            lazy.append((category, parent['url']))
+            continue
+        categories[index] = category
+        harvested.append((category, parent['url']))
+        if row['truncated']:
+            truncated.add(category_url)
+
+    validators = incremental.validators(root['url']) if incremental is not None else None
+    writer.write_category(root, None)
+    for category, parent_url in harvested:
+        writer.write_category(category, parent_url)
+    for category_url, children in listed.items():
+        writer.write_fingerprint(category_url, child_fingerprint(children), [url for url, _name in children],
+                                 validators if category_url == root['url'] else None)
+    for category, _parent_url in harvested:
+        # Alt menüsü olmayan kategoriler yapraktır; derinlik sınırında kesilenlerin alt listesi bilinmez
+        if category['url'] not in listed and category['url'] not in truncated:
+            writer.write_fingerprint(category['url'], child_fingerprint([]), [])
+
+    # Seviye sınırına takılan tembel dallar journal'a da yazılmaz
+    lazy = located_categories.extend(lazy)
+    for category, _parent_url in harvested:
+        visited_categories.add(category['url'])
+        journal.record_page(category['url'], [])
+    visited_categories.add(root['url'])
+    journal.record_page(root['url'], lazy)
+    _checkpoint(writer, journal)
+    logging.info("Menü ağacı tek sayfadan çıkarıldı: %s kategori, %s tembel dal sayfa sayfa taranacak",
+                 len(harvested), len(lazy))
+
+
+def _process_category(driver, writer, current_category, parent_url, locator, is_loaded_locator, is_leaf, wait_time, is_visited,
+                      normalize_url, incremental=None, schedule=None, snapshot=None):
+    """
+    Bir kategori sayfasını açar, Neo4j yazma kuyruğuna ekler ve alt kategorilerini (kategori, parent_url) listesi olarak döndürür.
+    Alt kategori URL'leri normalize_url ile kanonik hale getirilir (tekrar kontrolü ve düğüm anahtarı); sayfalar linkin
+    kendi adresiyle açılır, geçersiz linkler atlanır. Sayfa yüklenemezse veya düğüm yaprak ise boş liste döner.
+    Alt kategori listesinin parmak izi de yazılır; incremental verilmişse ve liste değişmediyse alt ağaç atlanır.
+    Sayfa yükleme, schedule'ın verdiği host zamanlayıcı bileti (varsayılan: host_scheduler.ticket) altında yapılır.
+    snapshot verilmişse her yüklenen sayfa snapshot(driver, url) ile kaydedilir.
+    """
+    # Her sayfa kendi trace'inin köküdür; sayfa yükleme, bekleme ve okuma adımları altında yer alır.
+    with telemetry.tracer.start_as_current_span(
+            "scraper.crawl_page", attributes={"url": current_category['url'], "level": current_category['level']}):
+        return _load_category(driver, writer, current_category, parent_url, locator, is_loaded_locator, is_leaf,
+                              wait_time, is_visited, normalize_url, incremental, schedule or host_scheduler.ticket,
+                              snapshot)
+
+
+def _load_category(driver, writer, current_category, parent_url, locator, is_loaded_locator, is_leaf, wait_time, is_visited,
+                   normalize_url, incremental=None, schedule=host_scheduler.ticket, snapshot=None):
+    logging.info("İşleniyor: %s (Seviye: %s)", current_category['category_name'], current_category['level'])
+    if incremental is not None and incremental.not_modified(current_category, schedule):
+        logging.info("Sayfa değişmedi (HTTP 304), alt ağaç atlandı: %s", current_category['category_name'])
+        return []
+
+    if not _open_category_page(driver, current_category, is_loaded_locator, wait_time, schedule, snapshot):
+        return []
+
+    # Neo4j'ye düğüm ekleme (GraphWriter arka planda batch olarak yazar)
+    writer.write_category(current_category, parent_url)
+    validators = incremental.validators(current_category['url']) if incremental is not None else None
+
+    if is_leaf(driver):
+        logging.info("Yaprak düğüm: %s", current_category['category_name'])
+        writer.write_fingerprint(current_category['url'], child_fingerprint([]), [], validators)
+        return []
+
+    if not wait_until_ready(driver, [LocatorPresent(locator)], timeout=wait_time):
+        logging.warning("Alt kategoriler bulunamadı: %s", current_category['category_name'])
+        return []
 
-    with driver_graph.session() as session:
+    # Tüm linkler tek bir execute_script ile okunur (element başına ayrı round trip yerine)
+    try:
+        rows = bulk_extract(driver, locator, ["text", "href", "clickable"])
+    except Exception as e:
+        logging.error("Alt kategoriler okunamadı: %s - %s", current_category['category_name'], e)
+        return []
+
+    listed = []
+    hrefs = {}
+    for row in rows:
+        # Görünmeyen veya devre dışı linkler tıklanabilir değildir
+        if not row['clickable']:
+            continue
+        category_name = (row['text'] or '').strip()
+        if not row['href']:
+            logging.warning("URL bulunamadı: %s", category_name)
+            continue
+        # Aynı sayfaya giden farklı linkler (takip parametreleri, fragment, sondaki /) tek URL'ye iner
+        category_url = _canonical(normalize_url, row['href'])
+        if category_url is None:
+            continue
+        listed.append((category_url, category_name))
+        hrefs.setdefault(category_url, row['href'])
+
+    fingerprint = child_fingerprint(listed)
+    expanded = incremental is None or incremental.should_expand(current_category, fingerprint)
+    writer.write_fingerprint(current_category['url'], fingerprint, [url for url, _name in listed], validators, expanded)
+    if not expanded:
+        logging.info("Alt kategoriler değişmedi, alt ağaç atlandı: %s", current_category['category_name'])
+        return []
+
+    children = []
+    seen = set()
+    for category_url, category_name in listed:
+        if category_url in seen or is_visited(category_url):
+            continue
+        seen.add(category_url)
+        category = _child_category(category_name, current_category['level'] + 1, category_url, hrefs[category_url])
+        children.append((category, current_category['url']))
+    return children
+
+
+def scrape_menu(driver, locator, is_loaded_locator, is_leaf, wait_time=10, visited_file=None, located_file=None,
+                checkpoint_dir=None, driver_graph=None, visited_index=CRAWL_VISITED_INDEX, url_normalizer=None,
+                frontier_order=CRAWL_FRONTIER_ORDER, level_cap=None, incremental=CRAWL_INCREMENTAL,
+                full_refresh=CRAWL_FULL_REFRESH, max_age=None, priority=CRAWL_JOB_PRIORITY, menu_tree=None,
+                snapshots=None, tabs=1):
+    """
+    Breadth-First Search kullanarak menü yapısını tarar ve bulunan düğümleri Neo4j'ye kaydeder.
+
+    :param driver: Selenium WebDriver instance
+    :param locator: Menü elemanlarını tanımlayan locator (tuple olarak, örneğin (By.CSS_SELECTOR, "selector"))
+    :param is_loaded_locator: Sayfanın yüklenip yüklenemdiğini anlamak için kullanılan element
+    :param is_leaf: Bir düğümün yaprak olup olmadığını kontrol eden fonksiyon
+    :param wait_time: Elementlerin yüklenmesini beklerken maksimum süre
+    :param visited_file: Ziyaret edilmiş kategorilerin yüklenecegi dosya yolu (eski JSON progress formatı)
+    :param located_file: Bulunmuş kategorilerin yüklenecegi dosya yolu (eski JSON progress formatı)
+    :param checkpoint_dir: Checkpoint journal dizini; verilirse tarama kaldığı yerden devam eder
+    :param driver_graph: Kullanılacak Neo4j driver'ı; verilmezse NEO4J_URI'ye bağlanılır ve sonunda kapatılır
+    :param visited_index: Ziyaret indeksi: "memory" (tam küme), "bloom" (sınırlı hata oranlı, az bellek) veya "disk" (SQLite)
+    :param url_normalizer: URL'leri kanonik hale getiren fonksiyon; varsayılan ayarlarla UrlNormalizer
+    :param frontier_order: Kuyruk sırası: "fifo" (bulunma sırası, BFS) veya "shallowest" (her zaman en sığ seviye önce)
+    :param level_cap: Bir seviyeden kuyruğa alınacak en fazla kategori sayısı; tüm seviyeler için int veya {seviye: sınır}
+    :param incremental: True ise alt kategori listesi önceki taramadakiyle aynı olan kategorilerin alt ağaçları atlanır
+    :param full_refresh: True ise artımlı modda da hiçbir alt ağaç atlanmaz (parmak izleri yine yazılır)
+    :param max_age: {seviye veya "*": timedelta}; alt kategorileri bundan daha eski genişletilmiş kategoriler yeniden genişletilir
+    :param priority: Aynı host'u paylaşan işler arasında bu taramanın payı (API istekleri API_JOB_PRIORITY ile çalışır)
+    :param menu_tree: MenuTree verilirse menü ağacı root sayfasından tek seferde çıkarılır; yalnızca tembel yüklenen
+        dallar sayfa sayfa taranır
+    :param snapshots: Yüklenen sayfaların kaynağını tarama kimliği altında saklayan SnapshotStore; verilmezse
+        SNAPSHOT_DIR ayarlıysa oradaki depo kullanılır
+    :param tabs: 1'den büyükse aynı tarayıcı oturumunda bu kadar sekme açılır ve kategoriler sekmelerde eşzamanlı
+        yüklenir (scrape_menu_parallel ile); driver'ın "tabs" gibi page_load_strategy="none" profilli olması önerilir.
+        Bu profilde driver.get sayfa yüklenmeden döner: root sayfasının yüklendiğini bekledikten sonra çağırın
+    """
+    if tabs > 1:
+        return scrape_menu_parallel([driver], locator, is_loaded_locator, is_leaf, wait_time, visited_file, located_file,
+                                    checkpoint_dir, driver_graph=driver_graph, visited_index=visited_index,
+                                    url_normalizer=url_normalizer, frontier_order=frontier_order, level_cap=level_cap,
+                                    incremental=incremental, full_refresh=full_refresh, max_age=max_age,
+                                    priority=priority, menu_tree=menu_tree, snapshots=snapshots, tabs=tabs)
+
+    # Neo4j driver'ı başlat
+    owns_graph = driver_graph is None
+    if owns_graph:
+        driver_graph = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    writer = _start_writer(driver_graph)
+    recrawl = IncrementalCrawl(full_refresh, max_age).load(driver_graph) if incremental or full_refresh else None
+    normalize_url = url_normalizer or UrlNormalizer()
+    journal, visited_categories, located_categories = _open_checkpoint(checkpoint_dir, normalize_url(driver.current_url),
+                                                                       visited_file, located_file, visited_index,
+                                                                       frontier_order, level_cap)
+    crawl_id = os.path.basename(os.path.normpath(journal.checkpoint_dir))
+    # Bu thread'in (ve worker'ların) logları tarama kimliğiyle etiketlenir
+    log_tokens = set_log_context(crawl_id=crawl_id)
+    schedule = partial(host_scheduler.ticket, job=f"crawl:{crawl_id}", priority=priority)
+    snapshot = _snapshotter(snapshots, crawl_id)
+    telemetry.register_gauge("frontier_size", crawl_id, located_categories.__len__)
+    telemetry.register_gauge("active_sessions", crawl_id, lambda: 1)
+
+    try:
+        _harvest_menu_tree(driver, writer, journal, visited_categories, located_categories, menu_tree, is_loaded_locator,
+                           wait_time, normalize_url, recrawl, schedule, snapshot)
         progress_counter = 0
         while located_categories:
             current_category, parent_url = located_categories.popleft()
             category_id = current_category['url']
-            
+
             if category_id in visited_categories:
                 continue
-            
-            logging.info(f"İşleniyor: {current_category['category_name']} (Seviye: {current_category['level']})")
-            
-            try:
-                driver.get(current_category['url'])
-                WebDriverWait(driver, wait_time).until(EC.presence_of_element_located(is_loaded_locator))
-            except TimeoutException:
-                logging.error(f"Sayfa yüklenemedi: {current_category['url']}")
-                visited_categories.add(category_id)
-                continue
-            
-            # Neo4j'ye düğüm ekleme
-            try:
-                session.write_transaction(create_category, current_category)
-                if parent_url:
-                    session.write_transaction(create_relationship, parent_url, current_category['url'])
-            except Exception as e:
-                logging.error(f"Neo4j'e kategori eklenirken hata oluştu: {e}")
-                visited_categories.add(category_id)
-                continue
-            
-            if is_leaf(driver):
-                logging.info(f"Yaprak düğüm: {current_category['category_name']}")
-                visited_categories.add(category_id)
-                continue
-            
-            try:
-                elements = WebDriverWait(driver, wait_time).until(EC.presence_of_all_elements_located(locator))
-            except TimeoutException:
-                logging.warning(f"Alt kategoriler bulunamadı: {current_category['category_name']}")
-                visited_categories.add(category_id)
-                continue
-            
-            for elem in elements:
-                try:
-                    if elem.is_enabled() and elem.is_displayed():
-                        category_name = elem.text.strip()
-                        category_url = elem.get_attribute('href')
-                        if not category_url:
-                            logging.warning(f"URL bulunamadı: {category_name}")
-                            continue
-                        if category_url in visited_categories:
-                            continue
-                        # Linkin yüklendiğini kontrol et
-                        try:
-                            WebDriverWait(driver, wait_time).until(EC.element_to_be_clickable(locator))
-                        except TimeoutException:
-                            logging.warning(f"Element tıklanabilir değil: {category_name}")
-                            continue
-                        category = {
-                            'category_name': category_name,
-                            'level': current_category['level'] + 1,
-                            'url': category_url,
-                            'timestamp': datetime.now().isoformat()
-                        }
-                        located_categories.append((category, current_category['url']))
-                except Exception as e:
-                    logging.error(f"Alt kategori işlenemedi: {e}")
-            
+
+            children = _process_category(driver, writer, current_category, parent_url, locator, is_loaded_locator,
+                                         is_leaf, wait_time, visited_categories.__contains__, normalize_url, recrawl,
+                                         schedule, snapshot)
+            # Seviye sınırına takılan alt kategoriler journal'a da yazılmaz
+            children = located_categories.extend(children)
             visited_categories.add(category_id)
-            
-            # Her 10 işlemde bir progress'i kaydet
+            journal.record_page(category_id, children)
+
+            # Her 10 işlemde bir checkpoint al
             progress_counter += 1
-            if progress_counter % 10 == 0:
-                save_progress(visited_categories, located_categories)
-        
-        # Son durumu kaydet
-        save_progress(visited_categories, located_categories)
+            if progress_counter % SAVE_EVERY == 0:
+                _checkpoint(writer, journal)
+
+        _checkpoint(writer, journal)
         logging.info("Tüm kategoriler işlendi.")
-    
-    # Neo4j sürücüsünü kapat
-    driver_graph.close()
+    finally:
+        telemetry.unregister_gauge("frontier_size", crawl_id)
+        telemetry.unregister_gauge("active_sessions", crawl_id)
+        logging.info("Ziyaret indeksi: %s", visited_categories.stats())
+        logging.info("Kuyruk: %s", located_categories.stats())
+        # Son durumu kaydet
+        _close_checkpoint(writer, journal)
+        _report_recrawl(recrawl, driver_graph, visited_categories)
+        visited_categories.close()
+        located_categories.close()
+        # Neo4j sürücüsünü kapat
+        if owns_graph:
+            driver_graph.close()
+        reset_log_context(log_tokens)
+
+
+class SharedFrontier:
+    """
+    Paralel tarama worker'larının ortak kullandığı, thread-safe BFS kuyruğu.
+
+    Ziyaret edilenler ve işlenmekte olan (in-flight) URL'ler tek bir kilit altında tutulur, böylece
+    aynı kategori iki worker tarafından açılmaz. ``level_synchronous`` açıksa bir seviyenin tüm
+    düğümleri bitmeden bir sonraki seviyeye geçilmez (katı BFS sırası): kuyruğun başındaki düğüm,
+    işlenmekte olan en sığ düğümden daha derindeyse worker bekler.
+    """
+
+    def __init__(self, visited_categories, located_categories, level_synchronous=False):
+        self._cond = threading.Condition()
+        self._visited = visited_categories
+        self._located = located_categories
+        self._in_flight = {}
+        self._processed = 0
+        self.level_synchronous = level_synchronous
+        self.error = None
+
+    def get(self):
+        """
+        Sıradaki (kategori, parent_url) çiftini döndürür; iş yoksa bekler.
+        Kuyruk boş ve işlenmekte olan düğüm kalmadıysa tarama bitmiştir ve None döner; abort() ile
+        durdurulan taramada da None döner.
+        """
+        with self._cond:
+            while True:
+                if self.error is not None:
+                    return None
+                while self._located and not self._level_pending():
+                    current_category, parent_url = self._located.popleft()
+                    category_id = current_category['url']
+                    if category_id in self._visited or category_id in self._in_flight:
+                        continue
+                    self._in_flight[category_id] = (current_category, parent_url)
+                    return current_category, parent_url
+                if not self._in_flight:
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait()
+
+    def _level_pending(self):
+        """level_synchronous modunda, kuyruğun başındaki düğümün seviyesinden daha sığ bir düğüm hâlâ işleniyorsa True."""
+        if not self.level_synchronous or not self._in_flight:
+            return False
+        shallowest = min(category['level'] for category, _parent_url in self._in_flight.values())
+        return self._located.peek_level() > shallowest
+
+    def complete(self, current_category, children):
+        """
+        Kategoriyi ziyaret edildi olarak işaretler ve alt kategorilerini kuyruğa ekler.
+        (işlenen sayısı, kuyruğa alınan alt kategoriler) döndürür; seviye sınırına takılanlar listede yoktur.
+        """
+        with self._cond:
+            category_id = current_category['url']
+            self._visited.add(category_id)
+            self._in_flight.pop(category_id, None)
+            children = self._located.extend(children)
+            self._processed += 1
+            self._cond.notify_all()
+            return self._processed, children
+
+    def abort(self, error):
+        """Taramayı durdurur: get() bundan sonra None döner, hata ana thread'de yeniden fırlatılır."""
+        with self._cond:
+            self.error = error
+            self._cond.notify_all()
+
+    def is_visited(self, category_id):
+        with self._cond:
+            return category_id in self._visited
+
+    def size(self):
+        """Kuyrukta bekleyen kategori sayısı (telemetri için)."""
+        with self._cond:
+            return len(self._located)
+
+    def in_flight(self):
+        """Şu anda işlenmekte olan kategori sayısı, yani meşgul tarayıcılar."""
+        with self._cond:
+            return len(self._in_flight)
+
+
+def _crawl_worker(driver, writer, journal, frontier, locator, is_loaded_locator, is_leaf, wait_time, normalize_url,
+                  incremental=None, schedule=None, snapshot=None):
+    """
+    Paralel taramada bir tarayıcıyı süren worker; kuyruk bitene kadar kategori işler.
+    Sayfa hataları loglanıp geçilir; journal ya da checkpoint yazılamazsa tarama abort() ile durdurulur ki
+    diğer worker'lar seviye bariyerinde sonsuza dek beklemesin.
+    """
+    try:
+        while True:
+            item = frontier.get()
+            if item is None:
+                return
+            current_category, parent_url = item
+            children = []
+            try:
+                children = _process_category(driver, writer, current_category, parent_url, locator, is_loaded_locator,
+                                             is_leaf, wait_time, frontier.is_visited, normalize_url, incremental,
+                                             schedule, snapshot)
+            except Exception as e:
+                logging.error("Kategori işlenemedi: %s - %s", current_category['url'], e)
+            finally:
+                processed, children = frontier.complete(current_category, children)
+                journal.record_page(current_category['url'], children)
+            if processed % SAVE_EVERY == 0:
+                _checkpoint(writer, journal)
+    except Exception as e:
+        logging.error("Tarama durduruluyor: %s", e)
+        frontier.abort(e)
+
+
+def scrape_menu_parallel(drivers, locator, is_loaded_locator, is_leaf, wait_time=10, visited_file=None,
+                         located_file=None, checkpoint_dir=None, level_synchronous=False, driver_graph=None,
+                         visited_index=CRAWL_VISITED_INDEX, url_normalizer=None, frontier_order=CRAWL_FRONTIER_ORDER,
+                         level_cap=None, incremental=CRAWL_INCREMENTAL, full_refresh=CRAWL_FULL_REFRESH, max_age=None,
+                         priority=CRAWL_JOB_PRIORITY, menu_tree=None, snapshots=None, tabs=1):
+    """
+    scrape_menu'nün birden fazla tarayıcıyla paralel çalışan hali. Her driver kendi worker thread'inde
+    ortak kuyruktan kategori çeker; Neo4j çıktısı ve checkpoint journal'ı scrape_menu ile aynıdır.
+
+    :param drivers: Selenium WebDriver listesi; ilk driver root sayfasında açık olmalıdır
+    :param level_synchronous: True ise seviyeler katı BFS sırasıyla, birbiri ardına işlenir
+    :param tabs: Her driver'da açılacak sekme sayısı; her sekme kendi worker'ında, ayrı bir tarayıcı gibi çalışır
+    Diğer parametreler scrape_menu ile aynıdır; menu_tree verilirse menü ağacını worker'lar başlamadan ilk driver çıkarır.
+
+    Örnek (havuzdan "light" profilli üç tarayıcı ile):
+        pool = get_pool()
+        sessions = [pool.acquire(profile="light") for _ in range(3)]
+        sessions[0].driver.get(root_url)
+        scrape_menu_parallel([s.driver for s in sessions], locator, is_loaded_locator, is_leaf)
+    """
+    # Sekmeler root sayfasında açık olan ilk pencereden sonra açılır; ilk sekme driver'ın kendi penceresidir
+    tab_sessions = [TabSession(driver, tabs) for driver in drivers] if tabs > 1 else []
+    if tab_sessions:
+        drivers = [tab for session in tab_sessions for tab in session.tabs]
+
+    owns_graph = driver_graph is None
+    if owns_graph:
+        driver_graph = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    writer = _start_writer(driver_graph)
+    recrawl = IncrementalCrawl(full_refresh, max_age).load(driver_graph) if incremental or full_refresh else None
+    normalize_url = url_normalizer or UrlNormalizer()
+    journal, visited_categories, located_categories = _open_checkpoint(checkpoint_dir, normalize_url(drivers[0].current_url),
+                                                                       visited_file, located_file, visited_index,
+                                                                       frontier_order, level_cap)
+    frontier = SharedFrontier(visited_categories, located_categories, level_synchronous)
+    crawl_id = os.path.basename(os.path.normpath(journal.checkpoint_dir))
+    # Bu thread'in (ve worker'ların) logları tarama kimliğiyle etiketlenir
+    log_tokens = set_log_context(crawl_id=crawl_id)
+    schedule = partial(host_scheduler.ticket, job=f"crawl:{crawl_id}", priority=priority)
+    snapshot = _snapshotter(snapshots, crawl_id)
+    telemetry.register_gauge("frontier_size", crawl_id, frontier.size)
+    telemetry.register_gauge("active_sessions", crawl_id, frontier.in_flight)
+
+    workers = [
+        threading.Thread(
+            target=bind_log_context(_crawl_worker),
+            args=(driver, writer, journal, frontier, locator, is_loaded_locator, is_leaf, wait_time, normalize_url,
+                  recrawl, schedule, snapshot),
+            name=f"menu-crawler-{i}",
+        )
+        for i, driver in enumerate(drivers)
+    ]
+    try:
+        _harvest_menu_tree(drivers[0], writer, journal, visited_categories, located_categories, menu_tree,
+                           is_loaded_locator, wait_time, normalize_url, recrawl, schedule, snapshot)
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if frontier.error is not None:
+            raise frontier.error
+        _checkpoint(writer, journal)
+
+        logging.info("Tüm kategoriler %s tarayıcı ile işlendi.", len(drivers))
+    finally:
+        for session in tab_sessions:
+            session.close()
+        telemetry.unregister_gauge("frontier_size", crawl_id)
+        telemetry.unregister_gauge("active_sessions", crawl_id)
+        logging.info("Ziyaret indeksi: %s", visited_categories.stats())
+        logging.info("Kuyruk: %s", located_categories.stats())
+        # Son durumu kaydet
+        _close_checkpoint(writer, journal)
+        _report_recrawl(recrawl, driver_graph, visited_categories)
+        visited_categories.close()
+        located_categories.close()
+        if owns_graph:
+            driver_graph.close()
+        reset_log_context(log_tokens)
@@ -0,0 +1,147 @@
+from urllib.parse import urljoin
+
+from cssselect import HTMLTranslator
+
+from app.core import telemetry
+from app.utils.dom_extract import FIND_ELEMENTS_JS, locator_to_query
+
+# Items matching this (or whose link does) have a submenu that is only loaded on demand, when they come
+# without one in the DOM.
+MENU_TREE_LAZY = "[aria-haspopup='true'], [data-lazy]"
+MENU_TREE_TRIGGERS = (None, "hover", "click")
+
+# Runs in the page: walks every top-level menu container and returns its items depth first as flat rows
+# {name, href, depth, parent, lazy, truncated}, where ``parent`` is the index of the parent row (-1 for
+# top-level items). Item, link, submenu and toggle selectors are relative to their item (":scope > ...").
+# Hover and click triggers run just before an item's submenu is read, so flyouts built synchronously by
+# event handlers are included; a submenu that is still empty afterwards is reported as lazy.
+MENU_TREE_SCRIPT = FIND_ELEMENTS_JS + """
+const [kind, query, itemQuery, linkQuery, submenuQuery, trigger, toggleQuery, lazyQuery, maxDepth] = arguments;
+const limit = maxDepth === null || maxDepth === undefined ? Infinity : maxDepth;
+const containers = findElements(kind, query);
+const topLevel = containers.filter((el) => !containers.some((other) => other !== el && other.contains(el)));
+const nodes = [];
+const expand = (item) => {
+    const target = (toggleQuery && item.querySelector(toggleQuery)) || item;
+    if (trigger === 'hover') {
+        for (const type of ['pointerover', 'mouseover', 'mouseenter']) {
+            target.dispatchEvent(new MouseEvent(type, {bubbles: type !== 'mouseenter'}));
+        }
+    } else if (trigger === 'click') {
+        target.click();
+    }
+};
+const walk = (container, depth, parent) => {
+    for (const item of container.querySelectorAll(itemQuery)) {
+        const link = item.querySelector(linkQuery);
+        if (!link) continue;
+        if (trigger && depth < limit) expand(item);
+        const submenu = submenuQuery ? item.querySelector(submenuQuery) : null;
+        const hasItems = !!submenu && submenu.querySelector(itemQuery) !== null;
+        const marked = !!lazyQuery && (item.matches(lazyQuery) || link.matches(lazyQuery));
+        const index = nodes.length;
+        nodes.push({
+            name: (link.textContent || '').replace(/\\s+/g, ' ').trim(),
+            href: link.href || link.getAttribute('href'),
+            depth, parent,
+            lazy: !hasItems && (!!submenu || marked),
+            truncated: hasItems && depth >= limit,
+        });
+        if (hasItems && depth < limit) walk(submenu, depth + 1, index);
+    }
+};
+for (const container of topLevel) walk(container, 1, -1);
+return nodes;
+"""
+
+_translator = HTMLTranslator()
+
+
+def _select(element, query):
+    return element.xpath(_translator.css_to_xpath(query))
+
+
+def _matches(element, query):
+    return bool(element.xpath(_translator.css_to_xpath(query, prefix="self::")))
+
+
+def harvest_menu_html(document, base_url, kind, query, item_query, link_query, submenu_query, trigger=None,
+                      toggle_query=None, lazy_query=MENU_TREE_LAZY, max_depth=None):
+    """
+    lxml equivalent of MENU_TREE_SCRIPT for a parsed document, with the same arguments and rows. Triggers
+    can not run on static HTML and are ignored; relative links are resolved against ``base_url``.
+    """
+    limit = float("inf") if max_depth is None else max_depth
+    if kind == "xpath":
+        containers = [found for found in document.xpath(query) if hasattr(found, "iterancestors")]
+    else:
+        containers = _select(document, query)
+    found = set(containers)
+    top_level = [el for el in containers if not any(ancestor in found for ancestor in el.iterancestors())]
+    nodes = []
+
+    def walk(container, depth, parent):
+        for item in _select(container, item_query):
+            links = _select(item, link_query)
+            if not links:
+                continue
+            link = links[0]
+            submenus = _select(item, submenu_query) if submenu_query else []
+            has_items = bool(submenus) and bool(_select(submenus[0], item_query))
+            marked = bool(lazy_query) and (_matches(item, lazy_query) or _matches(link, lazy_query))
+            href = link.get("href")
+            index = len(nodes)
+            nodes.append({
+                "name": " ".join(link.text_content().split()),
+                "href": urljoin(base_url, href) if href else href,
+                "depth": depth,
+                "parent": parent,
+                "lazy": not has_items and (bool(submenus) or marked),
+                "truncated": has_items and depth >= limit,
+            })
+            if has_items and depth < limit:
+                walk(submenus[0], depth + 1, index)
+
+    for container in top_level:
+        walk(container, 1, -1)
+    return nodes
+
+
+class MenuTree:
+    """
+    Describes a category menu that is shipped whole in the DOM of a page (nested lists, hidden flyouts),
+    so ``scrape_menu`` can read the entire hierarchy from one page load with one script call.
+
+    ``container`` is a Selenium locator for the top-level menu list(s); containers nested inside another
+    match are ignored. ``item``, ``link`` and ``submenu`` are CSS selectors relative to a container or an
+    item: the items of a list, an item's link and its nested list. ``trigger`` ("hover" or "click") is fired
+    on each item, or on its ``toggle`` element, before its submenu is read. Items without submenu items that
+    have an empty submenu or match ``lazy`` are lazily loaded branches: they are crawled page by page.
+    ``max_depth`` is the deepest level harvested (the root is level 0); deeper categories are not crawled.
+    """
+
+    def __init__(self, container, item=":scope > li", link=":scope > a", submenu=":scope > ul", trigger=None,
+                 toggle=None, lazy=MENU_TREE_LAZY, max_depth=None):
+        if trigger not in MENU_TREE_TRIGGERS:
+            raise ValueError(f"Unknown menu trigger {trigger!r}, expected one of {MENU_TREE_TRIGGERS}")
+        self.container = container
+        self.item = item
+        self.link = link
+        self.submenu = submenu
+        self.trigger = trigger
+        self.toggle = toggle
+        self.lazy = lazy
+        self.max_depth = max_depth
+
+    def _args(self):
+        kind, query = locator_to_query(self.container)
+        return [kind, query, self.item, self.link, self.submenu, self.trigger, self.toggle, self.lazy, self.max_depth]
+
+    def harvest(self, driver):
+        """Read the menu from the page open in ``driver``: a list of rows as described for MENU_TREE_SCRIPT."""
+        with telemetry.timed("extract"):
+            return driver.execute_script(MENU_TREE_SCRIPT, *self._args())
+
+    def harvest_html(self, document, base_url):
+        """Same rows from an lxml document, e.g. a stored page source."""
+        return harvest_menu_html(document, base_url, *self._args())
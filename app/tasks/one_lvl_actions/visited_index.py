@@ -0,0 +1,244 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+
+# "memory": exact set of URLs; "bloom": fixed memory per URL with a bounded false-positive rate;
+# "disk": exact, kept in SQLite next to the checkpoint so memory does not grow with the crawl.
+CRAWL_VISITED_INDEX = os.getenv("CRAWL_VISITED_INDEX", "memory")
+CRAWL_BLOOM_CAPACITY = int(os.getenv("CRAWL_BLOOM_CAPACITY", 1_000_000))
+CRAWL_BLOOM_ERROR_RATE = float(os.getenv("CRAWL_BLOOM_ERROR_RATE", 0.001))
+VISITED_INDEX_MODES = ("memory", "bloom", "disk")
+# File suffix of each mode's ``save`` format, used for the visited part of checkpoint snapshots.
+VISITED_SNAPSHOT_SUFFIXES = {"memory": "jsonl", "bloom": "bloom", "disk": "sqlite"}
+
+
+def _fsync_close(f):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+class MemoryVisitedIndex(set):
+    """Exact in-memory index; the plain ``set`` the crawler always used."""
+
+    mode = "memory"
+
+    def save(self, path):
+        """Write the URLs to ``path``, one JSON string per line."""
+        f = open(path, "w", encoding="utf-8")
+        for url in self:
+            f.write(json.dumps(url, ensure_ascii=False) + "\n")
+        _fsync_close(f)
+
+    def restore(self, path):
+        """Add the URLs saved at ``path``, reading them line by line."""
+        with open(path, encoding="utf-8") as f:
+            self.update(json.loads(line) for line in f)
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self)}
+
+
+class _BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.bits / capacity * math.log(2))), 1)
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def positions(self, h1, h2):
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def contains(self, positions):
+        return all(self.array[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, positions):
+        for p in positions:
+            self.array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class BloomVisitedIndex:
+    """
+    Scalable Bloom filter: about 1.2 bytes per URL at a 0.1% false-positive rate instead of the URL string.
+
+    Starts with one filter sized for ``capacity`` URLs. When it fills up, a filter twice as large with a
+    tighter error rate is added, so the overall false-positive rate stays below ``error_rate`` however
+    far the crawl grows. A false positive means a page is taken as visited and skipped; there are no
+    false negatives, so no page is crawled twice.
+    """
+
+    mode = "bloom"
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity=CRAWL_BLOOM_CAPACITY, error_rate=CRAWL_BLOOM_ERROR_RATE):
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filters = [_BloomFilter(capacity, error_rate * (1 - self.TIGHTENING))]
+
+    @staticmethod
+    def _hash(url):
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def __contains__(self, url):
+        h1, h2 = self._hash(url)
+        with self._lock:
+            return any(bloom.contains(bloom.positions(h1, h2)) for bloom in self._filters)
+
+    def add(self, url):
+        h1, h2 = self._hash(url)
+        with self._lock:
+            if any(bloom.contains(bloom.positions(h1, h2)) for bloom in self._filters):
+                return
+            current = self._filters[-1]
+            if current.count >= current.capacity:
+                current = _BloomFilter(current.capacity * 2,
+                                       self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** len(self._filters))
+                self._filters.append(current)
+            current.add(current.positions(h1, h2))
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __len__(self):
+        with self._lock:
+            return sum(bloom.count for bloom in self._filters)
+
+    def save(self, path):
+        """Write the filters to ``path``: a JSON header line, then the bit array of each filter."""
+        with self._lock:
+            header = {"error_rate": self.error_rate,
+                      "filters": [{"capacity": bloom.capacity, "bits": bloom.bits, "hashes": bloom.hashes,
+                                   "count": bloom.count} for bloom in self._filters]}
+            f = open(path, "wb")
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for bloom in self._filters:
+                f.write(bloom.array)
+            _fsync_close(f)
+
+    def restore(self, path):
+        """Replace the filters of this (still empty) index with the ones saved at ``path``."""
+        filters = []
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            for spec in header["filters"]:
+                bloom = _BloomFilter.__new__(_BloomFilter)
+                bloom.capacity, bloom.bits, bloom.hashes, bloom.count = (spec["capacity"], spec["bits"], spec["hashes"],
+                                                                         spec["count"])
+                bloom.array = bytearray(f.read((bloom.bits + 7) // 8))
+                filters.append(bloom)
+        with self._lock:
+            if any(bloom.count for bloom in self._filters):
+                raise ValueError("A Bloom index can only be restored while it is empty")
+            self.error_rate = header["error_rate"]
+            self._filters = filters
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "entries": sum(bloom.count for bloom in self._filters),
+                "filters": len(self._filters),
+                "bytes": sum(len(bloom.array) for bloom in self._filters),
+                "error_rate": self.error_rate,
+            }
+
+
+class DiskVisitedIndex:
+    """
+    Exact index in a SQLite table; memory use stays flat however many URLs the crawl visits.
+
+    The table is rebuilt from the checkpoint journal on every start, so it never disagrees with it.
+    """
+
+    mode = "disk"
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")  # Derived data: the journal is what makes the crawl durable
+        self._conn.execute("CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._conn.execute("DELETE FROM visited")
+        self._conn.commit()
+        self._count = 0
+        self._uncommitted = 0
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM visited WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, url):
+        with self._lock:
+            self._count += self._conn.execute("INSERT OR IGNORE INTO visited VALUES (?)", (url,)).rowcount
+            self._uncommitted += 1
+            if self._uncommitted >= self.COMMIT_EVERY:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def update(self, urls):
+        with self._lock:
+            for url in urls:
+                self._count += self._conn.execute("INSERT OR IGNORE INTO visited VALUES (?)", (url,)).rowcount
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def save(self, path):
+        """Copy the table into a new SQLite file at ``path``, without reading it into memory."""
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+            if os.path.exists(path):
+                os.remove(path)
+            self._conn.execute("VACUUM INTO ?", (path,))
+
+    def restore(self, path):
+        """Add the URLs of a table saved at ``path``; the copy runs inside SQLite."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("ATTACH DATABASE ? AS saved", (path,))
+            try:
+                self._count += self._conn.execute("INSERT OR IGNORE INTO visited SELECT url FROM saved.visited").rowcount
+                self._conn.commit()
+            finally:
+                self._conn.execute("DETACH DATABASE saved")
+            self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self), "path": self.path}
+
+
+def open_visited_index(mode=CRAWL_VISITED_INDEX, checkpoint_dir=None, filename="visited.sqlite"):
+    """Create an empty visited index; the disk mode keeps its table in ``filename`` under ``checkpoint_dir``."""
+    if mode == "memory":
+        return MemoryVisitedIndex()
+    if mode == "bloom":
+        return BloomVisitedIndex()
+    if mode == "disk":
+        return DiskVisitedIndex(os.path.join(checkpoint_dir or ".", filename))
+    raise ValueError(f"Unknown visited index {mode!r}, expected one of {VISITED_INDEX_MODES}")
@@ -3,4 +3,8 @@ from selenium.webdriver.common.by import By
 
 class ElementLocator(BaseModel):
     by: str = Field(..., description="Selenium By strategy (e.g., ID, CLASS_NAME)")
-    value: str = Field(..., description="Value of the element locator")
\ No newline at end of file
+    value: str = Field(..., description="Value of the element locator")
+
+    def as_tuple(self):
+        """Selenium (By, value) locator; ``by`` may be a By attribute name ("CSS_SELECTOR") or its value ("css selector")."""
+        return getattr(By, self.by.upper(), self.by), self.value
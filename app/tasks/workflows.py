@@ -1,22 +1,59 @@
-from app.tasks.actions import open_page, click, get_elements, extract_attribute
+from selenium.webdriver.common.by import By
+from app.core.session_pool import get_pool
+from app.core.tabs import TABS_PER_SESSION, TabSession
+from app.tasks.actions import WebScraper
+from app.utils.http_engine import engine_retries, run_with_engine, http_scrape_titles, http_extract_title
+from app.utils.scraper_helpers import open_page, extract_title
 
-def scrape_titles(url, title_selector):
-    """Task: Open a page and scrape titles."""
-    driver = open_page(url)
-    try:
-        elements = get_elements(driver, title_selector)
-        titles = extract_attribute(elements, attribute="text")
-        return titles
-    finally:
-        driver.quit()
+def scrape_titles(url, title_selector, engine="browser", profile="default"):
+    """Task: Open a page and scrape titles (engine: "browser", "http" or "auto")."""
+    return run_with_engine(
+        url, engine,
+        lambda: http_scrape_titles(url, title_selector, engine_retries(engine)),
+        lambda: _browser_scrape_titles(url, title_selector, profile),
+    )
 
-def scrape_with_click(url, first_click_selector, second_selector):
-    """Task: Open a page, click an element, and scrape content."""
-    driver = open_page(url)
-    try:
-        click(driver, first_click_selector)
-        elements = get_elements(driver, second_selector)
-        content = extract_attribute(elements, attribute="text")
-        return content
-    finally:
-        driver.quit()
+def scrape_page_title(url, engine="browser", profile="default"):
+    """Task: Open a page and return its title (engine: "browser", "http" or "auto")."""
+    return run_with_engine(url, engine, lambda: http_extract_title(url, engine_retries(engine)),
+                           lambda: _browser_page_title(url, profile))
+
+def _browser_scrape_titles(url, title_selector, profile):
+    with WebScraper(profile=profile) as scraper:
+        locator = (By.CSS_SELECTOR, title_selector)
+        scraper.open_page(url, locator, definition="Open page to scrape titles")
+        rows = scraper.extract_bulk(locator, ["text"], definition="Extract titles")
+        return [row["text"] for row in rows]
+
+def scrape_titles_in_tabs(items, profile="tabs", tabs=TABS_PER_SESSION):
+    """
+    Task: Scrape titles for many (key, url, selector) items in ``tabs`` tabs of one pooled browser session.
+    Yields (key, titles, error) as each page finishes; items are pulled lazily, so several sessions can share one
+    iterator. Always uses the browser; use a profile with page_load_strategy "none", like "tabs".
+    """
+    with get_pool().lease(profile=profile) as driver, TabSession(driver, tabs) as session:
+        for (key, _url, _selector), titles, error in session.map(_tab_scrape_titles, items):
+            yield key, titles, error
+
+def _tab_scrape_titles(tab, item):
+    _key, url, title_selector = item
+    # The tab belongs to the session; WebScraper only borrows it and never quits it.
+    scraper = WebScraper(driver=tab)
+    locator = (By.CSS_SELECTOR, title_selector)
+    scraper.open_page(url, locator, definition="Open page to scrape titles")
+    rows = scraper.extract_bulk(locator, ["text"], definition="Extract titles")
+    return [row["text"] for row in rows]
+
+def _browser_page_title(url, profile):
+    with open_page(url, profile) as driver:
+        return extract_title(driver)
+
+def scrape_with_click(url, first_click_selector, second_selector, profile="default"):
+    """Task: Open a page, click an element, and scrape content (always needs a browser)."""
+    with WebScraper(profile=profile) as scraper:
+        click_locator = (By.CSS_SELECTOR, first_click_selector)
+        content_locator = (By.CSS_SELECTOR, second_selector)
+        scraper.open_page(url, click_locator, definition="Open page to click")
+        scraper.click(click_locator, definition="Click before scraping content")
+        rows = scraper.extract_bulk(content_locator, ["text"], definition="Extract content")
+        return [row["text"] for row in rows]
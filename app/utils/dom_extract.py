@@ -0,0 +1,146 @@
+import logging
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from app.core import telemetry
+from app.core.logging_config import OperationLog
+
+logger = logging.getLogger("web-scraper")
+
+# In-page helpers shared by the injected scripts (bulk extraction, readiness checks).
+FIND_ELEMENTS_JS = """
+const findElements = (kind, query) => {
+    if (kind === 'xpath') {
+        const result = document.evaluate(query, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const found = [];
+        for (let i = 0; i < result.snapshotLength; i++) found.push(result.snapshotItem(i));
+        return found;
+    }
+    return Array.from(document.querySelectorAll(query));
+};
+"""
+
+IS_VISIBLE_JS = """
+const isVisible = (el) => {
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) return false;
+    const style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.opacity !== '0';
+};
+"""
+
+# Runs in the page: finds every element for a CSS/XPath query and reads the requested fields from each
+# one, so a whole list costs a single WebDriver round trip instead of several per element.
+BULK_EXTRACT_SCRIPT = FIND_ELEMENTS_JS + IS_VISIBLE_JS + """
+const [kind, query, fields] = arguments;
+const elements = findElements(kind, query);
+const read = (el, field) => {
+    switch (field) {
+        case 'text': return isVisible(el) ? el.innerText : '';
+        case 'textContent': return el.textContent;
+        case 'visible': return isVisible(el);
+        case 'enabled': return !el.disabled;
+        case 'clickable': return isVisible(el) && !el.disabled;
+        default: {
+            const prop = el[field];
+            if (prop !== undefined && prop !== null && typeof prop !== 'object' && typeof prop !== 'function') return String(prop);
+            return el.getAttribute(field);
+        }
+    }
+};
+return elements.map((el) => {
+    const row = {};
+    for (const field of fields) row[field] = read(el, field);
+    return row;
+});
+"""
+
+
+def _xpath_literal(value):
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    parts = value.split('"')
+    return "concat(" + ", '\"', ".join(f'"{part}"' for part in parts) + ")"
+
+
+def _css_string(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def locator_to_query(locator: tuple):
+    """
+    Translate a Selenium locator into a ("css" | "xpath", query) pair usable outside WebDriver,
+    e.g. from injected JavaScript or an HTML parser.
+    """
+    by, value = locator
+    if by == By.CSS_SELECTOR:
+        return "css", value
+    if by == By.XPATH:
+        return "xpath", value
+    if by == By.ID:
+        return "css", f"[id={_css_string(value)}]"
+    if by == By.NAME:
+        return "css", f"[name={_css_string(value)}]"
+    if by == By.CLASS_NAME:
+        return "css", f"[class~={_css_string(value)}]"
+    if by == By.TAG_NAME:
+        return "css", value
+    if by == By.LINK_TEXT:
+        return "xpath", f"//a[normalize-space(.)={_xpath_literal(value.strip())}]"
+    if by == By.PARTIAL_LINK_TEXT:
+        return "xpath", f"//a[contains(., {_xpath_literal(value)})]"
+    raise ValueError(f"Unsupported locator strategy: {by}")
+
+
+def _read_field(element, field):
+    """Per-element equivalent of the in-page ``read`` helper (one or more round trips per call)."""
+    if field == "text":
+        return element.text
+    if field == "textContent":
+        return element.get_attribute("textContent")
+    if field == "visible":
+        return element.is_displayed()
+    if field == "enabled":
+        return element.is_enabled()
+    if field == "clickable":
+        return element.is_displayed() and element.is_enabled()
+    return element.get_attribute(field)
+
+
+def extract_rows(elements, fields):
+    """Read ``fields`` from already located WebElements, one WebDriver call per element and field."""
+    rows = []
+    log = OperationLog(logger, "extract_rows")
+    for element in elements:
+        row = {}
+        for field in fields:
+            try:
+                row[field] = _read_field(element, field)
+            except Exception as e:
+                log.element(field, logging.WARNING, "Failed to read %s: %s", field, e)
+                row[field] = None
+        rows.append(row)
+    if log.counts:
+        log.summary(logging.WARNING)
+    return rows
+
+
+def bulk_extract(driver, locator: tuple, fields, fallback=True):
+    """
+    Return one dict per element matching ``locator`` with the requested ``fields``, in a single
+    ``execute_script`` call. Supported fields are ``text`` (visible text, like WebElement.text),
+    ``textContent``, ``visible``, ``enabled``, ``clickable`` and any DOM property or attribute name.
+
+    If the script can not run (e.g. a driver without JavaScript), falls back to the per-element path
+    when ``fallback`` is True.
+    """
+    fields = list(fields)
+    kind, query = locator_to_query(locator)
+    with telemetry.timed("extract"):
+        try:
+            return driver.execute_script(BULK_EXTRACT_SCRIPT, kind, query, fields)
+        except WebDriverException as e:
+            if not fallback:
+                raise
+            logger.warning("Bulk extraction failed, falling back to per-element reads: %s", e)
+            return extract_rows(driver.find_elements(*locator), fields)
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import lxml.html
+import urllib3
+
+from app.core import telemetry
+from app.core.scheduler import host_scheduler
+
+logger = logging.getLogger("web-scraper")
+
+ENGINES = ("http", "browser", "auto")
+HTTP_TIMEOUT = float(os.getenv("HTTP_ENGINE_TIMEOUT", 10))
+# How long a host stays on the engine that last worked for it before "auto" probes HTTP again.
+ENGINE_MEMORY_TTL = float(os.getenv("ENGINE_MEMORY_TTL", 6 * 3600))
+# Pages with less visible body text than this (and some scripts) are treated as rendered client side.
+MIN_STATIC_TEXT = 200
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/131.0.0.0 Safari/537.36")
+APP_ROOT_IDS = ("root", "app", "__next", "__nuxt", "svelte")
+# In "auto" mode the HTTP engine gets one attempt (redirects are still followed), so a slow or failing host
+# falls back to the browser after one HTTP_TIMEOUT instead of three.
+AUTO_RETRIES = urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=5)
+
+_http = urllib3.PoolManager(
+    num_pools=50,
+    maxsize=10,
+    headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+    timeout=urllib3.Timeout(total=HTTP_TIMEOUT),
+    retries=urllib3.Retry(total=2, redirect=5, backoff_factor=0.2),
+)
+
+
+class HttpFetchError(Exception):
+    """Raised when a page can not be fetched (or is not HTML) over plain HTTP."""
+
+
+class BrowserRequired(Exception):
+    """
+    Raised by the HTTP engine when the static HTML is not enough (nothing matched, or the page is
+    rendered client side). ``result`` carries what the HTTP engine did find.
+    """
+
+    def __init__(self, reason, result=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.result = result
+
+
+def _request(ticket, method, url, **kwargs):
+    """Pooled request whose status (or timeout) is reported to the host scheduler ticket."""
+    try:
+        response = _http.request(method, url, **kwargs)
+    except urllib3.exceptions.HTTPError as e:
+        ticket.record(timed_out=isinstance(getattr(e, "reason", e), urllib3.exceptions.TimeoutError))
+        raise
+    ticket.record(response.status)
+    return response
+
+
+def engine_retries(engine):
+    """urllib3 retries for the HTTP fetches of ``engine``; None keeps the client's default."""
+    return AUTO_RETRIES if engine == "auto" else None
+
+
+def fetch_document(url, retries=None):
+    """
+    GET ``url`` with the pooled client and parse it; links in the document are made absolute.
+    ``retries`` overrides the client's retries (see ``engine_retries``).
+    """
+    try:
+        with host_scheduler.ticket(url, grid=False) as ticket, telemetry.timed("page_load", engine="http") as span:
+            span.set_attribute("url", url)
+            response = _request(ticket, "GET", url, retries=retries)
+    except urllib3.exceptions.HTTPError as e:
+        # Timeouts arrive wrapped in MaxRetryError once the retries are used up.
+        if isinstance(getattr(e, "reason", e), urllib3.exceptions.TimeoutError):
+            telemetry.timeouts.add(1, {"step": "page_load"})
+        raise HttpFetchError(f"GET {url} failed: {e}") from e
+    telemetry.pages.add(1, {"engine": "http"})
+    if response.status >= 400:
+        raise HttpFetchError(f"GET {url} returned HTTP {response.status}")
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and "html" not in content_type:
+        raise HttpFetchError(f"GET {url} returned {content_type}, not HTML")
+
+    charset = None
+    if "charset=" in content_type:
+        charset = content_type.split("charset=", 1)[1].split(";")[0].strip()
+    parser = lxml.html.HTMLParser(encoding=charset) if charset else None
+    final_url = response.url or url
+    document = lxml.html.document_fromstring(response.data, parser=parser, base_url=final_url)
+    document.make_links_absolute(final_url, handle_failures="ignore")
+    return document
+
+
+def fetch_validators(url, etag=None, last_modified=None, schedule=None):
+    """
+    Conditional HEAD for ``url`` with the validators of an earlier visit. ``schedule`` makes the host
+    scheduler ticket, e.g. a crawl's ``partial(host_scheduler.ticket, job=..., priority=...)``, so the
+    request counts against that job; by default it runs under the API job.
+
+    Returns ``(not_modified, validators)``: ``not_modified`` is True when the server answered 304, and
+    ``validators`` holds the ``etag`` and ``last_modified`` headers it sent (None when absent).
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        with (schedule or host_scheduler.ticket)(url, grid=False) as ticket:
+            response = _request(ticket, "HEAD", url, headers=headers)
+    except urllib3.exceptions.HTTPError as e:
+        raise HttpFetchError(f"HEAD {url} failed: {e}") from e
+    if response.status >= 400:
+        raise HttpFetchError(f"HEAD {url} returned HTTP {response.status}")
+    not_modified = response.status == 304 and bool(headers)
+    # A 304 may leave the validators out; the ones sent are still current then.
+    validators = {
+        "etag": response.headers.get("ETag") or (etag if not_modified else None),
+        "last_modified": response.headers.get("Last-Modified") or (last_modified if not_modified else None),
+    }
+    return not_modified, validators
+
+
+def _text(element):
+    return " ".join(element.text_content().split())
+
+
+def looks_js_rendered(document):
+    """Heuristic: True if the page needs JavaScript to show its content."""
+    body_text = document.xpath(
+        "//body//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::noscript)]"
+    )
+    visible_chars = sum(len(text.strip()) for text in body_text)
+    has_scripts = bool(document.xpath("//script"))
+    if has_scripts and visible_chars < MIN_STATIC_TEXT:
+        return True
+    for root_id in APP_ROOT_IDS:
+        roots = document.xpath(f"//*[@id='{root_id}']")
+        if roots and not _text(roots[0]) and len(roots[0]) == 0:
+            return True
+    noscript = " ".join(_text(el) for el in document.xpath("//noscript")).lower()
+    return "enable javascript" in noscript and visible_chars < MIN_STATIC_TEXT * 5
+
+
+def http_scrape_titles(url, selector, retries=None):
+    """Texts of the elements matching a CSS selector in the server-rendered HTML."""
+    document = fetch_document(url, retries)
+    titles = [_text(element) for element in document.cssselect(selector)]
+    if not titles:
+        raise BrowserRequired("selector matched nothing", titles)
+    if looks_js_rendered(document):
+        raise BrowserRequired("page looks rendered client side", titles)
+    return titles
+
+
+def http_extract_title(url, retries=None):
+    """The <title> of the server-rendered HTML."""
+    document = fetch_document(url, retries)
+    title = document.findtext(".//title")
+    title = " ".join(title.split()) if title else ""
+    if not title:
+        raise BrowserRequired("no <title> in the static HTML", title)
+    if looks_js_rendered(document):
+        raise BrowserRequired("page looks rendered client side", title)
+    return title
+
+
+class EngineMemory:
+    """Remembers, per host, which engine last produced a result in ``auto`` mode."""
+
+    def __init__(self, ttl=ENGINE_MEMORY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._counts = {"http": 0, "browser": 0, "fallbacks": 0}
+
+    def get(self, host):
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return None
+            return entry[0]
+
+    def remember(self, host, engine, fell_back=False):
+        with self._lock:
+            self._hosts[host] = (engine, time.monotonic())
+            self._counts[engine] += 1
+            self._counts["fallbacks"] += fell_back
+
+    def stats(self):
+        with self._lock:
+            return {**self._counts, "hosts": {host: engine for host, (engine, _) in self._hosts.items()}}
+
+
+engine_memory = EngineMemory()
+
+
+def run_with_engine(url, engine, http_fn, browser_fn):
+    """
+    Run a scrape with the requested engine.
+
+    ``http``: only the HTTP engine; when it asks for a browser, whatever it found is returned.
+    ``browser``: only Selenium.
+    ``auto``: the HTTP engine first, unless this host is known to need a browser; falls back to
+    Selenium when the fetch fails, nothing matches or the page looks rendered client side.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    if engine == "browser":
+        return browser_fn()
+
+    host = urlsplit(url).netloc
+    # Not remembered again: the entry has to expire for the host to be probed with HTTP again.
+    if engine == "auto" and engine_memory.get(host) == "browser":
+        return browser_fn()
+
+    try:
+        result = http_fn()
+    except BrowserRequired as e:
+        if engine == "http":
+            return e.result
+        logger.info("HTTP engine is not enough for %s (%s), falling back to the browser", url, e.reason)
+    except HttpFetchError as e:
+        if engine == "http":
+            raise
+        logger.info("HTTP engine failed for %s (%s), falling back to the browser", url, e)
+    else:
+        if engine == "auto":
+            engine_memory.remember(host, "http")
+        return result
+
+    result = browser_fn()
+    engine_memory.remember(host, "browser", fell_back=True)
+    return result
@@ -0,0 +1,152 @@
+"""
+Re-run locators against stored page snapshots, without a browser.
+
+    python -m app.utils.offline_extract --dir snapshots --run <crawl id> \\
+        --locator titles=CSS_SELECTOR:h2.title --fields text,href > titles.ndjson
+
+Prints one JSON line per page: its ``url`` and, for every locator name, the rows read from it.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+
+from app.core.snapshots import SNAPSHOT_DIR, SnapshotStore, read_object
+from app.tasks.parameters import ElementLocator
+from app.utils.dom_extract import locator_to_query
+
+logger = logging.getLogger("web-scraper")
+
+# Worker processes for offline extraction (0: one per CPU).
+OFFLINE_EXTRACT_WORKERS = int(os.getenv("OFFLINE_EXTRACT_WORKERS", 0))
+OFFLINE_EXTRACT_CHUNK = 32  # Pages handed to a worker process at a time
+
+HIDDEN_TAGS = ("head", "script", "style", "template", "noscript")
+
+
+def _is_hidden(element):
+    """Best guess at visibility from static HTML: hidden attributes and inline display/visibility styles."""
+    for node in element.iterancestors():
+        if node.tag in HIDDEN_TAGS:
+            return True
+    for node in [element, *element.iterancestors()]:
+        if node.get("hidden") is not None or node.get("aria-hidden") == "true":
+            return True
+        style = (node.get("style") or "").replace(" ", "").lower()
+        if "display:none" in style or "visibility:hidden" in style:
+            return True
+    return False
+
+
+def read_field(element, field):
+    """Offline equivalent of the in-page ``read`` helper of BULK_EXTRACT_SCRIPT."""
+    if field == "text":
+        return "" if _is_hidden(element) else " ".join(element.text_content().split())
+    if field == "textContent":
+        return element.text_content()
+    if field == "visible":
+        return not _is_hidden(element)
+    if field == "enabled":
+        return element.get("disabled") is None
+    if field == "clickable":
+        return not _is_hidden(element) and element.get("disabled") is None
+    return element.get(field)
+
+
+def _find(document, kind, query):
+    if kind == "xpath":
+        return [found for found in document.xpath(query) if isinstance(found, lxml.html.HtmlElement)]
+    return document.cssselect(query)
+
+
+def extract_html(html, url, queries, fields):
+    """
+    Rows for each named (kind, query) pair in one page source, as ``bulk_extract`` would return them
+    in a browser. Links are made absolute against ``url``, like ``element.href``.
+    """
+    document = lxml.html.document_fromstring(html, base_url=url)
+    document.make_links_absolute(url, handle_failures="ignore")
+    return {name: [{field: read_field(found, field) for field in fields} for found in _find(document, kind, query)]
+            for name, (kind, query) in queries.items()}
+
+
+def _extract_snapshot(task):
+    root, url, digest, queries, fields = task
+    try:
+        return {"url": url, **extract_html(read_object(root, digest).decode("utf-8"), url, queries, fields)}
+    except Exception as e:
+        return {"url": url, "error": str(e)}
+
+
+def _queries(locators):
+    """{name: ElementLocator or (By, value)} as {name: (kind, query)}, picklable for worker processes."""
+    return {name: locator_to_query(locator.as_tuple() if isinstance(locator, ElementLocator) else locator)
+            for name, locator in locators.items()}
+
+
+def extract_snapshots(store, run, locators, fields=("text",), workers=OFFLINE_EXTRACT_WORKERS, urls=None):
+    """
+    Run ``locators`` against every page captured in ``run`` of ``store`` and yield one dict per page:
+    ``{"url": ..., <name>: [row, ...], ...}``, or ``{"url": ..., "error": ...}`` if a page can not be read.
+
+    Pages are parsed with lxml in a pool of ``workers`` processes (0: one per CPU, 1: in this process).
+    ``urls`` restricts the run to those pages. Results come in manifest (URL) order.
+    """
+    queries = _queries(locators)
+    fields = list(fields)
+    wanted = set(urls) if urls is not None else None
+    tasks = [(store.root, url, digest, queries, fields) for url, digest in store.entries(run)
+             if wanted is None or url in wanted]
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+    if workers == 1 or len(tasks) <= 1:
+        yield from map(_extract_snapshot, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_extract_snapshot, tasks, chunksize=OFFLINE_EXTRACT_CHUNK)
+    logger.info("Offline extraction of %s pages from run %s took %.1f s with %s workers",
+                len(tasks), run, time.monotonic() - started, workers)
+
+
+def _parse_locator(spec):
+    name, _, locator = spec.partition("=")
+    by, _, value = locator.partition(":")
+    if not name or not by or not value:
+        raise argparse.ArgumentTypeError(f"Expected NAME=BY:VALUE, got {spec!r}")
+    return name, ElementLocator(by=by, value=value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="Snapshot store directory (default: SNAPSHOT_DIR)")
+    parser.add_argument("--run", help="Run to extract from; without it the runs in the store are listed")
+    parser.add_argument("--locator", action="append", type=_parse_locator, default=[],
+                        help="NAME=BY:VALUE, e.g. titles=CSS_SELECTOR:h2.title (repeatable)")
+    parser.add_argument("--fields", default="text", help="Comma-separated fields read from every element")
+    parser.add_argument("--workers", type=int, default=OFFLINE_EXTRACT_WORKERS, help="Worker processes (0: one per CPU)")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("--dir is required when SNAPSHOT_DIR is not set")
+
+    store = SnapshotStore(args.dir)
+    try:
+        if not args.run:
+            for run, pages in store.runs().items():
+                print(f"{run}\t{pages}")
+            return 0
+        if not args.locator:
+            parser.error("at least one --locator is required")
+        for page in extract_snapshots(store, args.run, dict(args.locator), args.fields.split(","), args.workers):
+            sys.stdout.write(json.dumps(page, ensure_ascii=False) + "\n")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
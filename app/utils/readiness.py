@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+from app.core import telemetry
+from app.utils.dom_extract import FIND_ELEMENTS_JS, IS_VISIBLE_JS, locator_to_query
+
+logger = logging.getLogger("web-scraper")
+
+DEFAULT_TIMEOUT = 10.0     # Used for hosts we have no history for
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 30.0
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+EWMA_ALPHA = 0.2
+
+
+class ReadyCondition:
+    """
+    A readiness check evaluated inside the page.
+
+    ``js`` is a JavaScript arrow function taking ``param`` and returning a boolean; it can use the
+    ``findElements`` and ``isVisible`` helpers. All conditions of a wait are evaluated together in a
+    single ``execute_script`` call per poll.
+    """
+
+    name = "condition"
+    js = "(p) => true"
+
+    def param(self):
+        return None
+
+
+class DocumentReady(ReadyCondition):
+    """``document.readyState`` has reached ``state`` ("interactive" or "complete")."""
+
+    name = "document_ready"
+    js = "(p) => p === 'interactive' ? document.readyState !== 'loading' : document.readyState === 'complete'"
+
+    def __init__(self, state="complete"):
+        self.state = state
+
+    def param(self):
+        return self.state
+
+
+class DomQuiet(ReadyCondition):
+    """No DOM mutations for ``quiet_ms`` milliseconds (watched by an injected MutationObserver)."""
+
+    name = "dom_quiet"
+    js = """(p) => {
+        if (!window.__ssMutationObserver) {
+            window.__ssLastMutation = performance.now();
+            window.__ssMutationObserver = new MutationObserver(() => { window.__ssLastMutation = performance.now(); });
+            window.__ssMutationObserver.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+            return false;
+        }
+        return performance.now() - window.__ssLastMutation >= p;
+    }"""
+
+    def __init__(self, quiet_ms=500):
+        self.quiet_ms = quiet_ms
+
+    def param(self):
+        return self.quiet_ms
+
+
+class NetworkIdle(ReadyCondition):
+    """
+    No fetch/XHR in flight and no network activity for ``idle_ms`` milliseconds. fetch and XHR are
+    wrapped on the first poll; requests started before that are covered by the resource timing entries.
+    """
+
+    name = "network_idle"
+    js = """(p) => {
+        if (!window.__ssNetwork) {
+            const net = window.__ssNetwork = {pending: 0, last: performance.now()};
+            const done = () => { net.pending--; net.last = performance.now(); };
+            const originalFetch = window.fetch;
+            if (originalFetch) {
+                window.fetch = function () {
+                    net.pending++; net.last = performance.now();
+                    return originalFetch.apply(this, arguments).finally(done);
+                };
+            }
+            const originalSend = XMLHttpRequest.prototype.send;
+            XMLHttpRequest.prototype.send = function () {
+                net.pending++; net.last = performance.now();
+                this.addEventListener('loadend', done, {once: true});
+                return originalSend.apply(this, arguments);
+            };
+        }
+        const net = window.__ssNetwork;
+        const resources = performance.getEntriesByType('resource');
+        const lastResource = resources.length ? resources[resources.length - 1].responseEnd : 0;
+        return net.pending <= 0 && performance.now() - Math.max(net.last, lastResource) >= p;
+    }"""
+
+    def __init__(self, idle_ms=500):
+        self.idle_ms = idle_ms
+
+    def param(self):
+        return self.idle_ms
+
+
+class LocatorPresent(ReadyCondition):
+    """An element matching the locator is in the DOM."""
+
+    name = "locator_present"
+    js = "(p) => findElements(p[0], p[1]).length > 0"
+
+    def __init__(self, locator: tuple):
+        self.locator = locator
+
+    def param(self):
+        return list(locator_to_query(self.locator))
+
+
+class LocatorVisible(LocatorPresent):
+    """An element matching the locator is in the DOM and visible."""
+
+    name = "locator_visible"
+    js = "(p) => findElements(p[0], p[1]).some(isVisible)"
+
+
+def _build_script(conditions):
+    checks = ",\n".join(condition.js for condition in conditions)
+    return FIND_ELEMENTS_JS + IS_VISIBLE_JS + f"""
+const params = arguments[0];
+const checks = [
+{checks}
+];
+return checks.map((check, i) => {{ try {{ return !!check(params[i]); }} catch (e) {{ return false; }} }});
+"""
+
+
+class ReadyResult:
+    def __init__(self, ready, elapsed, polls, pending):
+        self.ready = ready
+        self.elapsed = elapsed
+        self.polls = polls
+        self.pending = pending  # Names of the conditions that were still false
+
+    def __bool__(self):
+        return self.ready
+
+
+class HostReadiness:
+    """
+    Per-host history of how long pages took to become ready.
+
+    Keeps an exponentially weighted mean and deviation of ready times (like a TCP retransmission
+    timer) and derives an adaptive timeout (mean + 4 * deviation) and poll interval (mean / 10).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def timeout(self, host):
+        with self._lock:
+            entry = self._hosts.get(host)
+        if entry is None or entry["ready"] == 0:
+            return DEFAULT_TIMEOUT
+        return min(max(entry["mean"] + 4 * entry["dev"], MIN_TIMEOUT), MAX_TIMEOUT)
+
+    def poll_interval(self, host):
+        with self._lock:
+            entry = self._hosts.get(host)
+        if entry is None or entry["ready"] == 0:
+            return 0.1
+        return min(max(entry["mean"] / 10, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    def record(self, host, elapsed, ready):
+        with self._lock:
+            entry = self._hosts.setdefault(host, {"mean": 0.0, "dev": 0.0, "ready": 0, "timeouts": 0, "last": 0.0})
+            entry["last"] = elapsed
+            if not ready:
+                entry["timeouts"] += 1
+                # A timeout means the page needs longer than we allowed: widen the window.
+                entry["dev"] = max(entry["dev"] * 2, elapsed / 4)
+                return
+            if entry["ready"] == 0:
+                entry["mean"], entry["dev"] = elapsed, elapsed / 2
+            else:
+                entry["dev"] = (1 - EWMA_ALPHA) * entry["dev"] + EWMA_ALPHA * abs(elapsed - entry["mean"])
+                entry["mean"] = (1 - EWMA_ALPHA) * entry["mean"] + EWMA_ALPHA * elapsed
+            entry["ready"] += 1
+
+    def stats(self):
+        with self._lock:
+            hosts = {host: dict(entry) for host, entry in self._hosts.items()}
+        for host, entry in hosts.items():
+            entry["timeout"] = self.timeout(host)
+            entry["poll_interval"] = self.poll_interval(host)
+        return hosts
+
+
+host_readiness = HostReadiness()
+
+
+def wait_until_ready(driver, conditions, timeout=None, definition=""):
+    """
+    Poll all ``conditions`` with one ``execute_script`` call per round until they all hold.
+
+    :param driver: Selenium WebDriver on the page to wait for
+    :param conditions: List of ReadyCondition instances
+    :param timeout: Maximum seconds to wait; None uses the adaptive timeout learned for the host
+    :param definition: A string describing the wait, for the log
+    :return: ReadyResult (truthy when ready) with the time the wait actually took
+    """
+    host = urlsplit(driver.current_url).netloc
+    if timeout is None:
+        timeout = host_readiness.timeout(host)
+    interval = host_readiness.poll_interval(host)
+    script = _build_script(conditions)
+    params = [condition.param() for condition in conditions]
+
+    started = time.monotonic()
+    deadline = started + timeout
+    polls = 0
+    results = [False] * len(conditions)
+    with telemetry.timed("wait") as span:
+        span.set_attribute("conditions", [condition.name for condition in conditions])
+        while True:
+            polls += 1
+            try:
+                results = driver.execute_script(script, params)
+            except WebDriverException as e:
+                # The page can be mid-navigation; treat it as not ready yet.
+                logger.debug("Readiness poll failed: %s", e)
+            if all(results):
+                break
+            if time.monotonic() + interval > deadline:
+                break
+            time.sleep(interval)
+        span.set_attribute("polls", polls)
+
+    elapsed = time.monotonic() - started
+    ready = all(results)
+    pending = [condition.name for condition, ok in zip(conditions, results) if not ok]
+    if not ready:
+        telemetry.timeouts.add(1, {"step": "wait"})
+    host_readiness.record(host, elapsed, ready)
+    if ready:
+        logger.debug("Page ready in %.0f ms after %s polls (%s). %s", elapsed * 1000, polls, host, definition)
+    else:
+        logger.warning("Page not ready after %.1f s, waiting on %s (%s). %s", elapsed, pending, host, definition)
+    return ReadyResult(ready, elapsed, polls, pending)
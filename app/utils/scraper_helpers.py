@@ -1,20 +1,37 @@
-from app.core.driver import get_driver
-import logging
 import time
+from contextlib import contextmanager
+from app.core import telemetry
+from app.core.session_pool import get_pool
+from app.core.profiles import page_load_stats
+from app.core.scheduler import host_scheduler
+from app.core.tabs import tab_stats
+from app.utils.readiness import wait_until_ready, DocumentReady, DomQuiet
+import logging
 
 logger = logging.getLogger("web-scraper")
 
-def open_page(url):
-    logger.info(f"Opening URL: {url}")
-    driver = get_driver()
-    driver.get(url)
-    logger.info("Page loaded successfully")
-    return driver
+@contextmanager
+def open_page(url, profile="default"):
+    """
+    Lease a pooled browser session with the given driver profile, open the URL in it and yield the driver.
+    The page load and the block run under a host scheduler ticket of the API job; the ticket is taken
+    first, so requests waiting on a busy host do not hold a session meanwhile. The lease is recorded as a
+    one-tab session in ``tab_stats``.
+    """
+    with host_scheduler.ticket(url) as ticket, get_pool().lease(profile=profile) as driver:
+        ticket.loading()
+        leased_at = time.monotonic()
+        logger.info("Opening URL: %s", url)
+        telemetry.load_page(driver, url)
+        logger.info("Page loaded successfully")
+        yield driver
+        ticket.record(page_load_stats.record_load(driver))
+        tab_stats.record(1, 1, time.monotonic() - leased_at)
 
 def extract_title(driver):
     logger.info("Extracting page title")
-    time.sleep(2)
+    # Scripts may still set the title after load; wait for the DOM to settle instead of a fixed sleep.
+    wait_until_ready(driver, [DocumentReady(), DomQuiet(300)], definition="Wait before reading the title")
     title = driver.title
-    logger.info(f"Page title: {title}")
+    logger.info("Page title: %s", title)
     return title
-
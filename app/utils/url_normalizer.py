@@ -0,0 +1,77 @@
+import fnmatch
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from; dropped unless an allow list is configured.
+DEFAULT_DENY_PARAMS = (
+    "utm_*", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "ref", "ref_src", "affiliate*", "sessionid", "sid", "phpsessid", "jsessionid",
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _patterns(value):
+    return tuple(part.strip().lower() for part in value.split(",") if part.strip())
+
+
+# Comma-separated fnmatch patterns. With an allow list only those parameters are kept.
+CRAWL_URL_ALLOW_PARAMS = _patterns(os.getenv("CRAWL_URL_ALLOW_PARAMS", ""))
+CRAWL_URL_DENY_PARAMS = _patterns(os.getenv("CRAWL_URL_DENY_PARAMS", ",".join(DEFAULT_DENY_PARAMS)))
+
+
+def page_url(category):
+    """
+    URL a crawl category is loaded from: the link as the page wrote it (``href``) when it differs from the
+    canonical ``url``, which is only the dedup and node key.
+    """
+    return category.get('href') or category['url']
+
+
+class UrlNormalizer:
+    """
+    Canonical form of a URL, so one page reached through different links is visited once.
+
+    Lower-cases scheme and host, drops default ports, drops query parameters outside ``allow_params``
+    or inside ``deny_params`` (fnmatch patterns, case-insensitive), sorts the rest, strips the fragment
+    and the trailing slash. Fragments that look like client-side routes (``#/...``, ``#!...``) are kept
+    when ``keep_hash_routes`` is set, since they select different pages in single-page apps.
+    """
+
+    def __init__(self, allow_params=CRAWL_URL_ALLOW_PARAMS, deny_params=CRAWL_URL_DENY_PARAMS, sort_query=True,
+                 strip_fragment=True, keep_hash_routes=True, strip_trailing_slash=True):
+        self.allow_params = tuple(pattern.lower() for pattern in allow_params)
+        self.deny_params = tuple(pattern.lower() for pattern in deny_params)
+        self.sort_query = sort_query
+        self.strip_fragment = strip_fragment
+        self.keep_hash_routes = keep_hash_routes
+        self.strip_trailing_slash = strip_trailing_slash
+
+    def __call__(self, url):
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").rstrip(".")
+        netloc = f"[{host}]" if ":" in host else host
+        if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+            netloc += f":{parts.port}"
+        if parts.username:
+            netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+        path = parts.path or "/"
+        if self.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip("/") or "/"
+
+        params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if self._keep(key)]
+        if self.sort_query:
+            params.sort()
+        query = urlencode(params)
+
+        fragment = parts.fragment
+        if self.strip_fragment and not (self.keep_hash_routes and fragment[:1] in ("/", "!")):
+            fragment = ""
+        return urlunsplit((scheme, netloc, path, query, fragment))
+
+    def _keep(self, key):
+        key = key.lower()
+        if self.allow_params:
+            return any(fnmatch.fnmatchcase(key, pattern) for pattern in self.allow_params)
+        return not any(fnmatch.fnmatchcase(key, pattern) for pattern in self.deny_params)
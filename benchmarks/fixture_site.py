@@ -0,0 +1,175 @@
+import hashlib
+import html
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Locators matching the generated markup, for the crawl and WebScraper benchmarks.
+MENU_SELECTOR = "ul.menu a.category"
+LOADED_SELECTOR = "#loaded"
+TITLE_SELECTOR = "h2.title"
+TREE_SELECTOR = "nav.tree > ul"
+
+
+class MenuSite:
+    """
+    Synthetic category tree served as HTML pages.
+
+    Every page under ``/c/...`` lists its subcategories as ``ul.menu a.category`` links; leaves list
+    ``products_per_leaf`` products as ``h2.title``. ``render_delay_ms`` is how long the server takes to
+    answer and ``js_delay_ms`` how long client-side rendering takes after that: with a real browser the
+    menu is injected by a script after that delay, and the stub driver hides it for as long.
+
+    With ``menu_tree`` every page also carries the whole category tree as hidden nested lists under
+    ``nav.tree``; the flyouts of ``lazy_menus`` paths are left out and their items marked
+    ``aria-haspopup``, like submenus that are only loaded on demand.
+    """
+
+    def __init__(self, depth=3, fanout=4, products_per_leaf=10, render_delay_ms=0, js_delay_ms=0,
+                 base_url="http://fixture.local", menu_tree=False, lazy_menus=()):
+        self.depth = depth
+        self.fanout = fanout
+        self.products_per_leaf = products_per_leaf
+        self.render_delay_ms = render_delay_ms
+        self.js_delay_ms = js_delay_ms
+        self.base_url = base_url
+        self.menu_tree = menu_tree
+        self.lazy_menus = set(lazy_menus)
+
+    @property
+    def root_url(self):
+        return f"{self.base_url}/c"
+
+    def page_count(self):
+        return sum(self.fanout ** level for level in range(self.depth + 1))
+
+    def children(self, path):
+        """Child paths of a ``/c/...`` path, empty for leaves and unknown paths."""
+        parts = self._parts(path)
+        if parts is None or len(parts) >= self.depth:
+            return []
+        return [f"{path.rstrip('/')}/{i}" for i in range(self.fanout)]
+
+    def leaf_urls(self):
+        paths = ["/c"]
+        for _ in range(self.depth):
+            paths = [child for path in paths for child in self.children(path)]
+        return [self.base_url + path for path in paths]
+
+    def body(self, path):
+        """The page content once rendered, or None for unknown paths."""
+        parts = self._parts(path)
+        if parts is None:
+            return None
+        name = "Category " + ".".join(parts) if parts else "Root"
+        children = self.children(path)
+        if children:
+            items = "".join(
+                f'<li><a class="category" href="{self.base_url}{child}">{self.label(child)}</a></li>'
+                for child in children
+            )
+            content = f'<nav><ul class="menu">{items}</ul></nav>'
+        else:
+            content = "".join(
+                f'<div class="product"><h2 class="title">{html.escape(name)} product {i}</h2></div>'
+                for i in range(self.products_per_leaf)
+            )
+        if self.menu_tree:
+            content = f'<nav class="tree" style="display: none">{self._tree("/c")}</nav>' + content
+        return f'<h1>{html.escape(name)}</h1>{content}<div id="loaded"></div>'
+
+    def label(self, path):
+        """Link text of a category in its parent's menu."""
+        parent, index = path.rsplit("/", 1)
+        return f"{html.escape(self.title(parent))}.{index}"
+
+    def _tree(self, path):
+        items = []
+        for child in self.children(path):
+            link = f'<a href="{self.base_url}{child}">{self.label(child)}</a>'
+            if child in self.lazy_menus:
+                items.append(f'<li aria-haspopup="true">{link}</li>')
+            else:
+                submenu = self._tree(child) if self.children(child) else ""
+                items.append(f"<li>{link}{submenu}</li>")
+        return f'<ul>{"".join(items)}</ul>'
+
+    def title(self, path):
+        parts = self._parts(path)
+        return "Category " + ".".join(parts) if parts else "Root"
+
+    def page(self, path, rendered=None):
+        """
+        Full HTML document for ``path``. With a JS delay and ``rendered`` unset, the body arrives empty
+        and a script fills it in after ``js_delay_ms``, like a client-rendered catalogue.
+        """
+        body = self.body(path)
+        if body is None:
+            return None
+        if rendered is None:
+            rendered = not self.js_delay_ms
+        head = f"<head><title>{html.escape(self.title(path))}</title></head>"
+        if rendered:
+            return f'<html>{head}<body><div id="app">{body}</div></body></html>'
+        script = (f"<script>setTimeout(() => {{ document.getElementById('app').innerHTML = {json.dumps(body)}; }}, "
+                  f"{self.js_delay_ms});</script>")
+        return f'<html>{head}<body><div id="app"></div>{script}</body></html>'
+
+    def _parts(self, path):
+        path = path.split("?", 1)[0].split("#", 1)[0].rstrip("/")
+        if path != "/c" and not path.startswith("/c/"):
+            return None
+        parts = path.split("/")[2:]
+        if len(parts) > self.depth or any(not part.isdigit() or int(part) >= self.fanout for part in parts):
+            return None
+        return parts
+
+
+@contextmanager
+def serve(site):
+    """Serve ``site`` on a free local port; its ``base_url`` points there while the block runs."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self._respond(send_body=True)
+
+        def do_HEAD(self):
+            self._respond(send_body=False)
+
+        def _respond(self, send_body):
+            if site.render_delay_ms:
+                time.sleep(site.render_delay_ms / 1000)
+            document = site.page(self.path)
+            if document is None:
+                self.send_error(404)
+                return
+            data = document.encode("utf-8")
+            etag = f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, name="fixture-site", daemon=True)
+    thread.start()
+    previous, site.base_url = site.base_url, f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        yield site
+    finally:
+        server.shutdown()
+        server.server_close()
+        site.base_url = previous
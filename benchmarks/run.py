@@ -0,0 +1,304 @@
+"""
+Offline benchmarks for the crawler, WebScraper and the API.
+
+    python -m benchmarks.run                      # run every scenario against the stub driver
+    python -m benchmarks.run --check              # ... and fail if slower than benchmarks/baselines.json
+    python -m benchmarks.run --save-baseline      # record the current numbers as the new baseline
+    python -m benchmarks.run --driver chrome      # use a local headless Chrome instead of the stub
+
+Each scenario reports pages/sec, WebDriver round trips per page and p50/p99 page latency.
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.webdriver.common.by import By
+
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, TITLE_SELECTOR, TREE_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import NullGraph, StubDriver, count_round_trips
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+SCENARIOS = ("scrape_menu", "scrape_menu_parallel", "scrape_menu_tree", "scrape_menu_tabs", "webscraper_bulk",
+             "webscraper_elements", "api_titles_browser", "api_titles_http")
+# Round trips per page are deterministic with the stub, so they get a much tighter tolerance.
+ROUND_TRIP_TOLERANCE = 0.05
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(pages, elapsed, round_trips, latencies):
+    return {
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+        "round_trips_per_page": round(round_trips / pages, 2) if pages else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def page_latencies(drivers, finished):
+    """Per-page latency of a crawl: time from one ``get`` on a driver to its next one (or the end)."""
+    latencies = []
+    for driver in drivers:
+        starts = driver.page_starts + [finished]
+        latencies.extend(later - earlier for earlier, later in zip(starts, starts[1:]))
+    return latencies
+
+
+class DriverFactory:
+    """Opens stub or local Chrome drivers and keeps them, to total their round trips afterwards."""
+
+    def __init__(self, site, kind="stub", latency_ms=1.0):
+        self.site = site
+        self.kind = kind
+        self.latency_ms = latency_ms
+        self.drivers = []
+
+    def __call__(self, profile="default"):
+        if self.kind == "chrome":
+            from selenium import webdriver
+            options = webdriver.ChromeOptions()
+            options.add_argument("--headless=new")
+            options.add_argument("--no-sandbox")
+            driver = count_round_trips(webdriver.Chrome(options=options))
+            driver.scraper_profile = profile
+        else:
+            driver = StubDriver(self.site, self.latency_ms, profile)
+        self.drivers.append(driver)
+        return driver
+
+    def round_trips(self):
+        return sum(driver.round_trips for driver in self.drivers)
+
+    def reset_counters(self):
+        for driver in self.drivers:
+            driver.round_trips = 0
+            driver.page_starts = []
+
+    def quit_all(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def _is_leaf(driver):
+    return not driver.find_elements(By.CSS_SELECTOR, MENU_SELECTOR)
+
+
+def bench_scrape_menu(site, factory, workers=1, menu_tree=None, tabs=1, profile="default"):
+    from app.tasks.one_lvl_actions.menu_scraper import scrape_menu, scrape_menu_parallel
+    from app.utils.readiness import LocatorPresent, wait_until_ready
+
+    drivers = [factory(profile) for _ in range(workers)]
+    locator, loaded = (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR)
+    drivers[0].get(site.root_url)
+    # With the "tabs" profile get returns before the page is there, and the crawl starts from current_url.
+    wait_until_ready(drivers[0], [LocatorPresent(loaded)], timeout=5)
+    factory.reset_counters()
+    graph = NullGraph()
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        started = time.monotonic()
+        if workers == 1:
+            scrape_menu(drivers[0], locator, loaded, _is_leaf, wait_time=5, checkpoint_dir=checkpoint_dir,
+                        driver_graph=graph, menu_tree=menu_tree, tabs=tabs)
+        else:
+            scrape_menu_parallel(drivers, locator, loaded, _is_leaf, wait_time=5, checkpoint_dir=checkpoint_dir,
+                                 driver_graph=graph, tabs=tabs)
+        finished = time.monotonic()
+    if graph.nodes != site.page_count():
+        raise RuntimeError(f"Crawl wrote {graph.nodes} nodes, expected {site.page_count()}")
+    return summarize(graph.nodes, finished - started, factory.round_trips(), page_latencies(drivers, finished))
+
+
+def bench_webscraper(site, factory, bulk=True):
+    from app.tasks.actions import WebScraper
+
+    scraper = WebScraper(driver=factory())
+    locator = (By.CSS_SELECTOR, TITLE_SELECTOR)
+    urls = site.leaf_urls()
+    latencies = []
+    started = time.monotonic()
+    for url in urls:
+        page_started = time.monotonic()
+        scraper.open_page(url, locator, "Benchmark page")
+        if bulk:
+            titles = [row["text"] for row in scraper.extract_bulk(locator, ["text"], "Benchmark titles")]
+        else:
+            titles = scraper.extract_attribute(scraper.get_elements(locator, "Benchmark titles"), "text")
+        if len(titles) != site.products_per_leaf:
+            raise RuntimeError(f"Read {len(titles)} titles from {url}, expected {site.products_per_leaf}")
+        latencies.append(time.monotonic() - page_started)
+    elapsed = time.monotonic() - started
+    return summarize(len(urls), elapsed, factory.round_trips(), latencies)
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def bench_api(site, factory, engine, concurrency):
+    import uvicorn
+    from app.core import executor, session_pool
+    from app.core.session_pool import SessionPool
+
+    # The app's lifespan warms and closes whatever get_pool() returns, so hand it a pool of our drivers.
+    session_pool._pool = SessionPool(factory=factory, max_size=concurrency)
+    executor._executor = None
+    from app.main import app
+    logging.getLogger("web-scraper").setLevel(logging.WARNING)  # app.main may have enabled debug logging
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-api", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    time.sleep(0.2)  # let the pool warm up in the background
+    factory.reset_counters()
+
+    def post(url):
+        body = json.dumps({"url": url, "selector": TITLE_SELECTOR, "engine": engine, "no_cache": True}).encode()
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/scraper/titles", data=body,
+                                         headers={"Content-Type": "application/json"})
+        request_started = time.monotonic()
+        with urllib.request.urlopen(request, timeout=60) as response:
+            titles = json.load(response)["titles"]
+        if len(titles) != site.products_per_leaf:
+            raise RuntimeError(f"API returned {len(titles)} titles for {url}, expected {site.products_per_leaf}")
+        return time.monotonic() - request_started
+
+    urls = site.leaf_urls()
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(post, urls))
+        elapsed = time.monotonic() - started
+    finally:
+        server.should_exit = True
+        thread.join()
+    return summarize(len(urls), elapsed, factory.round_trips(), latencies)
+
+
+def run_scenario(name, args):
+    # The HTTP engine can only read server-rendered pages, so that scenario gets no client-side rendering.
+    js_delay_ms = 0 if name == "api_titles_http" else args.js_delay_ms
+    site = MenuSite(depth=args.depth, fanout=args.fanout, products_per_leaf=args.products,
+                    render_delay_ms=args.render_delay_ms, js_delay_ms=js_delay_ms,
+                    menu_tree=name == "scrape_menu_tree")
+    with serve(site):
+        factory = DriverFactory(site, args.driver, args.latency_ms)
+        try:
+            if name == "scrape_menu":
+                return bench_scrape_menu(site, factory)
+            if name == "scrape_menu_parallel":
+                return bench_scrape_menu(site, factory, workers=args.workers)
+            if name == "scrape_menu_tree":
+                from app.tasks.one_lvl_actions.menu_tree import MenuTree
+                return bench_scrape_menu(site, factory, menu_tree=MenuTree((By.CSS_SELECTOR, TREE_SELECTOR)))
+            if name == "scrape_menu_tabs":
+                return bench_scrape_menu(site, factory, tabs=args.tabs, profile="tabs")
+            if name == "webscraper_bulk":
+                return bench_webscraper(site, factory, bulk=True)
+            if name == "webscraper_elements":
+                return bench_webscraper(site, factory, bulk=False)
+            if name == "api_titles_browser":
+                return bench_api(site, factory, "browser", args.workers)
+            if name == "api_titles_http":
+                return bench_api(site, factory, "http", args.workers)
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {SCENARIOS}")
+        finally:
+            factory.quit_all()
+
+
+def check_regressions(results, baseline, tolerance):
+    """Return a message for every metric that is worse than the baseline by more than the tolerance."""
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get("results", {}).get(name)
+        if expected is None:
+            continue
+        if result["pages_per_sec"] < expected["pages_per_sec"] * (1 - tolerance):
+            failures.append(f"{name}: {result['pages_per_sec']} pages/sec, baseline {expected['pages_per_sec']}")
+        if result["p99_ms"] > expected["p99_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p99 {result['p99_ms']} ms, baseline {expected['p99_ms']} ms")
+        if result["round_trips_per_page"] > expected["round_trips_per_page"] * (1 + ROUND_TRIP_TOLERANCE):
+            failures.append(f"{name}: {result['round_trips_per_page']} round trips/page, "
+                            f"baseline {expected['round_trips_per_page']}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--driver", choices=("stub", "chrome"), default="stub")
+    parser.add_argument("--depth", type=int, default=3, help="Depth of the fixture category tree")
+    parser.add_argument("--fanout", type=int, default=4, help="Subcategories per category")
+    parser.add_argument("--products", type=int, default=10, help="Products listed on each leaf page")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Stub driver latency per WebDriver call")
+    parser.add_argument("--render-delay-ms", type=float, default=5.0, help="Server response time per page")
+    parser.add_argument("--js-delay-ms", type=float, default=20.0, help="Client-side render time per page")
+    parser.add_argument("--workers", type=int, default=3, help="Browsers for the parallel and API scenarios")
+    parser.add_argument("--tabs", type=int, default=4, help="Tabs of the one browser in the tabs scenario")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on a regression against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before --check fails")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("web-scraper").setLevel(logging.WARNING)
+    config = {key: getattr(args, key) for key in
+              ("driver", "depth", "fanout", "products", "latency_ms", "render_delay_ms", "js_delay_ms", "workers", "tabs")}
+
+    results = {}
+    print(f"{'scenario':<24}{'pages':>7}{'pages/s':>10}{'rt/page':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for name in args.scenarios.split(","):
+        result = results[name] = run_scenario(name.strip(), args)
+        print(f"{name:<24}{result['pages']:>7}{result['pages_per_sec']:>10}{result['round_trips_per_page']:>9}"
+              f"{result['p50_ms']:>9}{result['p99_ms']:>9}")
+
+    report = {"config": config, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"Warning: baseline was recorded with {baseline.get('config')}, not {config}")
+        failures = check_regressions(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException, NoSuchWindowException
+
+from app.core.profiles import PAGE_METRICS_SCRIPT, PAGE_STATUS_SCRIPT, PROFILES
+from app.core.tabs import MARK_DOCUMENT_SCRIPT, NEW_DOCUMENT_SCRIPT
+from app.tasks.one_lvl_actions.menu_tree import MENU_TREE_SCRIPT, harvest_menu_html
+from app.utils.dom_extract import BULK_EXTRACT_SCRIPT, locator_to_query
+
+BLANK_PAGE = "<html><head><title></title></head><body></body></html>"
+
+
+def _query(node, kind, query):
+    if kind == "xpath":
+        return [found for found in node.xpath(query) if isinstance(found, lxml.html.HtmlElement)]
+    return node.cssselect(query)
+
+
+class StubElement:
+    """WebElement stand-in backed by an lxml element; every call is one round trip, like the real thing."""
+
+    def __init__(self, driver, element):
+        self._driver = driver
+        self._element = element
+
+    @property
+    def text(self):
+        self._driver._round_trip()
+        return " ".join(self._element.text_content().split())
+
+    @property
+    def tag_name(self):
+        self._driver._round_trip()
+        return self._element.tag
+
+    def get_attribute(self, name):
+        self._driver._round_trip()
+        if name == "textContent":
+            return self._element.text_content()
+        return self._element.get(name)
+
+    get_property = get_attribute
+
+    def is_displayed(self):
+        self._driver._round_trip()
+        return True
+
+    def is_enabled(self):
+        self._driver._round_trip()
+        return self._element.get("disabled") is None
+
+    def click(self):
+        href = self._element.get("href")
+        if href:
+            self._driver.get(href)
+        else:
+            self._driver._round_trip()
+
+    def find_elements(self, by, value):
+        self._driver._round_trip()
+        return [StubElement(self._driver, found) for found in _query(self._element, *locator_to_query((by, value)))]
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element matches {by}={value}")
+        return found[0]
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        self._driver._round_trip()
+        if handle not in self._driver._windows:
+            raise NoSuchWindowException(f"No window {handle}")
+        self._driver._handle = handle
+
+    def new_window(self, _type_hint=None):
+        self._driver._round_trip()
+        handle = uuid.uuid4().hex[:8]
+        self._driver._windows[handle] = _Window()
+        self._driver._handle = handle
+
+
+class _Window:
+    """
+    One tab of the stub browser. With the "none" page load strategy the next document is ``pending``
+    until the server would have answered, and the previous one stays in place until then.
+    """
+
+    def __init__(self):
+        self.url = "about:blank"
+        self.rendered = self.shell = lxml.html.document_fromstring(BLANK_PAGE)
+        self.ready_at = 0.0
+        self.marker = None
+        self.pending = None
+
+    def show(self, url, rendered, shell, ready_at):
+        self.url, self.rendered, self.shell, self.ready_at = url, rendered, shell, ready_at
+        self.marker = None
+        self.pending = None
+
+    def commit(self, now):
+        if self.pending is not None and now >= self.pending[0]:
+            commit_at, url, rendered, shell, js_delay = self.pending
+            self.show(url, rendered, shell, commit_at + js_delay)
+
+
+class StubDriver:
+    """
+    In-process stand-in for a Selenium WebDriver browsing a ``MenuSite``, with no browser or grid.
+
+    Pages are parsed with lxml and queried with the same CSS/XPath translation the injected scripts
+    use. It answers ``get``, ``find_element(s)``, element reads and the ``execute_script`` calls this
+    code base makes (bulk extraction, menu trees, readiness checks, page metrics). Every call sleeps
+    ``latency_ms`` and is counted in ``round_trips``. Until ``js_delay_ms`` has passed after a
+    ``get`` the page shows its unrendered shell, so readiness waits poll as they would in Chrome.
+    Tabs can be opened with ``switch_to.new_window``; with a profile whose page load strategy is "none",
+    ``get`` returns at once and the page loads in its tab while other tabs are used.
+    """
+
+    def __init__(self, site, latency_ms=1.0, profile="default"):
+        self.site = site
+        self.latency = latency_ms / 1000
+        self.session_id = uuid.uuid4().hex
+        self.scraper_profile = profile
+        self.page_load_strategy = PROFILES[profile].page_load_strategy if profile in PROFILES else "normal"
+        self.switch_to = _SwitchTo(self)
+        self.round_trips = 0
+        self.page_starts = []
+        self._lock = threading.Lock()
+        self._windows = {"main": _Window()}
+        self._handle = "main"
+
+    @property
+    def current_window_handle(self):
+        return self._handle
+
+    @property
+    def window_handles(self):
+        return list(self._windows)
+
+    @property
+    def current_url(self):
+        return self._window().url
+
+    def _window(self):
+        window = self._windows.get(self._handle)
+        if window is None:
+            raise NoSuchWindowException(f"No window {self._handle}")
+        window.commit(time.monotonic())
+        return window
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _dom(self):
+        window = self._window()
+        return window.rendered if time.monotonic() >= window.ready_at else window.shell
+
+    def get(self, url):
+        self._round_trip()
+        self.page_starts.append(time.monotonic())
+        window = self._window()
+        path = urlsplit(url).path if url.startswith(self.site.base_url) else None
+        rendered = self.site.page(path, rendered=True) if path is not None else None
+        if rendered is None:
+            blank = lxml.html.document_fromstring(BLANK_PAGE)
+            window.show(url, blank, blank, 0.0)
+            return
+        rendered = lxml.html.document_fromstring(rendered)
+        shell = lxml.html.document_fromstring(self.site.page(path, rendered=False))
+        delay = self.site.render_delay_ms / 1000
+        if self.page_load_strategy == "none":
+            window.pending = (time.monotonic() + delay, url, rendered, shell, self.site.js_delay_ms / 1000)
+            return
+        if delay:
+            time.sleep(delay)
+        window.show(url, rendered, shell, time.monotonic() + self.site.js_delay_ms / 1000)
+
+    @property
+    def title(self):
+        self._round_trip()
+        return self._dom().findtext(".//title") or ""
+
+    @property
+    def page_source(self):
+        self._round_trip()
+        return lxml.html.tostring(self._dom(), encoding="unicode")
+
+    def find_elements(self, by, value):
+        self._round_trip()
+        return [StubElement(self, found) for found in _query(self._dom(), *locator_to_query((by, value)))]
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element matches {by}={value}")
+        return found[0]
+
+    def execute_script(self, script, *args):
+        self._round_trip()
+        if script == BULK_EXTRACT_SCRIPT:
+            kind, query, fields = args
+            return [{field: self._read(found, field) for field in fields} for found in _query(self._dom(), kind, query)]
+        if script == MENU_TREE_SCRIPT:
+            return harvest_menu_html(self._dom(), self.current_url, *args)
+        if script == MARK_DOCUMENT_SCRIPT:
+            self._window().marker = args[0]
+            return None
+        if script == NEW_DOCUMENT_SCRIPT:
+            return self._window().marker != args[0]
+        if script == PAGE_METRICS_SCRIPT:
+            document = lxml.html.tostring(self._window().rendered)
+            return {"document_bytes": len(document), "resource_bytes": 0, "resources": 0,
+                    "dom_content_loaded_ms": 1.0, "load_ms": 1.0, "status": 200}
+        if script == PAGE_STATUS_SCRIPT:
+            return 200
+        if "const checks" in script:
+            return [self._check(param) for param in args[0]]
+        return None
+
+    def execute(self, _command, _params=None):
+        self._round_trip()
+        return {"value": None}
+
+    def delete_all_cookies(self):
+        self._round_trip()
+
+    def close(self):
+        self._round_trip()
+        self._windows.pop(self._handle, None)
+
+    def quit(self):
+        self._round_trip()
+
+    def _check(self, param):
+        # Readiness parameters: a [kind, query] pair for locator conditions, a state string or a
+        # duration for document/DOM/network conditions, which hold once the page has rendered.
+        if isinstance(param, list):
+            return bool(_query(self._dom(), *param))
+        return time.monotonic() >= self._window().ready_at
+
+    @staticmethod
+    def _read(element, field):
+        if field == "text":
+            return " ".join(element.text_content().split())
+        if field == "textContent":
+            return element.text_content()
+        if field in ("visible", "clickable"):
+            return True
+        if field == "enabled":
+            return element.get("disabled") is None
+        return element.get(field)
+
+
+def count_round_trips(driver):
+    """
+    Give a real Selenium driver the ``round_trips`` and ``page_starts`` counters of ``StubDriver`` by
+    wrapping ``execute``, which every driver and WebElement command goes through.
+    """
+    execute = driver.execute
+    driver.round_trips = 0
+    driver.page_starts = []
+
+    def counted(command, params=None):
+        driver.round_trips += 1
+        if command == "get":
+            driver.page_starts.append(time.monotonic())
+        return execute(command, params)
+
+    driver.execute = counted
+    return driver
+
+
+class NullGraph:
+    """Neo4j driver stand-in for ``scrape_menu``; counts the node and edge rows written."""
+
+    def __init__(self):
+        self.nodes = 0
+        self.edges = 0
+        self._lock = threading.Lock()
+
+    def session(self, **_kwargs):
+        return _NullSession(self)
+
+    def close(self):
+        pass
+
+
+class _NullResult:
+    def consume(self):
+        return None
+
+    def single(self):
+        return None
+
+    def __iter__(self):
+        return iter(())
+
+
+class _NullSession:
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        rows = len(params.get("rows", []))
+        with self._graph._lock:
+            if "c.fingerprint" in query:
+                pass
+            elif "MERGE (c:Categoryv2" in query:
+                self._graph.nodes += rows
+            elif "HAS_SUBCATEGORY" in query:
+                self._graph.edges += rows
+        return _NullResult()
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
@@ -0,0 +1,80 @@
+from app.tasks.one_lvl_actions.graph_writer import EDGE_QUERY, FINGERPRINT_QUERY, NODE_QUERY
+from app.tasks.one_lvl_actions.incremental import PREVIOUS_STATE_QUERY, SKIPPED_SUBTREE_QUERY
+
+
+class _Result(list):
+    def consume(self):
+        return None
+
+    def single(self):
+        return self[0] if self else None
+
+
+class MemoryGraph:
+    """Neo4j stand-in that keeps the properties the crawler's queries set, in plain dicts."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.edges = {}
+
+    def session(self, **_kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def tree(self):
+        """The crawled tree as (url -> (level, fingerprint), edge set), for comparing crawls."""
+        nodes = {url: (node["level"], node.get("fingerprint")) for url, node in self.nodes.items()}
+        return nodes, set(self.edges)
+
+    def execute_write(self, work, *args):
+        return work(self, *args)
+
+    def run(self, query, rows=(), urls=()):
+        if query == NODE_QUERY:
+            for row in rows:
+                node = self.nodes.setdefault(row["url"], {})
+                node.update(level=row["level"])
+                node.pop("stale", None)
+        elif query == EDGE_QUERY:
+            for row in rows:
+                self.edges[(row["parent_url"], row["child_url"])] = {}
+        elif query == FINGERPRINT_QUERY:
+            return _Result([{"stale": self._fingerprint(rows)}])
+        elif query == PREVIOUS_STATE_QUERY:
+            return _Result({"url": url, **{key: node.get(key) for key in ("fingerprint", "etag", "last_modified", "expanded_at")}}
+                           for url, node in self.nodes.items() if "fingerprint" in node and "stale" not in node)
+        elif query == SKIPPED_SUBTREE_QUERY:
+            found, pending = set(), list(urls)
+            while pending:
+                url = pending.pop()
+                for (parent, child), props in self.edges.items():
+                    if parent == url and "stale" not in props and child not in found:
+                        found.add(child)
+                        pending.append(child)
+            return _Result({"url": url} for url in found)
+        return _Result()
+
+    def _fingerprint(self, rows):
+        stale = 0
+        for row in rows:
+            node = self.nodes[row["url"]]
+            node.update(fingerprint=row["fingerprint"], etag=row["etag"], last_modified=row["last_modified"])
+            if not row["expanded"]:
+                continue
+            node["expanded_at"] = row["checked_at"]
+            for (parent, child), props in self.edges.items():
+                if parent == row["url"] and child not in row["children"]:
+                    props["stale"] = True
+                    current = any("stale" not in p for (_, c), p in self.edges.items() if c == child)
+                    if not current and "stale" not in self.nodes[child]:
+                        self.nodes[child]["stale"] = True
+                        stale += 1
+        return stale
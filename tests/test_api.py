@@ -0,0 +1,204 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.executor import ScrapeExecutor
+from app.core.jobs import JobStore
+from app.core.result_cache import ResultCache
+from app.routers import scraper
+
+URL = "http://shop.test/products"
+
+
+class StubScrape:
+    """Stands in for ``_scrape_titles``: records calls and, while ``gate`` is clear, blocks its worker."""
+
+    __name__ = "_scrape_titles"
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, url, selector, *_options):
+        self.calls.append(url)
+        self.started.set()
+        self.gate.wait(5)
+        if "broken" in url:
+            raise ValueError(f"No {selector} on {url}")
+        return {"titles": [f"{selector} of {url}"]}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A client for the scraper router with one executor worker, no wait queue and an empty result cache."""
+    executor = ScrapeExecutor(1, queue_limit=0)
+    scrape = StubScrape()
+    monkeypatch.setattr(scraper, "get_executor", lambda: executor)
+    monkeypatch.setattr(scraper, "result_cache", ResultCache(db_path=""))
+    monkeypatch.setattr(scraper, "_scrape_titles", scrape)
+    app = FastAPI()
+    app.include_router(scraper.router)
+    with TestClient(app) as client:
+        yield client, scrape
+    scrape.gate.set()
+    executor.shutdown()
+
+
+def test_saturated_executor_answers_429_and_async_job_is_polled_to_success(api):
+    client, scrape = api
+    scrape.gate.clear()
+    accepted = client.post("/scraper/titles", json={"url": URL, "selector": "h2", "mode": "async"})
+    assert accepted.status_code == 202 and accepted.json()["status"] == "pending"
+    job_id = accepted.json()["job_id"]
+    assert scrape.started.wait(5)
+    assert client.get(f"/scraper/jobs/{job_id}").json()["status"] == "running"
+
+    # The only worker is busy and nothing may queue, so a different page is rejected up front.
+    rejected = client.post("/scraper/titles", json={"url": f"{URL}?page=2", "selector": "h2"})
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "5"
+
+    scrape.gate.set()
+    job = client.get(f"/scraper/jobs/{job_id}", params={"wait": 5}).json()
+    assert job["status"] == "succeeded" and job["result"] == {"titles": [f"h2 of {URL}"]}
+    assert scrape.calls == [URL]
+    assert client.get("/scraper/jobs/unknown").status_code == 404
+
+
+def test_async_job_sharing_a_running_scrape_is_running_too(api):
+    client, scrape = api
+    scrape.gate.clear()
+    request = {"url": URL, "selector": "h2", "mode": "async"}
+    first = client.post("/scraper/titles", json=request).json()
+    assert scrape.started.wait(5)
+    second = client.post("/scraper/titles", json=request).json()
+    assert second["status"] == "running" and second["job_id"] != first["job_id"]
+
+    scrape.gate.set()
+    for job in (first, second):
+        job = client.get(f"/scraper/jobs/{job['job_id']}", params={"wait": 5}).json()
+        assert job["status"] == "succeeded" and job["result"] == {"titles": [f"h2 of {URL}"]}
+    assert scrape.calls == [URL]
+
+
+def test_job_following_a_queued_scrape_starts_with_it():
+    async def main():
+        store = JobStore()
+        scrape = asyncio.get_running_loop().create_future()
+        job = store.create("titles", scrape, follows="leader")
+        assert job.status == "pending"
+        store.started("leader")
+        assert job.status == "running"
+        store.stopped("leader")
+        scrape.set_result({"titles": []})
+        await asyncio.sleep(0)
+        assert job.status == "succeeded" and store.create("titles", scrape, follows="leader").status == "pending"
+
+    asyncio.run(main())
+
+
+def test_identical_concurrent_requests_share_one_scrape(api):
+    client, scrape = api
+    scrape.gate.clear()
+    request = {"url": URL, "selector": "h2"}
+    with ThreadPoolExecutor(3) as callers:
+        responses = [callers.submit(client.post, "/scraper/titles", json=request) for _ in range(3)]
+        assert scrape.started.wait(5)
+        while scraper.result_cache.stats()["coalesced"] < 2:
+            assert not any(response.done() for response in responses)
+            time.sleep(0.01)
+        scrape.gate.set()
+        results = [response.result() for response in responses]
+
+    assert [r.json() for r in results] == [{"titles": [f"h2 of {URL}"]}] * 3
+    assert scrape.calls == [URL]
+    # Served from memory from now on, with the URL normalised.
+    assert client.post("/scraper/titles", json={"url": URL.replace("shop", "SHOP"), "selector": " h2"}).json() == results[0].json()
+    assert scrape.calls == [URL]
+    stats = scraper.result_cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 2, 1)
+
+
+def test_shared_scrape_is_cancelled_only_with_its_last_waiter():
+    async def main():
+        cache = ResultCache(db_path="")
+        scrape = asyncio.get_running_loop().create_future()
+        first = asyncio.ensure_future(await cache.get_or_start("key", lambda: scrape))
+        second = asyncio.ensure_future(await cache.get_or_start("key", lambda: pytest.fail("started twice")))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not scrape.cancelled()
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        assert scrape.cancelled() and cache.stats()["inflight"] == 0
+
+    asyncio.run(main())
+
+
+def test_batch_streams_one_line_per_item_with_errors_inline(api):
+    client, scrape = api
+    items = [{"url": f"{URL}/{name}", "selector": "h2"} for name in ("a", "broken", "c")]
+    response = client.post("/scraper/batch", json={"items": items})
+
+    assert response.status_code == 200 and response.headers["content-type"] == "application/x-ndjson"
+    lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+    assert lines == [
+        {"index": 0, "url": f"{URL}/a", "titles": [f"h2 of {URL}/a"]},
+        {"index": 1, "url": f"{URL}/broken", "error": f"No h2 on {URL}/broken"},
+        {"index": 2, "url": f"{URL}/c", "titles": [f"h2 of {URL}/c"]},
+    ]
+    assert sorted(scrape.calls) == sorted(item["url"] for item in items)
+    assert client.post("/scraper/batch", json={"items": items, "mode": "async"}).status_code == 422
+
+
+def _scrape_batch_tabs(pending, stop, emit, profile, tabs):
+    """Stands in for ``scraper._scrape_batch_tabs``: takes items until none are left or the stream stops."""
+    while not stop.is_set():
+        try:
+            index, item = pending.get_nowait()
+        except queue.Empty:
+            break
+        emit({"index": index, "url": item.url, "titles": [f"{profile} tab"]})
+    emit(None)
+
+
+def test_tab_batch_starts_sessions_when_the_stream_is_read_and_reports_unadmitted_items(monkeypatch):
+    executor = ScrapeExecutor(1, queue_limit=0)
+    monkeypatch.setattr(scraper, "get_executor", lambda: executor)
+    monkeypatch.setattr(scraper, "_scrape_batch_tabs", _scrape_batch_tabs)
+    monkeypatch.setattr(scraper, "BATCH_ADMISSION_WAIT_SECONDS", 0)
+    task = scraper.BatchScrapeRequest(items=[{"url": f"{URL}/{i}", "selector": "h2"} for i in range(3)], tabs=2)
+
+    async def read(response):
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+
+    async def main():
+        response = await scraper.scrape_batch(task)
+        assert executor.stats()["submitted"] == 0
+        lines = await read(response)
+        assert sorted(line["index"] for line in lines) == [0, 1, 2]
+        assert all(line["titles"] == ["tabs tab"] for line in lines)
+
+        # With the only worker busy, nothing is admitted and every item comes back as an error.
+        gate = threading.Event()
+        busy = executor.submit(gate.wait, 5)
+        lines = await read(await scraper.scrape_batch(task))
+        gate.set()
+        await busy
+        assert [line["index"] for line in lines] == [0, 1, 2] and all("error" in line for line in lines)
+        assert executor.stats()["submitted"] == 2
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,18 @@
+from benchmarks.fixture_site import MenuSite, serve
+from benchmarks.run import DriverFactory, bench_scrape_menu, bench_webscraper
+
+
+def test_stub_crawl_visits_every_fixture_page():
+    site = MenuSite(depth=2, fanout=3, js_delay_ms=5)
+    with serve(site):
+        result = bench_scrape_menu(site, DriverFactory(site, latency_ms=0), workers=2)
+    assert result["pages"] == site.page_count() == 13
+    assert result["round_trips_per_page"] > 0
+
+
+def test_bulk_extraction_needs_fewer_round_trips_than_per_element_reads():
+    site = MenuSite(depth=1, fanout=2, products_per_leaf=5)
+    with serve(site):
+        bulk = bench_webscraper(site, DriverFactory(site, latency_ms=0), bulk=True)
+        per_element = bench_webscraper(site, DriverFactory(site, latency_ms=0), bulk=False)
+    assert bulk["round_trips_per_page"] < per_element["round_trips_per_page"]
@@ -0,0 +1,57 @@
+import os
+
+from app.tasks.one_lvl_actions.checkpoint import CrawlJournal
+
+ROOT = "http://shop.test/"
+
+
+def _category(path, level):
+    return {'url': ROOT + path, 'category_name': path or "root", 'level': level}
+
+
+def _crawl_two_pages(checkpoint_dir):
+    journal = CrawlJournal(checkpoint_dir, compact_every=3)
+    journal.record_enqueue(_category("", 0), None)
+    journal.commit()
+    journal.record_page(ROOT, [(_category("a", 1), ROOT), (_category("b", 1), ROOT)])
+    journal.commit()  # Four records: the segment is rotated and compacted into a snapshot
+    journal.record_page(ROOT + "a", [(_category("a/c", 2), ROOT + "a")])
+    journal.commit()
+    journal.close()
+
+
+def test_resume_replays_the_journal_tail_after_the_snapshot(tmp_path):
+    _crawl_two_pages(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["journal-000002.jsonl", "snapshot-000001.jsonl", "visited-000001.jsonl"]
+
+    visited, located = CrawlJournal(str(tmp_path)).load()
+    assert sorted(visited) == [ROOT, ROOT + "a"]
+    assert [(category['url'], parent) for category, parent in located] == [(ROOT + "b", ROOT), (ROOT + "a/c", ROOT + "a")]
+
+
+def test_torn_last_line_is_skipped_and_later_records_go_to_a_new_segment(tmp_path):
+    _crawl_two_pages(str(tmp_path))
+    with open(tmp_path / "journal-000002.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"v": "http://shop.te')
+
+    journal = CrawlJournal(str(tmp_path))
+    visited, located = journal.load()
+    journal.record_page(ROOT + "b", [])
+    journal.close()
+    assert sorted(visited) == [ROOT, ROOT + "a"] and len(located) == 2
+
+    visited, located = CrawlJournal(str(tmp_path)).load()
+    assert sorted(visited) == [ROOT, ROOT + "a", ROOT + "b"]
+    assert [category['url'] for category, _parent in located] == [ROOT + "a/c"]
+
+
+def test_commit_stops_at_the_mark_and_close_can_drop_the_rest(tmp_path):
+    journal = CrawlJournal(str(tmp_path))
+    journal.record_page(ROOT, [(_category("a", 1), ROOT)])
+    mark = journal.mark()
+    journal.record_page(ROOT + "a", [])
+    journal.commit(mark)
+    journal.close(commit=False)
+
+    visited, located = CrawlJournal(str(tmp_path)).load()
+    assert list(visited) == [ROOT] and [category['url'] for category, _parent in located] == [ROOT + "a"]
@@ -0,0 +1,34 @@
+from app.tasks.one_lvl_actions.frontier import CrawlFrontier
+
+
+def _item(i, level):
+    return {"url": f"https://x.com/c/{i}", "category_name": str(i), "level": level,
+            "timestamp": "2024-05-01T12:00:00.000001"}, "https://x.com/"
+
+
+def test_frontier_spills_to_disk_in_order(tmp_path):
+    frontier = CrawlFrontier(memory_limit=5, spill_path=str(tmp_path / "frontier.sqlite"), spill_chunk=3)
+    try:
+        frontier.extend(_item(i, 1) for i in range(20))
+        assert frontier.stats()["on_disk"] == 15
+        popped = [frontier.popleft() for _ in range(10)]
+        # Reading a chunk back commits, so the spill file's WAL does not grow for the whole crawl.
+        assert not frontier._spill._conn.in_transaction
+        frontier.extend(_item(i, 2) for i in range(20, 25))
+        popped += [frontier.popleft() for _ in range(len(frontier))]
+        assert [category["url"] for category, _ in popped] == [f"https://x.com/c/{i}" for i in range(25)]
+        assert popped[0] == _item(0, 1)
+    finally:
+        frontier.close()
+    assert not (tmp_path / "frontier.sqlite").exists()
+
+
+def test_shallowest_order_and_level_cap(tmp_path):
+    frontier = CrawlFrontier("shallowest", level_cap={2: 2}, memory_limit=2, spill_path=str(tmp_path / "frontier.sqlite"))
+    try:
+        accepted = frontier.extend([_item(0, 2), _item(1, 3), _item(2, 2), _item(3, 2), _item(4, 1)])
+        assert [category["url"][-1] for category, _ in accepted] == ["0", "1", "2", "4"]
+        assert [frontier.popleft()[0]["level"] for _ in range(len(frontier))] == [1, 2, 2, 3]
+        assert frontier.stats()["dropped_by_level_cap"] == 1
+    finally:
+        frontier.close()
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from app.tasks.one_lvl_actions import graph_writer
+from app.tasks.one_lvl_actions.graph_writer import GraphWriteError, GraphWriter
+from tests.memory_graph import MemoryGraph
+
+
+def _category(url, level=1):
+    return {'url': url, 'category_name': url.rsplit('/', 1)[-1], 'level': level, 'timestamp': "2025-01-01T00:00:00"}
+
+
+class FlakyGraph(MemoryGraph):
+    """Fails the first ``failures`` write transactions, as Neo4j does once the driver's retries run out."""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def execute_write(self, work, *args):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Neo4j unavailable")
+        return super().execute_write(work, *args)
+
+
+class UnreachableGraph(MemoryGraph):
+    def session(self, **_kwargs):
+        raise ConnectionError("Neo4j unreachable")
+
+
+def test_rows_are_written_in_batches_and_flush_writes_the_rest():
+    graph = MemoryGraph()
+    writer = GraphWriter(graph, batch_size=3, flush_interval=60).start()
+    writer.write_category(_category("http://shop.test/a", 0))
+    writer.write_category(_category("http://shop.test/a/b"), "http://shop.test/a")
+    writer.write_category(_category("http://shop.test/a/c"), "http://shop.test/a")
+    writer.flush()
+    stats = writer.stats()
+    writer.close()
+
+    assert set(graph.nodes) == {"http://shop.test/a", "http://shop.test/a/b", "http://shop.test/a/c"}
+    assert set(graph.edges) == {("http://shop.test/a", "http://shop.test/a/b"), ("http://shop.test/a", "http://shop.test/a/c")}
+    # One full batch of three rows, then the two left over on flush.
+    assert (stats["batches"], stats["rows"], stats["max_batch_size"], stats["pending"]) == (2, 5, 3, 0)
+    assert not writer.failed
+
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    graph = MemoryGraph()
+    writer = GraphWriter(graph, batch_size=100, flush_interval=0.05).start()
+    writer.write_category(_category("http://shop.test/a", 0))
+    deadline = time.monotonic() + 5
+    while not graph.nodes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert list(graph.nodes) == ["http://shop.test/a"] and writer.stats()["batches"] == 1
+
+
+def test_dropped_batch_fails_every_later_flush():
+    graph = FlakyGraph()
+    writer = GraphWriter(graph, batch_size=100, flush_interval=60).start()
+    writer.write_category(_category("http://shop.test/a", 0))
+    with pytest.raises(GraphWriteError):
+        writer.flush()
+
+    # Later batches are written again, but the dropped rows are gone, so flushing keeps failing.
+    writer.write_category(_category("http://shop.test/b", 0))
+    with pytest.raises(GraphWriteError):
+        writer.flush()
+    writer.close()
+    assert list(graph.nodes) == ["http://shop.test/b"] and writer.failed
+    assert (writer.stats()["failed_batches"], writer.stats()["batches"]) == (1, 1)
+
+
+def test_flush_raises_instead_of_hanging_when_the_writer_thread_died(monkeypatch):
+    monkeypatch.setattr(graph_writer, "WRITER_POLL_INTERVAL", 0.01)
+    writer = GraphWriter(UnreachableGraph(), max_pending=1).start()
+    writer._thread.join(5)
+    with pytest.raises(GraphWriteError, match="unreachable"):
+        writer.write_category(_category("http://shop.test/a", 0), "http://shop.test")
+    writer.close()
+    assert writer.failed
@@ -0,0 +1,77 @@
+import logging
+from datetime import timedelta
+
+from selenium.webdriver.common.by import By
+
+from app.tasks.one_lvl_actions import incremental
+from app.tasks.one_lvl_actions.incremental import IncrementalCrawl, child_fingerprint
+from app.tasks.one_lvl_actions.menu_scraper import scrape_menu
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import StubDriver
+from tests.memory_graph import MemoryGraph
+
+
+def _crawl(site, graph, checkpoint_dir, **kwargs):
+    driver = StubDriver(site, latency_ms=0)
+    driver.get(site.root_url)
+    scrape_menu(driver, (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+                lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+                checkpoint_dir=str(checkpoint_dir), driver_graph=graph, **kwargs)
+    return len(driver.page_starts) - 1
+
+
+def test_fingerprint_ignores_child_order():
+    assert child_fingerprint([("a", "A"), ("b", "B")]) == child_fingerprint([("b", "B"), ("a", "A")])
+    assert child_fingerprint([("a", "A")]) != child_fingerprint([("a", "A2")])
+
+
+def test_incremental_recrawl_skips_unchanged_subtrees(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    site = MenuSite(depth=2, fanout=3)
+    graph = MemoryGraph()
+    with serve(site):
+        assert _crawl(site, graph, tmp_path / "full") == 13
+        # Same menu: the root lists the same children, so nothing below it is loaded.
+        assert _crawl(site, graph, tmp_path / "same", incremental=True) == 1
+        assert "yüklenmeyen sayfa: 12" in caplog.text
+        # The root's ETag was stored on the last run; now it answers 304 and is not loaded either.
+        assert _crawl(site, graph, tmp_path / "etag", incremental=True) == 0
+
+        # /c/1 loses a child. The root is forced open by its max age, /c/0 and /c/2 are unchanged.
+        children = site.children
+        site.children = lambda path: children(path)[:2] if path == "/c/1" else children(path)
+        caplog.clear()
+        assert _crawl(site, graph, tmp_path / "changed", incremental=True, max_age={0: timedelta(0)}) == 6
+        assert "yüklenmeyen sayfa: 6" in caplog.text
+        assert graph.nodes[site.base_url + "/c/1/2"].get("stale")
+        assert not graph.nodes[site.base_url + "/c/1/1"].get("stale")
+
+        assert _crawl(site, graph, tmp_path / "refresh", incremental=True, full_refresh=True) == 12
+
+
+def test_validators_are_only_asked_for_known_pages(monkeypatch):
+    heads = []
+
+    def fetch_validators(url, etag, last_modified, schedule=None):
+        heads.append((url, etag))
+        if "plain.test" in url:
+            return False, {"etag": None, "last_modified": None}
+        return etag == '"v1"', {"etag": '"v1"', "last_modified": None}
+
+    monkeypatch.setattr(incremental, "fetch_validators", fetch_validators)
+    graph = MemoryGraph()
+    for url, etag in (("http://shop.test/a", '"v1"'), ("http://shop.test/b", None),
+                      ("http://plain.test/a", None), ("http://plain.test/b", None)):
+        graph.nodes[url] = {"level": 1, "fingerprint": "f", "etag": etag, "last_modified": None, "expanded_at": None}
+    crawl = IncrementalCrawl(max_age={}).load(graph)
+
+    def not_modified(url):
+        return crawl.not_modified({'url': url, 'level': 1})
+
+    assert not not_modified("http://shop.test/new")
+    assert not_modified("http://shop.test/a")
+    # No stored validators: a plain HEAD learns them for the next crawl.
+    assert not not_modified("http://shop.test/b") and crawl.validators("http://shop.test/b") == {"etag": '"v1"', "last_modified": None}
+    # A host that sends no validators is asked once per crawl.
+    assert not not_modified("http://plain.test/a") and not not_modified("http://plain.test/b")
+    assert heads == [("http://shop.test/a", '"v1"'), ("http://shop.test/b", None), ("http://plain.test/a", None)]
@@ -0,0 +1,48 @@
+import io
+import json
+import logging
+import threading
+
+from app.core.logging_config import OperationLog, bind_log_context, log_context, setup_logging, shutdown_logging
+
+
+def test_records_are_written_as_json_with_crawl_and_job_ids_from_any_thread():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    level = root.level
+    logger = logging.getLogger("web-scraper.test")
+    setup_logging("INFO", "json", stream)
+    try:
+        with log_context(crawl_id="20250101_120000", job_id="job-1"):
+            logger.info("Loaded %s", "page")
+            worker = threading.Thread(target=bind_log_context(logger.warning), args=("From a worker: %d", 3))
+        worker.start()
+        worker.join()
+        logger.info("Outside any crawl")
+    finally:
+        shutdown_logging()
+        root.setLevel(level)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(line["message"], line.get("crawl_id"), line.get("job_id")) for line in lines] == [
+        ("Loaded page", "20250101_120000", "job-1"),
+        ("From a worker: 3", "20250101_120000", "job-1"),
+        ("Outside any crawl", None, None),
+    ]
+    assert lines[1]["level"] == "WARNING" and lines[1]["thread"] != lines[0]["thread"]
+
+
+def test_operation_log_samples_element_lines_and_logs_one_summary(caplog):
+    logger = logging.getLogger("web-scraper.test")
+    log = OperationLog(logger, "Read prices", sample=2)
+    with caplog.at_level(logging.DEBUG, logger="web-scraper.test"):
+        for i in range(50):
+            log.element("found", logging.DEBUG, "Price %d read", i)
+        log.element("timeout", logging.WARNING, "Price %d timed out", 50)
+        log.summary()
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Price 0 read", "Price 1 read", "Price 50 timed out",
+        "Read prices: {'found': 50, 'timeout': 1} (48 element log lines suppressed)",
+    ]
+    assert caplog.records[-1].counts == {"found": 50, "timeout": 1}
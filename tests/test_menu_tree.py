@@ -0,0 +1,70 @@
+from selenium.webdriver.common.by import By
+
+from app.tasks.one_lvl_actions.menu_scraper import scrape_menu
+from app.tasks.one_lvl_actions.menu_tree import MenuTree
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, TREE_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import StubDriver
+from tests.memory_graph import MemoryGraph
+
+
+def _crawl(site, checkpoint_dir, **kwargs):
+    driver = StubDriver(site, latency_ms=0)
+    driver.get(site.root_url)
+    graph = MemoryGraph()
+    scrape_menu(driver, (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+                lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+                checkpoint_dir=str(checkpoint_dir), driver_graph=graph, **kwargs)
+    return len(driver.page_starts) - 1, graph
+
+
+def test_menu_tree_writes_the_same_graph_as_bfs_from_one_page(tmp_path):
+    site = MenuSite(depth=2, fanout=3, menu_tree=True)
+    menu_tree = MenuTree((By.CSS_SELECTOR, TREE_SELECTOR))
+    with serve(site):
+        bfs_loads, bfs = _crawl(site, tmp_path / "bfs")
+        tree_loads, tree = _crawl(site, tmp_path / "tree", menu_tree=menu_tree)
+        # Resuming a finished harvest loads nothing.
+        assert _crawl(site, tmp_path / "tree", menu_tree=menu_tree)[0] == 0
+
+        # /c/1's flyout is not in the DOM: only that branch is crawled page by page.
+        site.lazy_menus = {"/c/1"}
+        lazy_loads, lazy = _crawl(site, tmp_path / "lazy", menu_tree=menu_tree)
+    assert (bfs_loads, tree_loads, lazy_loads) == (13, 1, 5)
+    assert tree.tree() == lazy.tree() == bfs.tree()
+    assert len(tree.edges) == 12
+
+
+def test_menu_tree_depth_limit(tmp_path):
+    site = MenuSite(depth=3, fanout=2, menu_tree=True)
+    with serve(site):
+        loads, graph = _crawl(site, tmp_path, menu_tree=MenuTree((By.CSS_SELECTOR, TREE_SELECTOR), max_depth=2))
+    assert loads == 1
+    assert sorted(node["level"] for node in graph.nodes.values()) == [0, 1, 1, 2, 2, 2, 2]
+    # Categories cut off by the depth limit get no fingerprint, since their children were not read.
+    assert not any("fingerprint" in node for node in graph.nodes.values() if node["level"] == 2)
+
+
+def test_bfs_skips_malformed_links_and_loads_links_as_written(tmp_path):
+    class Site(MenuSite):
+        def body(self, path):
+            body = super().body(path)
+            if path == "/c":
+                body = body.replace(f'href="{self.base_url}/c/0"', f'href="{self.base_url}/c/0/?utm_source=nav"')
+                body = body.replace('<ul class="menu">',
+                                    '<ul class="menu"><li><a class="category" href="http://x.com:99999/a">Broken</a></li>')
+            return body
+
+    site = Site(depth=1, fanout=2)
+    with serve(site):
+        driver = StubDriver(site, latency_ms=0)
+        driver.get(site.root_url)
+        loaded = []
+        driver.get = lambda url, get=driver.get: loaded.append(url) or get(url)
+        graph = MemoryGraph()
+        scrape_menu(driver, (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+                    lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+                    checkpoint_dir=str(tmp_path), driver_graph=graph)
+        base = site.base_url
+    # The canonical URL is the node key; the page is loaded from the link as written.
+    assert f"{base}/c/0/?utm_source=nav" in loaded
+    assert sorted(graph.nodes) == [f"{base}/c", f"{base}/c/0", f"{base}/c/1"]
@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import pytest
+from selenium.webdriver.common.by import By
+
+from app.tasks.one_lvl_actions import menu_scraper
+from app.tasks.one_lvl_actions.menu_scraper import SharedFrontier, scrape_menu, scrape_menu_parallel
+from app.utils.readiness import LocatorPresent, wait_until_ready
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import StubDriver
+from tests.memory_graph import MemoryGraph
+
+
+class Queue(deque):
+    """The part of CrawlFrontier that SharedFrontier uses."""
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        return items
+
+    def peek_level(self):
+        return self[0][0]['level'] if self else None
+
+
+class RecordingDriver(StubDriver):
+    """Appends every page it loads to a list shared by all drivers of the crawl."""
+
+    def __init__(self, site, loads):
+        super().__init__(site, latency_ms=0)
+        self.loads = loads
+
+    def get(self, url):
+        self.loads.append(url)
+        super().get(url)
+
+
+def _category(path, level):
+    return {'url': f"http://shop.test/{path}", 'category_name': path, 'level': level}
+
+
+def _crawl(site, tmp_path, workers, loads, **kwargs):
+    drivers = [RecordingDriver(site, loads) for _ in range(workers)]
+    drivers[0].get(site.root_url)
+    wait_until_ready(drivers[0], [LocatorPresent((By.CSS_SELECTOR, LOADED_SELECTOR))], timeout=2)
+    graph = MemoryGraph()
+    crawl = scrape_menu_parallel if workers > 1 else scrape_menu
+    crawl(drivers if workers > 1 else drivers[0], (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+          lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+          checkpoint_dir=str(tmp_path / str(workers)), driver_graph=graph, **kwargs)
+    return graph
+
+
+def test_level_synchronous_frontier_holds_deeper_pages_until_the_level_is_done():
+    frontier = SharedFrontier(set(), Queue([(_category("", 0), None)]), level_synchronous=True)
+    root, _parent = frontier.get()
+    frontier.complete(root, [(_category(name, 1), root['url']) for name in ("a", "b")])
+    a, _parent = frontier.get()
+    b, _parent = frontier.get()
+    frontier.complete(a, [(_category("a/c", 2), a['url'])])
+
+    taken = []
+    waiter = threading.Thread(target=lambda: taken.append(frontier.get()))
+    waiter.start()
+    waiter.join(0.2)
+    # "a/c" waits while "b" from the level above is still in flight.
+    assert waiter.is_alive() and frontier.in_flight() == 1
+    frontier.complete(b, [])
+    waiter.join(5)
+    assert [category['url'] for category, _parent in taken] == ["http://shop.test/a/c"]
+    frontier.complete(taken[0][0], [])
+    assert frontier.get() is None
+
+
+def test_level_synchronous_parallel_crawl_loads_pages_level_by_level(tmp_path):
+    site = MenuSite(depth=2, fanout=3, render_delay_ms=10)
+    with serve(site):
+        single = _crawl(site, tmp_path, 1, [])
+        loads = []
+        parallel = _crawl(site, tmp_path, 3, loads, level_synchronous=True)
+
+    assert parallel.tree() == single.tree() and len(parallel.nodes) == 13
+    levels = [urlsplit(url).path.count("/") - 1 for url in loads]
+    assert levels == sorted(levels)
+
+
+def test_checkpoint_error_stops_every_worker_and_is_raised(tmp_path, monkeypatch):
+    checkpoints = []
+
+    def fail_once(_writer, _journal):
+        # Only the first checkpoint fails; the crawl must not carry on past it as if nothing happened.
+        checkpoints.append(threading.current_thread().name)
+        if len(checkpoints) == 1:
+            raise OSError("No space left on device")
+
+    monkeypatch.setattr(menu_scraper, "SAVE_EVERY", 2)
+    monkeypatch.setattr(menu_scraper, "_checkpoint", fail_once)
+    site = MenuSite(depth=2, fanout=3, render_delay_ms=10)
+    loads = []
+    with serve(site):
+        with pytest.raises(OSError, match="No space"):
+            _crawl(site, tmp_path, 3, loads, level_synchronous=True)
+    # The crawl stopped at the failed checkpoint instead of loading the rest of the site.
+    assert checkpoints[0].startswith("menu-crawler-") and len(loads) < site.page_count()
@@ -0,0 +1,85 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from app.core import driver as driver_module
+from app.core import profiles
+from app.core.profiles import PAGE_METRICS_SCRIPT, PAGE_STATUS_SCRIPT, PROFILES, PageLoadStats, get_profile
+
+
+class FakeRemote:
+    """Stands in for ``webdriver.Remote``: keeps the options and CDP commands instead of opening a session."""
+
+    def __init__(self, command_executor, options):
+        self.options = options
+        self.commands = []
+
+    def execute(self, command, params):
+        self.commands.append((command, params))
+
+
+class MetricsDriver:
+    """Answers the page metrics and status scripts; ``metrics`` may be None or an exception."""
+
+    def __init__(self, metrics, status=200, profile="light"):
+        self.metrics = metrics
+        self.status = status
+        self.scraper_profile = profile
+        self.scripts = []
+
+    def execute_script(self, script):
+        self.scripts.append(script)
+        if script == PAGE_STATUS_SCRIPT:
+            return self.status
+        if isinstance(self.metrics, Exception):
+            raise self.metrics
+        return self.metrics
+
+
+def _metrics(status=200):
+    return {"document_bytes": 1000, "resource_bytes": 3000, "resources": 4, "dom_content_loaded_ms": 80.0,
+            "load_ms": 120.0, "status": status}
+
+
+@pytest.mark.parametrize("name", sorted(PROFILES))
+def test_profile_maps_to_chrome_options(monkeypatch, name):
+    monkeypatch.setattr(driver_module.webdriver, "Remote", FakeRemote)
+    profile = PROFILES[name]
+    driver = driver_module.get_driver(name)
+    arguments = driver.options.arguments
+
+    assert driver.scraper_profile == name and driver.options.page_load_strategy == profile.page_load_strategy
+    assert ("--headless=new" in arguments) == profile.headless
+    assert ("--blink-settings=imagesEnabled=false" in arguments) == profile.disable_images
+    if profile.window_size:
+        assert "--window-size={},{}".format(*profile.window_size) in arguments
+    else:
+        assert not any(argument.startswith("--window-size") for argument in arguments)
+    blocked = [params["params"]["urls"] for _command, params in driver.commands if params["cmd"] == "Network.setBlockedURLs"]
+    assert blocked == ([profile.blocked_urls] if profile.blocked_urls else [])
+
+
+def test_profiles_trade_fidelity_for_speed():
+    assert PROFILES["default"].page_load_strategy == "normal" and not PROFILES["default"].blocked_urls
+    assert "*.css" in PROFILES["minimal"].blocked_urls and "*.css" not in PROFILES["light"].blocked_urls
+    assert PROFILES["tabs"].page_load_strategy == "none"
+    with pytest.raises(ValueError, match="Unknown driver profile"):
+        get_profile("turbo")
+
+
+def test_record_load_returns_the_status_whether_or_not_the_metrics_are_sampled(monkeypatch):
+    stats = PageLoadStats(sample_rate=1.0)
+    driver = MetricsDriver(_metrics(status=404))
+    assert stats.record_load(driver) == 404 and driver.scripts == [PAGE_METRICS_SCRIPT]
+
+    sampled = PageLoadStats(sample_rate=0.5)
+    monkeypatch.setattr(profiles.random, "random", iter([0.7, 0.2]).__next__)
+    skipped, kept = MetricsDriver(_metrics(), status=503), MetricsDriver(_metrics())
+    assert sampled.record_load(skipped) == 503 and skipped.scripts == [PAGE_STATUS_SCRIPT]
+    assert sampled.record_load(kept) == 200 and kept.scripts == [PAGE_METRICS_SCRIPT]
+    assert sampled.stats() == {"light": {"pages": 1, "avg_bytes": 4000.0, "avg_resources": 4.0, "avg_load_ms": 120.0}}
+
+    # Without metrics the status is read on its own; a failing script is not an error.
+    assert stats.record_load(MetricsDriver(None, status=301)) == 301
+    broken = MetricsDriver(WebDriverException("no such window"), status=None)
+    assert stats.record(broken) is None and stats.record_load(broken) is None
+    assert stats.stats()["light"]["pages"] == 1
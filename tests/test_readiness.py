@@ -0,0 +1,76 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from app.utils import readiness
+from app.utils.readiness import DocumentReady, HostReadiness, LocatorPresent, wait_until_ready
+
+
+class PollingDriver:
+    """Answers readiness polls from a list of results, repeating the last one; an exception stands for a failed poll."""
+
+    def __init__(self, host, results):
+        self.current_url = f"http://{host}/c"
+        self.results = list(results)
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_all_conditions_are_checked_in_one_script_per_poll(monkeypatch):
+    monkeypatch.setattr(readiness, "host_readiness", HostReadiness())
+    driver = PollingDriver("ready.test", [[False, True], WebDriverException("navigating"), [True, True]])
+    conditions = [DocumentReady("interactive"), LocatorPresent((By.CSS_SELECTOR, "h2.title"))]
+    result = wait_until_ready(driver, conditions, timeout=5)
+
+    assert result and result.polls == len(driver.calls) == 3 and result.pending == []
+    assert {script for script, _args in driver.calls} == {driver.calls[0][0]}
+    assert DocumentReady.js in driver.calls[0][0] and LocatorPresent.js in driver.calls[0][0]
+    assert driver.calls[0][1] == (["interactive", ["css", "h2.title"]],)
+    assert readiness.host_readiness.stats()["ready.test"]["ready"] == 1
+
+
+def test_timed_out_wait_reports_the_pending_conditions_and_widens_the_host_timeout(monkeypatch):
+    monkeypatch.setattr(readiness, "host_readiness", HostReadiness())
+    readiness.host_readiness.record("slow.test", 1.0, True)
+    learned = readiness.host_readiness.timeout("slow.test")
+    driver = PollingDriver("slow.test", [[True, False]])
+    result = wait_until_ready(driver, [DocumentReady(), LocatorPresent((By.ID, "app"))], timeout=0.3)
+
+    assert not result and result.pending == ["locator_present"] and result.polls == len(driver.calls) > 1
+    stats = readiness.host_readiness.stats()["slow.test"]
+    assert stats["timeouts"] == 1 and stats["timeout"] > learned
+
+
+def test_host_history_adapts_timeout_and_poll_interval():
+    hosts = HostReadiness()
+    assert (hosts.timeout("new.test"), hosts.poll_interval("new.test")) == (readiness.DEFAULT_TIMEOUT, 0.1)
+
+    # First sample: mean 4 s, deviation 2 s.
+    hosts.record("shop.test", 4.0, True)
+    assert hosts.timeout("shop.test") == pytest.approx(12.0) and hosts.poll_interval("shop.test") == pytest.approx(0.4)
+    # Steady samples shrink the deviation, so the timeout closes in on the mean.
+    hosts.record("shop.test", 4.0, True)
+    assert hosts.timeout("shop.test") == pytest.approx(4.0 + 4 * 1.6)
+
+    # A timeout doubles the deviation (or raises it to a quarter of the wait) without moving the mean,
+    # up to the cap.
+    hosts.record("shop.test", 10.4, False)
+    assert hosts.timeout("shop.test") == pytest.approx(4.0 + 4 * 3.2)
+    hosts.record("shop.test", 40.0, False)
+    assert hosts.timeout("shop.test") == readiness.MAX_TIMEOUT
+    assert hosts.stats()["shop.test"]["timeouts"] == 2 and hosts.poll_interval("shop.test") == pytest.approx(0.4)
+
+    # Fast hosts are clamped to the minimum timeout and poll interval.
+    for _ in range(20):
+        hosts.record("fast.test", 0.1, True)
+    assert (hosts.timeout("fast.test"), hosts.poll_interval("fast.test")) == (readiness.MIN_TIMEOUT, readiness.MIN_POLL_INTERVAL)
+
+    # Only timeouts so far: there is no ready time to learn from yet.
+    hosts.record("down.test", 10.0, False)
+    assert hosts.timeout("down.test") == readiness.DEFAULT_TIMEOUT
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from app.core.profiles import PAGE_STATUS_SCRIPT, PageLoadStats
+from app.core.scheduler import HostScheduler
+
+
+def test_aimd_limit_and_backoff():
+    scheduler = HostScheduler(initial_concurrency=2, max_concurrency=4, backoff=0.2, backoff_max=1)
+    for _ in range(6):
+        with scheduler.ticket("https://shop.example.com/a"):
+            pass
+    assert scheduler.stats()["hosts"]["shop.example.com"]["concurrency_limit"] == 4
+
+    with scheduler.ticket("https://shop.example.com/b") as ticket:
+        ticket.record(429)
+    host = scheduler.stats()["hosts"]["shop.example.com"]
+    assert host["concurrency_limit"] == 2 and host["throttled"] == 1 and host["backoff_seconds"] > 0
+
+    started = time.monotonic()
+    with scheduler.ticket("https://shop.example.com/c"):
+        pass
+    assert time.monotonic() - started >= 0.15
+
+
+def test_rate_limit_and_fair_share_by_priority():
+    scheduler = HostScheduler(rate_limits={"slow.example.com": 20})
+    started = time.monotonic()
+    for _ in range(4):
+        with scheduler.ticket("https://slow.example.com/"):
+            pass
+    assert time.monotonic() - started >= 0.14
+
+    # One slot, held while a low and a high priority job queue up: the high priority job gets 3 of
+    # the first 4 grants.
+    scheduler = HostScheduler(slots=1, initial_concurrency=8)
+    order = []
+    blocker = scheduler.ticket("https://a.example.com/", job="blocker")
+    blocker.__enter__()
+
+    def load(job, priority):
+        with scheduler.ticket("https://a.example.com/", job=job, priority=priority):
+            order.append(job)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=load, args=(job, priority)) for job, priority in [("low", 1), ("high", 3)] * 4]
+    for thread in threads:
+        thread.start()
+    while scheduler.stats()["waiting"] < len(threads):
+        time.sleep(0.005)
+    blocker.__exit__(None, None, None)
+    for thread in threads:
+        thread.join()
+    assert order[:4].count("high") == 3
+
+
+def test_throttling_status_is_read_when_page_metrics_are_not_sampled():
+    class Driver:
+        def execute_script(self, script):
+            return 429 if script == PAGE_STATUS_SCRIPT else {"status": 200}
+
+    scheduler = HostScheduler(backoff=0.2)
+    with scheduler.ticket("https://shop.example.com/") as ticket:
+        ticket.record(PageLoadStats(sample_rate=0).record_load(Driver()))
+    assert scheduler.stats()["hosts"]["shop.example.com"]["throttled"] == 1
@@ -1 +1,104 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
 
+import pytest
+
+from app.utils import http_engine
+from app.utils.http_engine import BrowserRequired, EngineMemory, run_with_engine
+
+PAGES = {
+    "/static": (
+        "<html><head><title>Static page</title></head><body>"
+        "<h2 class='title'>First   product</h2><h2 class='title'>Second product</h2>"
+        f"<p>{'Server rendered text. ' * 20}</p></body></html>"
+    ),
+    "/spa": (
+        "<html><head><title>App</title><script src='/bundle.js'></script></head>"
+        "<body><div id='root'></div></body></html>"
+    ),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fixture_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine_memory(monkeypatch):
+    monkeypatch.setattr(http_engine, "engine_memory", EngineMemory())
+
+
+def test_http_engine_scrapes_server_rendered_page(fixture_site):
+    url = f"{fixture_site}/static"
+    assert http_engine.http_scrape_titles(url, "h2.title") == ["First product", "Second product"]
+    assert http_engine.http_extract_title(url) == "Static page"
+
+
+def test_http_engine_flags_js_rendered_page(fixture_site):
+    with pytest.raises(BrowserRequired):
+        http_engine.http_extract_title(f"{fixture_site}/spa")
+
+
+def test_auto_falls_back_to_browser_and_remembers_host(fixture_site):
+    url = f"{fixture_site}/static"
+    browser_calls = []
+
+    def browser():
+        browser_calls.append(url)
+        return ["from browser"]
+
+    assert run_with_engine(url, "auto", lambda: http_engine.http_scrape_titles(url, ".missing"), browser) == ["from browser"]
+    # The host is now known to need a browser, so the HTTP engine is skipped.
+    assert run_with_engine(url, "auto", lambda: pytest.fail("HTTP engine should be skipped"), browser) == ["from browser"]
+    assert len(browser_calls) == 2
+
+
+def test_http_engine_only_never_uses_browser(fixture_site):
+    url = f"{fixture_site}/static"
+    result = run_with_engine(url, "http", lambda: http_engine.http_scrape_titles(url, ".missing"),
+                             lambda: pytest.fail("browser should not be used"))
+    assert result == []
+
+
+def test_browser_pinned_host_is_probed_with_http_again_after_the_ttl(fixture_site, monkeypatch):
+    monkeypatch.setattr(http_engine, "engine_memory", EngineMemory(ttl=0.5))
+    url = f"{fixture_site}/static"
+
+    def browser():
+        return ["from browser"]
+
+    assert run_with_engine(url, "auto", lambda: http_engine.http_scrape_titles(url, ".missing"), browser) == ["from browser"]
+    # Requests to a pinned host go straight to the browser without extending the pin.
+    for _ in range(2):
+        time.sleep(0.2)
+        assert run_with_engine(url, "auto", lambda: pytest.fail("HTTP engine should be skipped"), browser) == ["from browser"]
+    assert http_engine.engine_memory.stats()["browser"] == 1
+
+    time.sleep(0.2)
+    result = run_with_engine(url, "auto", lambda: http_engine.http_scrape_titles(url, "h2.title"), browser)
+    assert result == ["First product", "Second product"]
+    assert http_engine.engine_memory.get(urlsplit(url).netloc) == "http"
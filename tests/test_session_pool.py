@@ -0,0 +1,133 @@
+import uuid
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from app.core.session_pool import SessionPool
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for the pool: windows, scripts and cookies. ``dead`` fails every command."""
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex
+        self.switch_to = self
+        self.dead = False
+        self._handles = ["main"]
+        self._handle = "main"
+
+    @property
+    def current_window_handle(self):
+        self._command()
+        return self._handle
+
+    @property
+    def window_handles(self):
+        self._command()
+        return list(self._handles)
+
+    def window(self, handle):
+        self._command()
+        self._handle = handle
+
+    def new_window(self, _type_hint=None):
+        self._command()
+        self._handle = f"tab-{len(self._handles)}"
+        self._handles.append(self._handle)
+
+    def close(self):
+        self._command()
+        self._handles.remove(self._handle)
+
+    def execute_script(self, _script, *_args):
+        self._command()
+
+    def execute(self, _command, _params=None):
+        self._command()
+
+    def delete_all_cookies(self):
+        self._command()
+
+    def get(self, _url):
+        self._command()
+
+    def quit(self):
+        pass
+
+    def _command(self):
+        if self.dead:
+            raise WebDriverException("chrome not reachable")
+
+
+def _pool(**kwargs):
+    drivers = []
+
+    def factory(*_profile):
+        drivers.append(FakeDriver())
+        return drivers[-1]
+    return SessionPool(factory=factory, max_size=2, **kwargs), drivers
+
+
+def test_lease_reuses_a_warm_session_and_resets_it():
+    pool, drivers = _pool()
+    assert pool.warm(1) == 1
+    with pool.lease() as driver:
+        driver.switch_to.new_window("tab")
+    with pool.lease() as again:
+        pass
+    pool.close()
+
+    assert again is driver and len(drivers) == 1
+    # The extra tab was closed when the session came back.
+    assert driver.window_handles == ["main"]
+    stats = pool.stats()
+    assert (stats["leases"], stats["hits"], stats["misses"], stats["created"]) == (2, 2, 0, 1)
+
+
+def test_idle_session_failing_its_health_check_is_replaced():
+    pool, drivers = _pool(health_check_idle=0)
+    with pool.lease() as first:
+        pass
+    first.dead = True
+    with pool.lease() as second:
+        pass
+    pool.close()
+
+    assert second is not first and len(drivers) == 2
+    assert pool.stats()["recycled"]["unhealthy"] == 1
+
+
+def test_session_that_broke_while_leased_is_discarded():
+    pool, drivers = _pool()
+    with pytest.raises(WebDriverException):
+        with pool.lease() as driver:
+            driver.dead = True
+            raise WebDriverException("session deleted")
+    stats = pool.stats()
+    assert stats["recycled"] == {"discarded": 1} and stats["open"] == 0
+
+    # A caller's own error does not cost a healthy session.
+    with pytest.raises(ValueError):
+        with pool.lease():
+            raise ValueError("bad selector")
+    stats = pool.stats()
+    pool.close()
+    assert stats["recycled"] == {"discarded": 1} and stats["idle"] == 1
+
+
+def test_web_scraper_discards_a_session_that_broke_in_its_block(monkeypatch):
+    from app.tasks import actions
+
+    pool, drivers = _pool()
+    monkeypatch.setattr(actions, "get_pool", lambda: pool)
+    with pytest.raises(WebDriverException):
+        with actions.WebScraper() as scraper:
+            scraper.driver.dead = True
+            raise WebDriverException("session deleted")
+    with pytest.raises(ValueError):
+        with actions.WebScraper() as scraper:
+            scraper.driver.get("http://shop.test/")
+            raise ValueError("bad selector")
+    stats = pool.stats()
+    pool.close()
+    assert stats["recycled"] == {"discarded": 1} and stats["idle"] == 1 and len(drivers) == 2
@@ -0,0 +1,42 @@
+from selenium.webdriver.common.by import By
+
+from app.core.snapshots import SnapshotStore
+from app.tasks.one_lvl_actions.menu_scraper import scrape_menu
+from app.tasks.parameters import ElementLocator
+from app.utils.offline_extract import extract_snapshots
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import NullGraph, StubDriver
+
+
+def test_store_deduplicates_content_and_keys_manifest_by_run(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    page = "<html><body>" + "<p>same page</p>" * 200 + "</body></html>"
+    store.put("run-1", "https://a.example.com/", page)
+    store.put("run-1", "https://b.example.com/", page)
+    store.put("run-2", "https://a.example.com/", page.replace("same", "new"))
+    stats = store.stats()
+    assert stats["objects_written"] == 2 and stats["deduplicated"] == 1
+    assert stats["compression_ratio"] > 5
+    assert stats["runs"] == {"run-1": 2, "run-2": 1}
+    assert store.get("run-2", "https://a.example.com/").count("new page") == 200
+    assert store.get("run-2", "https://b.example.com/") is None
+
+
+def test_crawl_snapshots_are_re_extracted_offline(tmp_path):
+    site = MenuSite(depth=2, fanout=3)
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    with serve(site):
+        driver = StubDriver(site, latency_ms=0)
+        driver.get(site.root_url)
+        scrape_menu(driver, (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+                    lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+                    checkpoint_dir=str(tmp_path / "crawl"), driver_graph=NullGraph(), snapshots=store)
+        root_url = site.root_url
+
+    assert store.runs() == {"crawl": 13}
+    locators = {"links": ElementLocator(by="CSS_SELECTOR", value=MENU_SELECTOR),
+                "titles": ElementLocator(by="css selector", value="h2.title")}
+    pages = {page["url"]: page for page in extract_snapshots(store, "crawl", locators, ["text", "href"], workers=2)}
+    assert len(pages) == 13
+    assert pages[root_url]["links"] == [{"text": f"Root.{i}", "href": f"{root_url}/{i}"} for i in range(3)]
+    assert len(pages[root_url + "/1/2"]["titles"]) == site.products_per_leaf
@@ -0,0 +1,50 @@
+from selenium.webdriver.common.by import By
+
+from app.core.session_pool import SessionPool
+from app.core.tabs import TabSession
+from app.tasks.one_lvl_actions.menu_scraper import scrape_menu
+from app.utils.readiness import LocatorPresent, wait_until_ready
+from benchmarks.fixture_site import LOADED_SELECTOR, MENU_SELECTOR, TITLE_SELECTOR, MenuSite, serve
+from benchmarks.stub_driver import StubDriver
+from tests.memory_graph import MemoryGraph
+
+
+def test_crawl_in_tabs_writes_the_same_graph_from_one_session(tmp_path):
+    site = MenuSite(depth=2, fanout=3, render_delay_ms=20)
+    graphs = []
+    with serve(site):
+        for tabs, profile in ((1, "default"), (4, "tabs")):
+            driver = StubDriver(site, latency_ms=0, profile=profile)
+            driver.get(site.root_url)
+            wait_until_ready(driver, [LocatorPresent((By.CSS_SELECTOR, LOADED_SELECTOR))], timeout=2)
+            graph = MemoryGraph()
+            scrape_menu(driver, (By.CSS_SELECTOR, MENU_SELECTOR), (By.CSS_SELECTOR, LOADED_SELECTOR),
+                        lambda d: not d.find_elements(By.CSS_SELECTOR, MENU_SELECTOR), wait_time=2,
+                        checkpoint_dir=str(tmp_path / str(tabs)), driver_graph=graph, tabs=tabs)
+            graphs.append(graph)
+    single, multiplexed = graphs
+    assert multiplexed.tree() == single.tree()
+    assert len(multiplexed.nodes) == 13
+    # The extra tabs are closed again when the crawl ends.
+    assert driver.window_handles == ["main"]
+
+
+def test_tab_session_map_spreads_items_over_tabs(monkeypatch):
+    from app.tasks import workflows
+
+    site = MenuSite(depth=2, fanout=3, render_delay_ms=20)
+    with serve(site):
+        pool = SessionPool(factory=lambda profile="default": StubDriver(site, latency_ms=0, profile=profile), max_size=1)
+        monkeypatch.setattr(workflows, "get_pool", lambda: pool)
+        urls = site.leaf_urls()
+        items = [(i, url, TITLE_SELECTOR) for i, url in enumerate(urls)]
+        results = list(workflows.scrape_titles_in_tabs(items, tabs=3))
+
+        driver = StubDriver(site, latency_ms=0, profile="tabs")
+        with TabSession(driver, 3) as session:
+            list(session.map(lambda tab, url: tab.get(url), urls))
+            stats = session.stats()
+        pool.close()
+    assert sorted(key for key, _titles, _error in results) == list(range(len(urls)))
+    assert all(error is None and len(titles) == site.products_per_leaf for _key, titles, error in results)
+    assert stats["pages"] == len(urls) and all(pages > 0 for pages in stats["pages_per_tab"])
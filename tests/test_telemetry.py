@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from app.core import telemetry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PageDriver:
+    """Loads nothing; with ``timeout`` every ``get`` times out like a page load over the driver's limit."""
+
+    scraper_profile = "light"
+
+    def __init__(self, timeout=False):
+        self.timeout = timeout
+        self.urls = []
+
+    def get(self, url):
+        if self.timeout:
+            raise TimeoutException("page load timed out")
+        self.urls.append(url)
+
+
+def _export_two_pages():
+    """Run in a subprocess with OTEL_ENABLED=1: the SDK providers, once installed, stay for the whole process."""
+    from opentelemetry import trace
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    spans, reader = InMemorySpanExporter(), InMemoryMetricReader()
+    telemetry.setup_telemetry(span_exporter=spans, metric_reader=reader)
+    telemetry.load_page(PageDriver(), "http://shop.test/c")
+    with telemetry.timed("extract", profile="light"):
+        pass
+    try:
+        telemetry.load_page(PageDriver(timeout=True), "http://shop.test/slow")
+    except TimeoutException:
+        pass
+    trace.get_tracer_provider().force_flush()
+
+    points = []
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    value = point.count if hasattr(point, "count") else point.value
+                    points.append([metric.name, dict(point.attributes), value])
+    telemetry.shutdown_telemetry()
+    print(json.dumps({
+        "spans": [[span.name, dict(span.attributes)] for span in spans.get_finished_spans()],
+        "metrics": points,
+    }))
+
+
+def test_telemetry_is_a_no_op_unless_enabled(monkeypatch):
+    monkeypatch.setattr(telemetry, "OTEL_ENABLED", False)
+    telemetry.setup_telemetry()
+    assert telemetry._providers is None
+
+    driver = PageDriver()
+    with telemetry.timed("extract", profile="light") as span:
+        assert not span.is_recording()
+    telemetry.load_page(driver, "http://shop.test/c")
+    with pytest.raises(TimeoutException):
+        telemetry.load_page(PageDriver(timeout=True), "http://shop.test/slow")
+    assert driver.urls == ["http://shop.test/c"]
+
+
+def test_enabled_telemetry_records_spans_and_step_metrics():
+    env = {**os.environ, "OTEL_ENABLED": "1", "OTEL_TRACE_SAMPLE_RATE": "1"}
+    finished = subprocess.run(
+        [sys.executable, "-c", "from tests.test_telemetry import _export_two_pages; _export_two_pages()"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60, check=True)
+    exported = json.loads(finished.stdout.splitlines()[-1])
+
+    assert sorted(name for name, _attributes in exported["spans"]) == ["scraper.extract", "scraper.page_load", "scraper.page_load"]
+    assert ["scraper.page_load", {"engine": "browser", "profile": "light", "url": "http://shop.test/c"}] in exported["spans"]
+    metrics = exported["metrics"]
+    assert ["scraper.pages", {"engine": "browser", "profile": "light"}, 1] in metrics
+    assert ["scraper.timeouts", {"step": "page_load"}, 1] in metrics
+    assert ["scraper.step.duration", {"step": "page_load", "engine": "browser", "profile": "light"}, 2] in metrics
+    assert ["scraper.step.duration", {"step": "extract", "profile": "light"}, 1] in metrics
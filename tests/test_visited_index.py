@@ -0,0 +1,34 @@
+import pytest
+
+from app.tasks.one_lvl_actions.checkpoint import CrawlJournal
+from app.tasks.one_lvl_actions.visited_index import open_visited_index
+from app.utils.url_normalizer import UrlNormalizer
+
+
+def test_normalizer_collapses_equivalent_links():
+    normalize = UrlNormalizer()
+    canonical = "https://shop.example.com/cat/shoes?color=red&size=42"
+    assert normalize("HTTPS://Shop.Example.com:443/cat/shoes/?size=42&color=red&utm_source=nav#reviews") == canonical
+    assert normalize("https://shop.example.com/cat/shoes?color=red&gclid=abc&size=42") == canonical
+    # Client-side routes are pages of their own.
+    assert normalize("https://shop.example.com/#/cat/1") != normalize("https://shop.example.com/#/cat/2")
+    assert UrlNormalizer(allow_params=["page"])("https://x.com/list?page=2&sort=asc") == "https://x.com/list?page=2"
+
+
+@pytest.mark.parametrize("mode", ["memory", "bloom", "disk"])
+def test_visited_index_is_rebuilt_from_the_journal(tmp_path, mode):
+    journal = CrawlJournal(str(tmp_path))
+    children = [({"url": f"https://x.com/c/{i}", "category_name": str(i), "level": 1, "timestamp": ""}, "https://x.com/")
+                for i in range(3)]
+    journal.record_page("https://x.com/", children)
+    journal.record_page("https://x.com/c/0", [])
+    journal.close()
+
+    visited = open_visited_index(mode, str(tmp_path))
+    try:
+        visited, located = CrawlJournal(str(tmp_path)).load(visited)
+        assert "https://x.com/c/0" in visited and "https://x.com/c/1" not in visited
+        assert len(visited) == 2
+        assert [category["url"] for category, _ in located] == ["https://x.com/c/1", "https://x.com/c/2"]
+    finally:
+        visited.close()